@@ -1,9 +1,31 @@
+import time
+
+# Tempo dell'intero rerun (diagnostica, rtca.timing); parte prima degli import, che costano solo al
+# primo rerun del processo
+rerun_t0 = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import gdown
 import plotly.graph_objects as go
-import plotly.express as px
+
+# IMD, pianificatore, riepiloghi, tabelle, heatmap, scenari e canali liberi si importano nelle
+# sezioni (e nei toggle) che li usano: il primo rerun paga solo cio' che mostra
+from rtca.columns import KO_COLUMNS
+from rtca.conflicts import CONFLICT_COLUMNS, involving
+from rtca.core import (
+    ASSIGNED, MOD_COORDINATION, NOT_ASSIGNED, PRIORITIES, cached_dataset, chart_rows, load_dataset, nbytes,
+    not_assigned, olympic_capacity, olympic_frame, olympic_index, session_view, shared_source,
+)
+from rtca.cube import olympic_cube
+from rtca.figures import ko_priority_bar, ko_ranking_bar, spectrum_figure, venue_heatmap
+from rtca.incremental import dataset_conflicts, version_diff
+from rtca.occupancy import occupancy
+from rtca.figcache import CachedFigure, figure_cache, filter_key
+from rtca.refresher import FAILED, age_text, shared_refresher
+from rtca.spectrum import payload_kb
+from rtca.timing import timings
+from rtca.workbook import WorkbookSchemaError
+
+timings.record_once("app.imports", time.perf_counter() - rerun_t0)
 
 # Page config
 st.set_page_config(
@@ -15,8 +37,6 @@ st.set_page_config(
 # File & columns
 FILE_ID     = "12CUN6nc0H_lgvWOU7Tv00BEQYHmcuCvA"
 OUTPUT_FILE = "frequenze.xlsx"
-SHEET       = "ALL NP"
-CAP_SHEET   = "Capacity NP-OLY"
 
 col_bx      = "Attributed Frequency TX (MHz)"
 col_ao      = "Channel Bandwidth (kHz)"
@@ -31,15 +51,109 @@ col_pnrf    = "PNRF"
 col_new_venue = "New venue code for OTH"
 col_new_service = "New service code for OTH"
 
-@st.cache_data(ttl=60)
-def load_data():
-    url = f"https://drive.google.com/uc?id={FILE_ID}"
-    gdown.download(url, OUTPUT_FILE, quiet=True)
-    return pd.read_excel(OUTPUT_FILE, sheet_name=SHEET)
-
-@st.cache_data(ttl=60)
-def load_capacity():
-    return pd.read_excel(OUTPUT_FILE, sheet_name=CAP_SHEET)
+def get_source():
+    # RTCA_WORKBOOK=/path/frequenze.xlsx per leggere da file locale / share invece che da Drive
+    return shared_source("RTCA_WORKBOOK", FILE_ID, OUTPUT_FILE)
+
+# Il workbook si aggiorna in background (rtca.refresher): le sessioni leggono l'ultima
+# versione buona senza aspettare download e parse della successiva
+def get_refresher():
+    return shared_refresher(get_source())
+
+def data_version():
+    return get_refresher().current_version()
+
+# Dataset, normalizzazione e indice dei filtri vivono in rtca.core: una copia per
+# processo e per versione, condivisa fra sessioni e con app_LAN se il workbook e' lo stesso.
+# Ogni sessione ne riceve una vista (session_view; una copia solo su pandas 2.x)
+def dataset(version):
+    return load_dataset(get_source(), version)
+
+def load_normalized(version):
+    return session_view(olympic_frame(dataset(version)))
+
+def shared_mb(version):
+    return dataset(version).memo("olympic_nbytes", lambda ds: nbytes(olympic_frame(ds))) / 2**20
+
+def load_filter_index(version):
+    return olympic_index(dataset(version))
+
+def load_capacity(version):
+    return olympic_capacity(dataset(version))
+
+# Derivato dal cubo della versione prima (diff per Request ID) se e' ancora in cache
+def load_cube(version):
+    return olympic_cube(dataset(version), previous=previous_dataset(version))
+
+# Versione servita prima di questa, se ancora nella cache di processo (diff e riuso incrementale)
+def previous_dataset(version):
+    previous = get_refresher().previous(version)
+    return None if previous is None else cached_dataset(get_source(), previous)
+
+# Conflitti co-canale sull'intero periodo (tutti gli stakeholder), filtrati poi per selezione;
+# uno per versione, riusati dalla precedente se il diff non tocca le venue del periodo
+def period_conflicts(version, period):
+    conflicts = dataset_conflicts(dataset(version), period, previous=previous_dataset(version))
+    return conflicts, conflicts.attrs["total_pairs"]
+
+def figure_unchanged(filters, chart, diff, same_capacity):
+    """True se la figura di una selezione vale anche per la nuova versione (nessuna riga cambiata dentro)."""
+    if chart == "spectrum":
+        # Conflitti con canali di altri stakeholder nelle stesse venue; le proposte dipendono da tutto il periodo
+        return not filters["plan_on"] and not diff.touches(venues=filters["venues"])
+    if chart == "occupancy" and not same_capacity:
+        return False
+    return not diff.touches(venues=filters["venues"], stakeholders=None if filters["stake"] == "All" else
+                            [filters["stake"]])
+
+# Intervalli liberi per venue e periodo (ricerca dei canali liberi); aggiornato sulle sole venue
+# del diff quando la versione precedente e' ancora in cache
+def load_availability(version):
+    from rtca.availability import availability_index
+
+    return availability_index(dataset(version), previous=previous_dataset(version))
+
+# Eseguito dal refresher prima di servire una nuova versione: diff per Request ID, conflitti
+# dei due periodi, cubo dei riepiloghi, capacita', indice di disponibilita' e figure delle
+# selezioni che il diff non tocca, fuori dalle richieste
+def prepare_version(previous, new):
+    from rtca.availability import availability_index
+
+    diff = version_diff(previous, new)
+    for period in ["Olympic", "Paralympic"]:
+        dataset_conflicts(new, period, previous=previous)
+    olympic_cube(new, previous=previous)
+    availability_index(new, previous=previous)
+    same_capacity = olympic_capacity(previous).equals(olympic_capacity(new))
+    figure_cache.carry_over(previous.version, new.version,
+                            lambda filters, chart: figure_unchanged(dict(filters), chart, diff, same_capacity))
+
+# IMD3 per venue: tutte le portanti del periodo nelle venue selezionate (calcolo pesante, su richiesta)
+@st.cache_data(max_entries=4, show_spinner="Computing IMD3 products...")
+def period_imd(version, period, venues):
+    from rtca.imd import analyze
+
+    fidx = load_filter_index(version)
+    rows = fidx.select(fidx.select(None, col_period, [period]), col_venue, list(venues))
+    data = chart_rows(load_normalized(version).take(rows))
+    return analyze(data, venue_col=col_venue, request_col=col_request)
+
+# Proposte di frequenza per le richieste NOT ASSIGNED del periodo, contro l'occupazione di tutti
+@st.cache_data(max_entries=4, show_spinner="Planning NOT ASSIGNED requests...")
+def period_plan(version, period):
+    from rtca.solver import plan
+
+    rows = load_filter_index(version).select(None, col_period, [period])
+    return plan(load_normalized(version).take(rows), load_capacity(version))
+
+# Riepiloghi scritti dal batch (python -m rtca.reports); None finche' il bundle della versione non c'e'.
+# Il bundle e' per contenuto del workbook: lo stesso file da Drive o da disco trova lo stesso bundle
+@st.cache_resource(ttl=60, max_entries=64, show_spinner=False)
+def precomputed_summary(version, period, stake, ticket):
+    from rtca.reports import load_summary
+
+    digest = get_source().content_digest(version)
+    return None if digest is None else load_summary(digest, period, stake, ticket)
 
 # Custom CSS
 st.markdown("""
@@ -55,221 +169,172 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-_df = load_data()
-cap_df = load_capacity()
-
-# Step 1: Replace "OTH" values in "Venue Code" and "Service Tri Code" with their respective new values
-_df[col_venue] = _df.apply(
-    lambda row: row[col_new_venue] if row[col_venue] == "OTH" else row[col_venue],
-    axis=1
-)
-
-_df[col_service] = _df.apply(
-    lambda row: row[col_new_service] if row[col_service] == "OTH" else row[col_service],
-    axis=1
-)
+get_refresher().on_update("app.py", prepare_version)
+try:
+    data_ver = data_version()
+    _df = load_normalized(data_ver)
+    cap_df = load_capacity(data_ver)
+    fidx = load_filter_index(data_ver)
+except WorkbookSchemaError as e:
+    st.error(str(e))
+    st.stop()
 
-# Sidebar filters
+# Sidebar filters: opzioni e righe selezionate vengono dall'indice (array di posizioni)
 with st.sidebar:
     st.header("🗓️ Select Period")
     period_sel = st.selectbox("", ["Olympic", "Paralympic"], key="period_sel", index=0, label_visibility="collapsed")
     st.markdown("---")
 
     st.header("👥 Select Stakeholder")
-    df_period = _df[_df[col_period] == period_sel]
-    stakeholders = sorted(df_period[col_stake].dropna().astype(str).unique())
+    rows_period = fidx.select(None, col_period, [period_sel])
+    stakeholders = fidx.options(rows_period, col_stake)
     stake_sel = st.selectbox("", ["All"] + stakeholders, key="stake_sel", index=0, label_visibility="collapsed")
 
     st.markdown("---")
     st.header("🎫 Select Ticket")
-    df_stake = df_period if stake_sel == "All" else df_period[df_period[col_stake] == stake_sel]
-    tickets = sorted(df_stake[col_ticket].dropna().astype(str).unique()) if col_ticket in df_stake.columns else []
+    rows_stake = rows_period if stake_sel == "All" else fidx.select(rows_period, col_stake, [stake_sel])
+    tickets = fidx.options(rows_stake, col_ticket)
     ticket_sel = st.selectbox("", ["All"] + tickets, key="ticket_sel", index=0, label_visibility="collapsed")
 
     st.markdown("---")
     st.header("🔧 Select Service")
-    df_ticket = df_stake if ticket_sel == "All" else df_stake[df_stake[col_ticket].astype(str) == ticket_sel]
-    services = sorted(df_ticket[col_service].dropna().astype(str).unique())
+    rows_ticket = rows_stake if ticket_sel == "All" else fidx.select(rows_stake, col_ticket, [ticket_sel])
+    services = fidx.options(rows_ticket, col_service)
     service_sel = st.multiselect("", services, default=services, key="service_sel", label_visibility="collapsed")
 
     st.markdown("---")
     st.header("📍 Select Venue")
-    df_service = df_ticket if not service_sel else df_ticket[df_ticket[col_service].astype(str).isin(service_sel)]
-    venues = sorted(df_service[col_venue].dropna().unique())
+    rows_service = fidx.select(rows_ticket, col_service, service_sel)
+    venues = fidx.options(rows_service, col_venue)
     venue_sel = st.multiselect("", venues, default=venues, key="venue_sel", label_visibility="collapsed")
 
-# Apply filters
-filtered = _df[_df[col_period] == period_sel]
-if stake_sel != "All":
-    filtered = filtered[filtered[col_stake] == stake_sel]
-if ticket_sel != "All":
-    filtered = filtered[filtered[col_ticket].astype(str) == ticket_sel]
-if service_sel:
-    filtered = filtered[filtered[col_service].astype(str).isin(service_sel)]
-if venue_sel:
-    filtered = filtered[filtered[col_venue].isin(venue_sel)]
-
-# Prepare data
-required = {col_bx, col_ao, col_aq, col_request}
-if required - set(filtered.columns):
-    st.error(f"Missing columns: {required - set(filtered.columns)}")
-    st.stop()
-
-clean = filtered.dropna(subset=[col_ao, col_aq, col_request]).copy()
-clean['center'] = pd.to_numeric(clean[col_bx], errors='coerce')
-clean['width_mhz'] = pd.to_numeric(clean[col_ao], errors='coerce') / 1000.0
-clean['power_dBm'] = 10 * np.log10(pd.to_numeric(clean[col_aq], errors='coerce') * 1000)
-clean['req_id'] = clean[col_request].astype(str)
+    st.markdown("---")
+    plan_on = st.toggle("🧮 Propose frequencies for NOT ASSIGNED", key="plan_on")
+    scenario_on = st.toggle("🧪 What-if scenario", key="scenario_on")
+
+    # Canale libero per un'assegnazione a mano: query sull'indice di disponibilita' (sotto il millisecondo),
+    # indice caricato e query eseguita solo con la ricerca attiva
+    with st.expander("📡 Free channel finder"):
+        if st.toggle("Search free channels", key="ff_on"):
+            availability = load_availability(data_ver)
+            if not availability.venues:
+                st.info("No capacity ranges in the workbook.")
+            else:
+                in_selection = [v for v in availability.venues if v in set(map(str, venue_sel))]
+                ff_venue = st.selectbox("Venue", in_selection or availability.venues, key="ff_venue")
+                lo, hi = availability.capacity_range(ff_venue)
+                with st.form("free_channel_finder"):
+                    c1, c2 = st.columns(2)
+                    tune_from = c1.number_input("Tuning from (MHz)", value=lo, format="%.4f", key=f"ff_from_{ff_venue}")
+                    tune_to = c2.number_input("Tuning to (MHz)", value=hi, format="%.4f", key=f"ff_to_{ff_venue}")
+                    bandwidth = c1.number_input("Bandwidth (kHz)", min_value=0.1, value=25.0, key="ff_bw")
+                    step = c2.number_input("Step (kHz)", min_value=0.1, value=12.5, key="ff_step")
+                    guard = c1.number_input("Guard (kHz)", min_value=0.0, value=0.0, key="ff_guard")
+                    st.form_submit_button("Find", use_container_width=True)
+                t0 = time.perf_counter()
+                slots = availability.free_slots(ff_venue, period_sel, tune_from, tune_to, bandwidth, step, guard,
+                                                limit=50)
+                query_us = (time.perf_counter() - t0) * 1e6
+                if len(slots):
+                    st.success(f"First free channel: {slots[0]:.4f} MHz")
+                    st.dataframe({"Free centers (MHz)": slots.round(6)}, use_container_width=True, hide_index=True,
+                                 height=200)
+                else:
+                    st.warning(f"No free {bandwidth:g} kHz channel in the tuning range for {period_sel}.")
+                st.caption(f"{period_sel} · assigned channels of all stakeholders · first {len(slots)} centers · "
+                           f"query {query_us:,.0f} µs")
 
-def make_fig(data):
-    if data.empty:  # Verifica che i dati non siano vuoti prima di creare il grafico
-        return None
-    left = data['center'] - data['width_mhz']/2
-    right = data['center'] + data['width_mhz']/2
-    min_x, max_x = left.min(), right.max()
-    min_y, max_y = data['power_dBm'].min(), data['power_dBm'].max()
-    dx = max((max_x - min_x) * 0.05, 1)
-    dy = max((max_y - min_y) * 0.05, 1)
-    fig = go.Figure()
-    palette = px.colors.qualitative.Dark24
-    for i, stake in enumerate(sorted(data[col_stake].astype(str).unique())):
-        grp = data[data[col_stake] == stake]
-        fig.add_trace(go.Bar(
-            x=grp['center'], y=grp['power_dBm'], width=grp['width_mhz'], name=stake,
-            marker_color=palette[i % len(palette)], opacity=0.8,
-            marker_line_color='white', marker_line_width=1,
-            customdata=list(zip(grp['req_id'], grp[col_ao])),
-            hovertemplate='Request ID: %{customdata[0]}<br>Freq: %{x} MHz<br>Bandwidth: %{customdata[1]} kHz<br>Power: %{y:.1f} dBm<extra></extra>'
-        ))
-    fig.update_layout(
-        template='plotly_dark', barmode='overlay', dragmode='zoom',
-        plot_bgcolor='#111', paper_bgcolor='#111', font_color='#FFF',
-        xaxis=dict(range=[min_x - dx, max_x + dx], showgrid=True, gridcolor='rgba(255,255,255,0.5)', gridwidth=1,
-                   minor=dict(showgrid=True, gridcolor='rgba(255,255,255,0.2)', gridwidth=1),
-                   title=dict(text='<b>Frequency (MHz)</b>', font=dict(size=20, color='#FFF'))),
-        yaxis=dict(range=[min_y, max_y], showgrid=True, gridcolor='rgba(255,255,255,0.5)', gridwidth=1,
-                   minor=dict(showgrid=True, gridcolor='rgba(255,255,255,0.2)', gridwidth=1),
-                   title=dict(text='<b>Power (dBm)</b>', font=dict(size=20, color='#FFF'))),
-        legend=dict(font=dict(color='#FFF'))
-    )
-    return fig
-
-def stats_fig(df_all):
-    fig = None
-    tmp_status_fig = None
-    
-    # Verifica se ci sono dati disponibili prima di generare i grafici
-    if df_all.empty:
-        return None, None  # Se i dati sono vuoti, non restituire grafici
-    
-    # Filtraggio delle righe "NOT ASSIGNED" per il diagramma principale
-    is_mod = df_all[col_pnrf].astype(str).str.strip().eq("MoD") if col_pnrf in df_all.columns else pd.Series(False, index=df_all.index)
-    mod_coord_count = int(is_mod.sum())
-    base = df_all.loc[~is_mod]
-    
-    # Righe "NOT ASSIGNED" per il diagramma principale
-    not_assigned_base = base[base[col_bx].isna()]
-    
-    assigned_count     = int(base[col_bx].notna().sum())
-    not_assigned_count = int(not_assigned_base[col_bx].isna().sum())
-
-    stats = pd.DataFrame({
-        'Status': ['ASSIGNED', 'NOT ASSIGNED', 'MoD COORDINATION'],
-        'Count':  [assigned_count, not_assigned_count, mod_coord_count]
-    })
-
-    fig = px.pie(
-        stats,
-        names='Status', values='Count', color='Status', hole=0.6, template='plotly',
-        color_discrete_map={
-            'ASSIGNED': '#2ECC71',
-            'NOT ASSIGNED': '#E74C3C',
-            'MoD COORDINATION': '#F1C40F'
-        }
-    )
-    fig.update_traces(
-        textinfo='percent',
-        texttemplate='%{percent:.1%} (%{value})',
-        textfont=dict(size=18),
-        textposition='outside',
-        pull=[0.1]*len(stats),
-        marker=dict(line=dict(color='#FFF', width=2))
-    )
-    fig.update_layout(
-        margin=dict(l=20, r=20, t=20, b=20),
-        legend=dict(title='', orientation='h', x=0.5, xanchor='center', y=1.2, yanchor='bottom', font=dict(size=14)),
-        showlegend=True
-    )
-
-    # Second pie chart for Stato of NOT ASSIGNED
-    if not not_assigned_base.empty and 'Stato' in not_assigned_base.columns:
-        # Sostituire i NaN con "Not Analysed" per il Stato
-        not_assigned_base['Stato'] = not_assigned_base['Stato'].fillna('Not Analysed')
-        
-        # Calcolare la frequenza delle voci in Stato per le righe "NOT ASSIGNED"
-        tmp_status_counts = not_assigned_base['Stato'].value_counts()
-        tmp_status_stats = pd.DataFrame({
-            'Status': tmp_status_counts.index,
-            'Count': tmp_status_counts.values
-        })
-
-        tmp_status_fig = px.pie(
-            tmp_status_stats,
-            names='Status', values='Count', hole=0.6, template='plotly',
-            color='Status', 
-            color_discrete_map={status: px.colors.qualitative.Set1[i % len(tmp_status_stats['Stato'])] for i, status in enumerate(tmp_status_stats['Stato'].unique())}
-        )
-        tmp_status_fig.update_traces(
-            textinfo='percent',
-            texttemplate='%{percent:.1%} (%{value})',
-            textfont=dict(size=18),
-            textposition='outside',
-            marker=dict(line=dict(color='#FFF', width=2))
-        )
-        tmp_status_fig.update_layout(
-            margin=dict(l=20, r=20, t=20, b=20),
-            legend=dict(title='', orientation='h', x=0.5, xanchor='center', y=1.2, yanchor='bottom', font=dict(size=14)),
-            showlegend=True
-        )
-
-    return fig, tmp_status_fig
+# Apply filters
+with timings.stage("app.filter") as filter_stage:
+    filtered = _df.take(fidx.select(rows_service, col_venue, venue_sel))
+
+    # Prepare data
+    required = {col_bx, col_ao, col_aq, col_request}
+    if required - set(filtered.columns):
+        st.error(f"Missing columns: {required - set(filtered.columns)}")
+        st.stop()
+
+    # center / width_mhz / power_dBm / req_id sono gia' calcolati nel dataset (rtca.core)
+    clean = chart_rows(filtered, col_ao, col_aq, col_request)
+
+    # Stato, KO per priorita' e classifica: roll-up del cubo dei conteggi per la stessa selezione della sidebar
+    summary_sel = {
+        col_period: [period_sel],
+        col_stake: None if stake_sel == "All" else [stake_sel],
+        col_ticket: None if ticket_sel == "All" else [ticket_sel],
+        col_service: service_sel,
+        col_venue: venue_sel,
+    }
+    summary_view = load_cube(data_ver).rollup(summary_sel)
+    filter_stage["rows"] = len(filtered)
+
+# Solo le coppie che coinvolgono almeno una richiesta della selezione corrente
+conflicts_all, conflicts_total = period_conflicts(data_ver, period_sel)
+conflicts = involving(conflicts_all, clean[col_request], venue_sel)
+
+# Proposte del solver limitate alle richieste della selezione corrente
+proposals = None
+if plan_on:
+    proposals = period_plan(data_ver, period_sel)
+    proposals = proposals[proposals["Request ID"].isin(filtered[col_request])]
+
+# Figure in cache per (versione dei dati, filtri della sidebar, grafico): un rerun che non cambia
+# i filtri (es. il selectbox Stato della tabella KO) non ricostruisce ne' riserializza nulla
+fig_filters = filter_key(period=period_sel, stake=stake_sel, ticket=ticket_sel, services=service_sel,
+                         venues=venue_sel)
+
+def cached_fig(chart, build, **extra):
+    return figure_cache.get(data_ver, fig_filters + filter_key(**extra), chart, build)
+
+def plot(chart, fig, **kwargs):
+    # st.plotly_chart cronometrato; la dimensione solo per le CachedFigure, il cui JSON e' gia' pronto
+    nbytes = len(fig.to_json()) if isinstance(fig, CachedFigure) else None
+    with timings.stage(f"app.render.{chart}", nbytes=nbytes):
+        return st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+def make_fig(data, x_range=None, conflicts=None, proposals=None):
+    if proposals is not None:
+        from rtca.solver import PROPOSED
+
+        proposals = proposals[proposals['Result'] == PROPOSED]
+    return spectrum_figure(data, col_stake, col_ao, x_range=x_range, conflicts=conflicts, proposals=proposals,
+                           opacity=0.8, title_size=20)
+
+def spectrum_zoom_controls(event, x_range, info, build_ms, payload):
+    """Box select sul grafico = zoom server-side sul range (con i singoli canali); Reset torna alla vista intera."""
+    box = event.selection.box if event is not None and event.selection else []
+    if box and box[0].get('x'):
+        new_range = tuple(sorted(box[0]['x']))
+        if new_range != x_range:
+            st.session_state.spectrum_zoom = new_range
+            st.session_state.spectrum_gen = st.session_state.get('spectrum_gen', 0) + 1  # azzera la selezione
+            st.rerun()
+    c1, c2 = st.columns([6, 1])
+    with c1:
+        mode = "individual channels" if info['mode'] == 'channels' else "frequency bins (drag a box to zoom in)"
+        st.caption(f"{info['bars']:,} bars for {info['rows']:,} channels, {mode} · "
+                   f"payload {payload:,.0f} kB · build {build_ms:.0f} ms")
+    with c2:
+        if x_range is not None and st.button("Reset zoom", use_container_width=True):
+            st.session_state.spectrum_zoom = None
+            st.session_state.spectrum_gen = st.session_state.get('spectrum_gen', 0) + 1
+            st.rerun()
+
+def stats_fig(view):
+    # ASSIGNED / NOT ASSIGNED / MoD COORDINATION e Stato dei NOT ASSIGNED (None, None senza dati)
+    from rtca.reports import status_figures
+
+    return status_figures(view)
 
 def build_occupancy_chart(clean_df, cap_df):
-    assigned_bw = clean_df.groupby(col_venue)["width_mhz"].sum()
-    venues_list = assigned_bw.index.tolist()
-    usage_list = []
-    cap_selected = cap_df[cap_df["Venue"].isin(venues_list)].copy()
-    for _, r in cap_selected.iterrows():
-        venue = r['Venue']
-        f_from = float(r['Freq. From [MHz]'])
-        f_to = float(r['Freq. To [MHz]'])
-        tot = float(r['Tot MHz'])
-        assigns = clean_df[clean_df[col_venue] == venue]
-        overlaps = []
-        for _, a in assigns.iterrows():
-            left = a['center'] - a['width_mhz']/2
-            right = a['center'] + a['width_mhz']/2
-            start = max(left, f_from)
-            end = min(right, f_to)
-            if end > start:
-                overlaps.append((start, end))
-        overlaps_sorted = sorted(overlaps, key=lambda x: x[0])
-        merged = []
-        for interval in overlaps_sorted:
-            if not merged or interval[0] > merged[-1][1]:
-                merged.append(list(interval))
-            else:
-                merged[-1][1] = max(merged[-1][1], interval[1])
-        assigned_overlap = sum(end - start for start, end in merged)
-        occupancy_pct = (assigned_overlap / tot * 100) if tot > 0 else 0
-        usage_list.append({'Venue': venue, 'Range': f"{f_from}-{f_to} MHz", 'Occupancy': occupancy_pct})
-    usage_df = pd.DataFrame(usage_list)
-    if not usage_df.empty and 'Occupancy' in usage_df.columns:
-        usage_df = usage_df[usage_df['Occupancy'] > 0]
+    return occupancy_fig(occupancy(clean_df, cap_df, venue_col=col_venue))
+
+def occupancy_fig(usage_df):
+    usage_df = usage_df[usage_df['Occupancy'] > 0]
     if usage_df.empty:
         return None
     occ_values = usage_df['Occupancy'].astype(float).fillna(0).tolist()
-    labels = [f"{row['Venue']} ({row['Range']})" for _, row in usage_df.iterrows()]
+    labels = (usage_df['Venue'].astype(str) + " (" + usage_df['Range'] + ")").tolist()
     fig2 = go.Figure(go.Bar(x=occ_values, y=labels, orientation='h',
                             marker=dict(color=occ_values, colorscale='RdYlGn_r', cmin=0, cmax=100,
                                         colorbar=dict(title='Occupancy %', thickness=15, lenmode='fraction', len=0.75)),
@@ -279,38 +344,292 @@ def build_occupancy_chart(clean_df, cap_df):
                        margin=dict(l=100, r=50, t=20, b=50))
     return fig2
 
+def heatmap_fig(data, bin_mhz, value, x_range=None):
+    """Venue x bin di frequenza (una traccia), con la larghezza di bin effettivamente usata."""
+    from rtca.heatmap import occupancy_grid
+
+    venues, edges, grid = occupancy_grid(data, bin_mhz, value, x_range=x_range, venue_col=col_venue)
+    fig = venue_heatmap(venues, edges, grid, value)
+    return fig, {"bin_mhz": edges[1] - edges[0] if len(edges) > 1 else bin_mhz, "cells": grid.size}
+
+def ko_priority_fig(view):
+    """% di NOT ASSIGNED per priorita' (1-4), con il numero assoluto sopra le barre."""
+    return ko_priority_bar(view.ko_by_priority())
+
+def ko_ranking_fig(view):
+    """Stakeholder ordinati per % di richieste NOT ASSIGNED."""
+    return ko_ranking_bar(view.ko_ranking(col_stake), col_stake)
+
+# Scenario what-if della sessione (rtca.scenario): modifiche sopra la versione caricata, mai sul dataset
+# condiviso. Delta, cubo modificato e occupazione si ricalcolano solo quando cambiano le modifiche, e
+# con una modifica in piu' solo per lei (celle del cubo e venue toccate); l'occupazione di base della
+# selezione si calcola una volta per filtri
+def scenario_state():
+    from rtca import scenario
+
+    key = (data_ver, st.session_state.get("scenario_rev", 0))
+    cached = st.session_state.get("scenario_delta")
+    if cached is None or cached[0] != key:
+        edits = st.session_state.scenario_edits
+        if cached is not None and cached[0][0] == data_ver and cached[1].n_edits == len(edits) - 1:
+            parent = cached[1]   # solo l'ultima modifica
+            delta = scenario.apply_edits(dataset(data_ver), edits[-1:], base=parent)
+            cube = scenario.scenario_cube(dataset(data_ver), delta, base=cached[2])
+        else:
+            parent, delta = None, scenario.apply_edits(dataset(data_ver), edits)
+            cube = scenario.scenario_cube(dataset(data_ver), delta)
+        cached = (key, delta, cube, parent)
+        st.session_state.scenario_delta = cached
+    return cached[1], cached[2], cached[3]
+
+def selection_occupancy():
+    key = (data_ver, fig_filters)
+    cached = st.session_state.get("scenario_base")
+    if cached is None or cached[0] != key:
+        cached = (key, occupancy(clean, cap_df, venue_col=col_venue))
+        st.session_state.scenario_base = cached
+    return cached[1]
+
+def scenario_occupancy(delta, parent):
+    from rtca import scenario
+
+    key = (data_ver, fig_filters)
+    cached = st.session_state.get("scenario_usage")
+    if cached is None or cached[0] != key or cached[1] is not delta:
+        if cached is not None and cached[0] == key and parent is not None and cached[1] is parent:
+            usage = scenario.patch_occupancy(cached[2], clean, delta, summary_sel, cap_df, venue_col=col_venue,
+                                             venues=delta.step_venues)
+        else:
+            usage = scenario.patch_occupancy(selection_occupancy(), clean, delta, summary_sel, cap_df,
+                                             venue_col=col_venue)
+        cached = (key, delta, usage)
+        st.session_state.scenario_usage = cached
+    return cached[2]
+
+def add_edit(edit):
+    st.session_state.scenario_edits.append(edit)
+    st.session_state.scenario_rev = st.session_state.get("scenario_rev", 0) + 1
+
+def scenario_forms():
+    from rtca import scenario
+
+    c1, c2, c3 = st.columns(3)
+    with c1.form("scenario_remove"):
+        st.markdown("**Remove requests**")
+        stake = st.selectbox("Stakeholder", ["Any"] + stakeholders)
+        venue = st.selectbox("Venue", ["Any"] + venues)
+        priority = st.selectbox("Priority", ["Any"] + PRIORITIES)
+        if st.form_submit_button("Remove", use_container_width=True):
+            if stake == venue == priority == "Any":
+                st.warning("Choose a stakeholder, a venue or a priority.")
+            else:
+                add_edit(scenario.remove(stake=None if stake == "Any" else stake, venue=None if venue == "Any" else venue,
+                                         priority=None if priority == "Any" else priority, period=period_sel))
+    with c2.form("scenario_retune"):
+        st.markdown("**Retune a request**")
+        request = st.text_input("Request ID")
+        center = st.number_input("New frequency (MHz)", min_value=0.0, value=450.0, format="%.4f")
+        if st.form_submit_button("Retune", use_container_width=True):
+            if scenario.has_request(dataset(data_ver), request.strip()):
+                add_edit(scenario.retune(request.strip(), center))
+            else:
+                st.warning(f"Unknown Request ID: {request!r}")
+    with c3.form("scenario_add"):
+        st.markdown("**Add a request**")
+        request = st.text_input("Request ID", value=f"WHATIF-{len(st.session_state.scenario_edits) + 1}")
+        a1, a2 = st.columns(2)
+        venue = a1.selectbox("Venue", venues)
+        stake = a2.selectbox("Stakeholder", stakeholders)
+        service = a1.selectbox("Service", services)
+        priority = a2.selectbox("Priority", PRIORITIES)
+        center = a1.number_input("Frequency (MHz)", min_value=0.0, value=450.0, format="%.4f")
+        bandwidth = a2.number_input("Bandwidth (kHz)", min_value=0.1, value=25.0)
+        power = a1.number_input("Power (W)", min_value=0.0, value=5.0)
+        if st.form_submit_button("Add", use_container_width=True):
+            add_edit(scenario.add(request.strip(), venue, stake, service, period_sel, priority, center, bandwidth, power))
+
+def scenario_section():
+    """Rimozioni, spostamenti e aggiunte in sessione; stato, KO per priorita' e occupazione ricalcolati sul delta."""
+    from rtca import scenario
+    from rtca.reports import status_figure
+
+    st.subheader("🧪 What-if Scenario")
+    edits = st.session_state.setdefault("scenario_edits", [])
+    scenario_forms()
+    if not edits:
+        st.info("Add an edit to compare a scenario with the loaded data.")
+        return
+    for i, edit in enumerate(edits, 1):
+        st.caption(f"{i}. {scenario.describe(edit)}")
+    c1, c2, _ = st.columns([1, 1, 4])
+    if c1.button("Undo last edit", use_container_width=True):
+        edits.pop()
+        st.session_state.scenario_rev = st.session_state.get("scenario_rev", 0) + 1
+        st.rerun()
+    if c2.button("Clear scenario", use_container_width=True):
+        edits.clear()
+        st.session_state.scenario_rev = st.session_state.get("scenario_rev", 0) + 1
+        st.rerun()
+
+    t0 = time.perf_counter()
+    with timings.stage("scenario.recompute") as stage:
+        delta, cube, parent = scenario_state()
+        view = cube.rollup(summary_sel)
+        usage = scenario_occupancy(delta, parent)
+        stage["rows"] = len(delta.removed) + len(delta.added)
+    before = summary_view.status_counts().set_index('Status')['Count']
+    after = view.status_counts().set_index('Status')['Count']
+    for col, status in zip(st.columns(3), [ASSIGNED, NOT_ASSIGNED, MOD_COORDINATION]):
+        col.metric(status, f"{after[status]:,}", f"{after[status] - before[status]:+,}", delta_color="off")
+    st.caption(f"{len(delta.removed):,} rows removed and {len(delta.added):,} added "
+               f"across {len(delta.venues):,} venues · {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    c1, c2 = st.columns(2)
+    with timings.stage("scenario.figures"):
+        pie, priority_fig, occ = status_figure(view), ko_priority_fig(view), occupancy_fig(usage)
+    with c1:
+        if pie is not None:
+            plot("scenario_status", pie, key="scenario_status")
+        else:
+            st.info("No requests left in the scenario for the current filters.")
+    with c2:
+        plot("scenario_ko_priority", priority_fig, key="scenario_ko_priority")
+    if occ is not None:
+        plot("scenario_occupancy", occ, key="scenario_occupancy")
+
+def changes_panel():
+    """Cosa e' cambiato rispetto alla versione servita prima (stessa sessione del server)."""
+    previous = previous_dataset(data_ver)
+    if previous is None:
+        return
+    diff = version_diff(previous, dataset(data_ver))
+    counts = diff.summary()
+    label = "🆕 What changed since the last refresh" + ("" if diff else " (nothing)")
+    with st.expander(label):
+        st.caption(f"Since `{previous.version}`: {counts['added']:,} added · {counts['removed']:,} removed · "
+                   f"{counts['changed_rows']:,} changed requests ({counts['changed_cells']:,} cells) · "
+                   f"{counts['venues']:,} venues and {counts['stakeholders']:,} stakeholders touched")
+        if diff:
+            if diff.touches(venues=venue_sel, stakeholders=None if stake_sel == "All" else [stake_sel]):
+                st.caption("The current selection may include changed requests.")
+            st.dataframe(diff.table(limit=1000), use_container_width=True, hide_index=True)
+
 def main_display():
+    changes_panel()
+
     # First row: Spectrum plot
-    fig = make_fig(clean)
+    x_range = st.session_state.get('spectrum_zoom')
+    t0 = time.perf_counter()
+    fig, info = cached_fig("spectrum", lambda: make_fig(clean, x_range, conflicts, proposals),
+                           x_range=x_range, plan_on=plan_on)
+    build_ms = (time.perf_counter() - t0) * 1000
     if fig is not None:
-        st.plotly_chart(fig, use_container_width=True)
+        event = plot("spectrum", fig, on_select="rerun", selection_mode="box",
+                     key=f"spectrum_{st.session_state.get('spectrum_gen', 0)}")
+        spectrum_zoom_controls(event, x_range, info, build_ms, payload_kb(fig))
     else:
         st.info(f"No data for {st.session_state.period_sel}")
 
+    # Venue x frequenza: tutte le assegnazioni in una griglia, stesso range dello zoom dello spettro
+    st.markdown("---")
+    st.subheader("🌡️ Venue × Frequency Occupancy")
+    from rtca.heatmap import VALUES, default_bin
+
+    c1, c2 = st.columns([1, 2])
+    # Larghezza iniziale dall'estensione dei canali: niente bin allargati al primo render
+    if "heatmap_bin" not in st.session_state:
+        st.session_state.heatmap_bin = default_bin(clean)
+    bin_mhz = c1.number_input("Bin width (MHz)", min_value=0.0125, step=0.5, format="%.4f", key="heatmap_bin")
+    value = c2.radio("Value", list(VALUES), format_func=VALUES.get, horizontal=True, key="heatmap_value")
+    heat_fig, heat_info = cached_fig("heatmap", lambda: heatmap_fig(clean, bin_mhz, value, x_range),
+                                     x_range=x_range, bin_mhz=bin_mhz, value=value)
+    if heat_fig is None:
+        st.info("No assigned channels for the current filters.")
+    else:
+        plot("heatmap", heat_fig)
+        if heat_info["bin_mhz"] > bin_mhz + 1e-9:
+            st.caption(f"Bins widened to {heat_info['bin_mhz']:.4f} MHz to keep the grid within the display limit.")
+
+    # Co-channel conflicts (stessa venue, canali sovrapposti)
+    st.markdown("---")
+    st.subheader("⚠️ Co-channel Conflicts")
+    if conflicts.empty:
+        st.success("No overlapping channels at the same venue for the current filters.")
+    else:
+        if len(conflicts_all) < conflicts_total:
+            st.caption(f"Showing the first {len(conflicts_all):,} of {conflicts_total:,} overlapping pairs in the period.")
+        st.dataframe(conflicts[CONFLICT_COLUMNS], use_container_width=True, hide_index=True)
+
+    # Intermodulazione di terzo ordine
+    st.markdown("---")
+    st.subheader("📶 Intermodulation (IMD3)")
+    if st.toggle("Compute 2f1−f2 and f1+f2−f3 products for the selected venues", key="imd_on"):
+        from rtca.imd import victims_summary
+
+        all_hits, totals = period_imd(data_ver, period_sel, tuple(sorted(clean[col_venue].dropna().astype(str).unique())))
+        # Vittime nella selezione corrente; le portanti che generano i prodotti possono essere di chiunque
+        hits = all_hits[all_hits["Victim Request ID"].isin(clean[col_request])]
+        if hits.empty:
+            st.success("No assigned channel is hit by a third-order product.")
+        else:
+            if len(all_hits) < sum(totals.values()):
+                st.caption(f"{sum(totals.values()):,} hits in total; the busiest venues are truncated.")
+            st.dataframe(victims_summary(hits), use_container_width=True, hide_index=True)
+            with st.expander("All products"):
+                st.dataframe(hits, use_container_width=True, hide_index=True)
+
+    # Proposte del solver (layer verde tratteggiato sullo spettro)
+    if proposals is not None:
+        from rtca.solver import INVALID, NO_FIT, PLAN_COLUMNS, PROPOSED
+
+        st.markdown("---")
+        st.subheader("🧮 Channel Assignment Proposals")
+        if proposals.empty:
+            st.info("No NOT ASSIGNED requests for the current filters.")
+        else:
+            outcome = proposals['Result'].value_counts()
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Proposed", f"{outcome.get(PROPOSED, 0):,}")
+            c2.metric("No free channel", f"{outcome.get(NO_FIT, 0):,}")
+            c3.metric("Incomplete data", f"{outcome.get(INVALID, 0):,}")
+            st.dataframe(proposals[PLAN_COLUMNS], use_container_width=True, hide_index=True)
+
+    if scenario_on:
+        st.markdown("---")
+        scenario_section()
+
     # Second row: Pie chart for main status on the left, Stato pie chart on the right
     st.markdown("---")
     col1, col_sep, col2 = st.columns([3, 0.02, 3])  # Larger columns for the pie charts
 
+    # Con servizi e venue di default la combinazione puo' essere nel bundle pre-calcolato
+    from rtca.reports import stato_figure, status_figure
+
+    pre = None
+    if set(service_sel) == set(services) and set(venue_sel) == set(venues):
+        pre = precomputed_summary(data_ver, period_sel, stake_sel, ticket_sel)
+
     with col1:
-        pie, tmp_status_pie = stats_fig(filtered)
+        pie, _ = cached_fig("status", lambda: pre.get("status") if pre is not None else status_figure(summary_view))
+        tmp_status_pie, _ = cached_fig("stato", lambda: pre.get("stato") if pre is not None else stato_figure(summary_view))
         if pie is not None:
-            st.plotly_chart(pie, use_container_width=True)
+            plot("status", pie)
         else:
             st.info("No data available for the selected filters.")
 
     with col2:
         if tmp_status_pie is not None:
-            st.plotly_chart(tmp_status_pie, use_container_width=True)
+            plot("stato", tmp_status_pie)
         else:
             st.info("No Stato data for the selected filters.")
     
     # Third row: Capacity plot
     st.markdown("---")
-    occ_fig = build_occupancy_chart(clean, cap_df)
+    occ_fig, _ = cached_fig("occupancy", lambda: build_occupancy_chart(clean, cap_df))
     if occ_fig is None:
         st.info("No capacity/occupancy data for the current filters.")
     else:
-        st.plotly_chart(occ_fig, use_container_width=True)
+        plot("occupancy", occ_fig)
 
     # Fourth row: KO table
     st.markdown("---")
@@ -321,143 +640,78 @@ def main_display():
     selected_status = st.selectbox("", tmp_status_options)
 
     # Filter KO table based on Stato
-    ko_df = filtered[filtered[col_bx].isna() & ~filtered[col_pnrf].str.strip().eq("MoD")].copy()
+    ko_df = not_assigned(filtered, col_bx, col_pnrf)
 
     if selected_status != 'All':
         ko_df = ko_df[ko_df['Stato'] == selected_status]
 
     # Selecting only the specified columns
-    ko_df = ko_df[['Request ID', 'Service Tri Code', 'Venue Code', 'Usage Type', 'Transmission Type', 'Is Simplex',
-                   'Tuning Range From', 'Tuning Range To', 'Channel Bandwidth (kHz)', 'Tuning Step (kHz)',
-                   'Transmission Power (W)', 'Notes', 'Note ottimizzazione', 'IMD step', 'Note di lavorazione']]
+    ko_df = ko_df[KO_COLUMNS]
 
     if ko_df.empty:
         st.info("No failed assignments for the current filters.")
     else:
-        st.dataframe(ko_df, use_container_width=True)
+        from rtca.ui import paged_table
+
+        paged_table(ko_df, "ko_table", "failed_assignments")
 
    # --- Static Stats on raw data ---
     st.markdown("---")
     
-    # Filtriamo i KO
-    ko_df = filtered[filtered[col_bx].isna() & ~filtered[col_pnrf].str.strip().eq("MoD")].copy()
-    
-    # Totale richieste per priorità
-    total_per_priority = filtered.groupby('Priority Indicator per Stakeholder').size().reset_index(name='Total')
-    
-    # Conteggio KO per priorità
-    ko_counts = ko_df['Priority Indicator per Stakeholder'].value_counts().reset_index()
-    ko_counts.columns = ['Priority', 'Count']
-    
-    # Convertiamo Priority in stringa per uniformità
-    ko_counts['Priority'] = ko_counts['Priority'].astype(str)
-    total_per_priority['Priority Indicator per Stakeholder'] = total_per_priority['Priority Indicator per Stakeholder'].astype(str)
-    
-    # Uniamo e calcoliamo la percentuale
-    ko_counts = ko_counts.merge(total_per_priority, left_on='Priority', right_on='Priority Indicator per Stakeholder', how='left')
-    ko_counts['Percentage'] = (ko_counts['Count'] / ko_counts['Total'] * 100).round(2)
-    
-    # Assicuriamoci che tutte le priorità da 1 a 4 siano presenti
-    all_priorities = ['1', '2', '3', '4']
-    for p in all_priorities:
-        if p not in ko_counts['Priority'].values:
-            ko_counts = pd.concat([ko_counts, pd.DataFrame({'Priority':[p], 'Count':[0], 'Priority Indicator per Stakeholder':[p], 'Total':[total_per_priority['Total'].mean()], 'Percentage':[0]})], ignore_index=True)
-    
-    # Palette colori diversa per ogni barra
-    palette = px.colors.qualitative.Set3
-    colors = {p: palette[i % len(palette)] for i, p in enumerate(all_priorities)}
-    
-    # Creiamo il grafico a barre senza colorbar
-    fig_ko_priority = px.bar(
-        ko_counts,
-        x='Priority',
-        y='Percentage',
-        text='Count',  # numero assoluto sopra la barra
-        labels={
-            'Priority': 'Priority',
-            'Percentage': '% NOT ASSIGNED'
-        },
-        category_orders={'Priority': all_priorities}  # asse X fisso
-    )
-    
-    # Applichiamo colori diversi manualmente e formattazione testo
-    fig_ko_priority.update_traces(
-        marker_color=[colors[str(p)] for p in ko_counts['Priority']],  # <- convertiamo in str
-        texttemplate='<b>%{text}</b>',
-        textposition='outside',
-        textfont_size=18,  # numero sopra le barre più grande
-        width=0.4
-    )
-    
-    # Layout
-    fig_ko_priority.update_layout(
-        xaxis_title='Stakeholder Priority',
-        yaxis_title='% NOT ASSIGNED',
-        yaxis=dict(
-        range=[0, ko_counts['Percentage'].max() * 1.2]  # aumento del 20% sopra il valore massimo
-        ),
-        showlegend=False,
-        xaxis=dict(
-            tickmode='array',
-            tickvals=all_priorities,
-            ticktext=all_priorities,
-        )
-    )
-    
-    # Mostriamo il plot
-    st.plotly_chart(fig_ko_priority, use_container_width=True)
+    priority_fig, _ = cached_fig("ko_priority", lambda: pre.get("ko_priority") if pre is not None
+                                 else ko_priority_fig(summary_view))
+    ranking_fig, _ = cached_fig("ranking", lambda: pre.get("ranking") if pre is not None
+                                else ko_ranking_fig(summary_view))
+    if priority_fig is not None:
+        plot("ko_priority", priority_fig)
 
     st.markdown("---")    
     st.subheader("🏅 Stakeholder <NOT ASSIGNED> Ranking (%)")
-    # Calcoliamo il totale richieste per stakeholder
-    total_requests = filtered.groupby('Stakeholder Business ID').size().reset_index(name='total_count')
-    
-    # Conteggio KO per Stakeholder
-    ko_global_counts = ko_df.groupby('Stakeholder Business ID').size().reset_index(name='KO_count')
-    
-    # Uniamo totale e KO
-    ko_merged = ko_global_counts.merge(total_requests, on='Stakeholder Business ID', how='right').fillna(0)
-
-    # Filtriamo gli stakeholder con KO_count > 0
-    ko_merged = ko_merged[ko_merged['KO_count'] > 0]
-
-    # Percentuale di KO
-    ko_merged['KO_percent'] = (ko_merged['KO_count'] / ko_merged['total_count'] * 100).round(1)
-    
-    # Ordiniamo in base alla percentuale decrescente
-    ko_merged = ko_merged.sort_values(by='KO_percent', ascending=False)
-    
-    # Dimensione dinamica del grafico in base al numero di stakeholder
-    height_fig = max(400, ko_merged.shape[0] * 30)  # almeno 400px, poi 30px per ogni stakeholder
-
-    # Creiamo la stringa da mostrare sulle barre
-    ko_merged['label_text'] = ko_merged['KO_count'].astype(int).astype(str) + " (" + ko_merged['KO_percent'].astype(str) + "%)"
-    
-    # Facciamo il grafico a barre orizzontali
-    fig_global_ko = go.Figure(go.Bar(
-        x=ko_merged['KO_percent'],
-        y=ko_merged['Stakeholder Business ID'],
-        orientation='h',
-        marker_color='#EF553B',
-        text=ko_merged['label_text'],
-        textposition='outside',
-        textfont=dict(size=14)
-    ))
-    
-    fig_global_ko.update_layout(
-        xaxis=dict(
-            showticklabels=False,  # nasconde l'asse X
-            showgrid=False,
-            zeroline=False
-        ),
-        yaxis=dict(
-            autorange='reversed'  # mette il più alto in cima
-        ),
-        margin=dict(l=150, r=50, t=50, b=50),
-        height=height_fig
-    )
-    
-    st.plotly_chart(fig_global_ko, use_container_width=True)
+    if ranking_fig is not None:
+        plot("ranking", ranking_fig)
+    if pre is not None:
+        st.caption("⚡ Summary charts served from the precomputed report bundle.")
+
+    timings.record("app.rerun", time.perf_counter() - rerun_t0, rows=len(filtered))
+    timings.record_once("app.first_render", time.perf_counter() - rerun_t0, rows=len(filtered))
+
+    # Contatori della cache delle figure (processo intero, tutte le sessioni), per gli operatori
+    with st.sidebar:
+        st.markdown("---")
+        # Eta' dei dati ed esito dell'ultimo refresh in background
+        refresh = get_refresher().status()
+        now = time.time()
+        if refresh["outcome"] == FAILED:
+            st.warning(f"Last refresh failed ({refresh['error']}); showing data loaded "
+                       f"{age_text(now - refresh['loaded_at'])} ago.")
+        with st.expander("🔄 Data refresh"):
+            st.caption(f"Version `{refresh['version']}` · loaded {age_text(now - refresh['loaded_at'])} ago · "
+                       f"last check {age_text(now - refresh['checked_at'])} ago: {refresh['outcome']} "
+                       f"({refresh['duration_s']:.1f} s) · every {refresh['interval']:.0f} s")
+            if st.button("Refresh now", key="refresh_now"):
+                get_refresher().trigger()
+                st.caption("Refresh requested; the new version is shown once loaded.")
+        with st.expander("⚙️ Figure cache"):
+            stats = figure_cache.stats()
+            st.caption(f"{stats['hits']:,} hits · {stats['misses']:,} misses ({stats['hit_rate']:.0%} hit rate) · "
+                       f"{stats['entries']:,} figures, {stats['bytes'] / 2**20:.1f} / {stats['max_bytes'] / 2**20:.0f} MB"
+                       f" · {stats['evictions']:,} evictions")
+            st.dataframe([{"Chart": chart, "Hits": c["hits"], "Misses": c["misses"]}
+                          for chart, c in stats["charts"].items()], use_container_width=True, hide_index=True)
+        # Il dataset e' uno per processo; la sessione tiene solo le righe della selezione corrente
+        with st.expander("🧠 Memory"):
+            st.caption(f"Shared dataset: {shared_mb(data_ver):,.1f} MB, once per process · this session: "
+                       f"{(nbytes(filtered) + nbytes(clean)) / 2**20:,.1f} MB "
+                       f"({len(filtered):,} selected rows)")
+        # Tempi per fase (nascosto: ?diagnostics=1 nell'URL)
+        if st.query_params.get("diagnostics"):
+            with st.expander("⏱️ Diagnostics", expanded=True):
+                st.caption("Last and percentile timings per stage (ms), over the last "
+                           f"{timings.window:,} samples of this server process.")
+                st.dataframe(timings.summary(), use_container_width=True, hide_index=True)
+                c1, c2 = st.columns(2)
+                c1.download_button("Prometheus", timings.prometheus(), "rtca_metrics.prom", "text/plain")
+                c2.download_button("JSON lines", timings.jsonl(), "rtca_timings.jsonl", "application/jsonl")
         
 if __name__ == "__main__":
     main_display()
@@ -1,10 +1,23 @@
 # app.py
+import time
+
+# Tempo dell'intero rerun (diagnostica, rtca.timing); parte prima degli import, che costano solo al
+# primo rerun del processo. plotly e i moduli di una sezione si importano nella sezione che li usa
+rerun_t0 = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import gdown
-import plotly.graph_objects as go
-import plotly.express as px
+
+from rtca.columns import CENTER, POWER_DBM, REQ_ID, SHEET_ALL_NP, WIDTH_MHZ
+from rtca.core import (
+    FINAL_UPPER, VersionUnavailable, breakdown, cached_dataset, chart_rows, lan_columns, lan_index, lan_table,
+    load_dataset, session_view, shared_source, status_counts, take,
+)
+from rtca.incremental import dataset_conflicts, version_diff
+from rtca.refresher import FAILED, age_text, shared_refresher
+from rtca.timing import timings
+
+timings.record_once("lan.imports", time.perf_counter() - rerun_t0)
 
 # ----------------------------
 # Page config
@@ -20,7 +33,6 @@ st.set_page_config(
 # ----------------------------
 FILE_ID     = "1y2VzcB93oEJlGxwjBvEIhIdStFooP9O_"
 OUTPUT_FILE = "frequenze.xlsx"
-SHEET       = "ALL NP"
 
 # Nomi colonne (devono combaciare con il file)
 COL_BX       = "Attributed Frequency TX (MHz)"   # frequenza centrale
@@ -32,15 +44,61 @@ COL_REQUEST  = "Request ID"
 COL_PERIOD   = "License Period"
 COL_FINAL    = "FINAL Status"  # opzionale
 
+# Colonne che la sezione Spectrum materializza (tutte le altre servono solo alla Table)
+SPECTRUM_COLUMNS = [COL_BX, COL_AO, COL_AQ, COL_REQUEST, COL_VENUE, COL_STAKE, CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID]
+
 # ----------------------------
 # Data loading
 # ----------------------------
-@st.cache_data(ttl=60)
-def load_data():
-    url = f"https://drive.google.com/uc?id={FILE_ID}"
-    gdown.download(url, OUTPUT_FILE, quiet=True)
-    df = pd.read_excel(OUTPUT_FILE, sheet_name=SHEET)
-    return df
+def get_source():
+    # RTCA_LAN_WORKBOOK=/path/file.xlsx per leggere da file locale / share invece che da Drive
+    return shared_source("RTCA_LAN_WORKBOOK", FILE_ID, OUTPUT_FILE)
+
+# Aggiornamento in background (rtca.refresher): si serve l'ultima versione buona,
+# download e parse della successiva avvengono fuori dalle richieste
+def get_refresher():
+    return shared_refresher(get_source())
+
+def data_version():
+    return get_refresher().current_version()
+
+# Dataset condiviso per processo e versione (rtca.core): colonne dichiarate tipizzate,
+# colonne dello spettro gia' calcolate; con lo stesso workbook di app.py e' lo stesso oggetto.
+# Ogni sessione ne riceve una vista (una copia su pandas 2.x). Tutte le colonne del foglio servono solo
+# alla Table, che le fa leggere alla prima richiesta: le altre sezioni chiedono le loro
+# (load_columns), convertite da Arrow al primo uso
+def load_normalized(version):
+    return session_view(lan_table(load_dataset(get_source(), version)))
+
+def load_columns(version, columns):
+    return session_view(lan_columns(load_dataset(get_source(), version), columns))
+
+# Nomi delle colonne del workbook, senza convertirne nessuna (sidebar)
+def column_names(version):
+    return set(load_dataset(get_source(), version).columns(SHEET_ALL_NP) or [])
+
+# Indice dei filtri condiviso fra le sessioni (read-only), uno per versione
+def load_filter_index(version):
+    return lan_index(load_dataset(get_source(), version))
+
+# Versione servita prima di questa, se ancora nella cache di processo (diff e riuso incrementale)
+def previous_dataset(version):
+    previous = get_refresher().previous(version)
+    return None if previous is None else cached_dataset(get_source(), previous)
+
+# Conflitti co-canale sull'intero periodo (tutti gli stakeholder), filtrati poi per selezione;
+# uno per versione, riusati dalla precedente se il diff non tocca le venue del periodo
+def period_conflicts(version, period):
+    conflicts = dataset_conflicts(load_dataset(get_source(), version), period, view="lan",
+                                  previous=previous_dataset(version))
+    return conflicts, conflicts.attrs["total_pairs"]
+
+# Eseguito dal refresher prima di servire una nuova versione: diff per Request ID e conflitti
+# dei due periodi, fuori dalle richieste
+def prepare_version(previous, new):
+    version_diff(previous, new, view="lan")
+    for period in ["Olympic", "Paralympic"]:
+        dataset_conflicts(new, period, view="lan", previous=previous)
 
 # ----------------------------
 # Helpers
@@ -48,69 +106,24 @@ def load_data():
 def available(df, col):
     return col in df.columns
 
-def coerce_numeric(series):
-    return pd.to_numeric(series, errors="coerce")
-
 def compute_chart_df(df):
     req = [COL_BX, COL_AO, COL_AQ, COL_REQUEST]
     missing = [c for c in req if c not in df.columns]
     if missing:
         return pd.DataFrame(), missing
-    tmp = df.dropna(subset=[COL_AO, COL_AQ, COL_REQUEST]).copy()
-    tmp["center"]     = coerce_numeric(tmp[COL_BX])
-    tmp["width_mhz"]  = coerce_numeric(tmp[COL_AO]) / 1000.0
-    tmp["power_dBm"]  = 10 * np.log10(coerce_numeric(tmp[COL_AQ]) * 1000)
-    tmp["req_id"]     = tmp[COL_REQUEST].astype(str)
-    tmp = tmp.dropna(subset=["center", "width_mhz", "power_dBm"])
-    return tmp, []
-
-def make_spectrum_fig(data, color_by=COL_STAKE):
-    if data.empty:
-        return None
-    left  = data["center"] - data["width_mhz"]/2
-    right = data["center"] + data["width_mhz"]/2
-    min_x, max_x = float(left.min()), float(right.max())
-    min_y, max_y = float(data["power_dBm"].min()), float(data["power_dBm"].max())
-    dx = max((max_x - min_x) * 0.05, 1.0)
-    dy = max((max_y - min_y) * 0.05, 1.0)
-
-    fig = go.Figure()
-    palette = px.colors.qualitative.Dark24
-
-    if available(data, color_by):
-        groups = sorted(data[color_by].astype(str).fillna("Unknown").unique())
-        for i, g in enumerate(groups):
-            grp = data[data[color_by].astype(str).fillna("Unknown") == g]
-            fig.add_trace(go.Bar(
-                x=grp["center"], y=grp["power_dBm"], width=grp["width_mhz"], name=str(g),
-                marker_color=palette[i % len(palette)], opacity=0.85,
-                marker_line_color='white', marker_line_width=1,
-                customdata=list(zip(grp["req_id"], grp[COL_AO] if available(grp, COL_AO) else [None]*len(grp))),
-                hovertemplate=(
-                    'Request ID: %{customdata[0]}'
-                    '<br>Freq: %{x} MHz'
-                    '<br>Bandwidth: %{customdata[1]} kHz'
-                    '<br>Power: %{y:.1f} dBm<extra></extra>'
-                )
-            ))
-    else:
-        fig.add_trace(go.Bar(
-            x=data["center"], y=data["power_dBm"], width=data["width_mhz"], name="Assignments",
-            opacity=0.85, marker_line_color='white', marker_line_width=1
-        ))
-
-    fig.update_layout(
-        template='plotly_dark', barmode='overlay', dragmode='zoom',
-        plot_bgcolor='#111', paper_bgcolor='#111', font_color='#FFF',
-        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.5)', gridwidth=1,
-                   minor=dict(showgrid=True, gridcolor='rgba(255,255,255,0.2)', gridwidth=1),
-                   title=dict(text='<b>Frequency (MHz)</b>', font=dict(size=18, color='#FFF'))),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.5)', gridwidth=1,
-                   minor=dict(showgrid=True, gridcolor='rgba(255,255,255,0.2)', gridwidth=1),
-                   title=dict(text='<b>Power (dBm)</b>', font=dict(size=18, color='#FFF'))),
-        legend=dict(font=dict(color='#FFF'))
-    )
-    return fig
+    # center / width_mhz / power_dBm / req_id sono gia' calcolati nel dataset (rtca.core)
+    return chart_rows(df, COL_AO, COL_AQ, COL_REQUEST, plotted_only=True), []
+
+def plot(chart, fig, nbytes=None, **kwargs):
+    # st.plotly_chart cronometrato (serializzazione + invio), con la dimensione del JSON se gia' nota
+    with timings.stage(f"lan.render.{chart}", nbytes=nbytes):
+        return st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+def make_spectrum_fig(data, color_by=COL_STAKE, x_range=None, conflicts=None):
+    from rtca.figures import spectrum_figure
+
+    return spectrum_figure(data, color_by, COL_AO, x_range=x_range, conflicts=conflicts, opacity=0.85,
+                           title_size=18, fit_axes=False)
 
 def make_status_pies(df):
     """Primo pie: Assigned vs Not Assigned.
@@ -118,52 +131,19 @@ def make_status_pies(df):
     """
     if df.empty:
         return None, None
+    from rtca.figures import status_pie
 
-    assigned_count     = int(df[COL_BX].notna().sum()) if available(df, COL_BX) else 0
-    not_assigned_count = int(df.shape[0] - assigned_count)
-
-    stats = pd.DataFrame(
-        {"Status": ["ASSIGNED", "NOT ASSIGNED"], "Count": [assigned_count, not_assigned_count]}
-    )
-
-    pie = px.pie(
-        stats, names="Status", values="Count", hole=0.6, template="plotly",
-        color="Status", color_discrete_map={"ASSIGNED": "#2ECC71", "NOT ASSIGNED": "#E74C3C"}
-    )
-    pie.update_traces(
-        textinfo='percent', texttemplate='%{percent:.1%} (%{value})',
-        textfont=dict(size=16), textposition='outside',
-        marker=dict(line=dict(color='#FFF', width=2))
-    )
-    pie.update_layout(
-        margin=dict(l=20, r=20, t=20, b=20),
-        legend=dict(title='', orientation='h', x=0.5, xanchor='center', y=1.15, yanchor='bottom', font=dict(size=14)),
-        showlegend=True
-    )
+    if available(df, COL_BX):
+        stats = status_counts(df, COL_BX, pnrf=None)
+    else:
+        stats = pd.DataFrame({"Status": ["ASSIGNED", "NOT ASSIGNED"], "Count": [0, len(df)]})
+    pie = status_pie(stats, {"ASSIGNED": "#2ECC71", "NOT ASSIGNED": "#E74C3C"}, text_size=16, legend_y=1.15)
 
     final_pie = None
     if available(df, COL_FINAL) and available(df, COL_BX):
-        not_assigned_df = df[df[COL_BX].isna()].copy()
+        not_assigned_df = df[df[COL_BX].isna()]
         if not not_assigned_df.empty:
-            not_assigned_df[COL_FINAL] = not_assigned_df[COL_FINAL].fillna("Not Analysed")
-            counts = not_assigned_df[COL_FINAL].value_counts()
-            final_stats = pd.DataFrame({"Status": counts.index, "Count": counts.values})
-            palette = px.colors.qualitative.Set1
-            cmap = {status: palette[i % len(palette)] for i, status in enumerate(final_stats["Status"].unique())}
-            final_pie = px.pie(
-                final_stats, names="Status", values="Count", hole=0.6, template="plotly",
-                color="Status", color_discrete_map=cmap
-            )
-            final_pie.update_traces(
-                textinfo='percent', texttemplate='%{percent:.1%} (%{value})',
-                textfont=dict(size=16), textposition='outside',
-                marker=dict(line=dict(color='#FFF', width=2))
-            )
-            final_pie.update_layout(
-                margin=dict(l=20, r=20, t=20, b=20),
-                legend=dict(title='', orientation='h', x=0.5, xanchor='center', y=1.15, yanchor='bottom', font=dict(size=14)),
-                showlegend=True
-            )
+            final_pie = status_pie(breakdown(not_assigned_df, COL_FINAL), text_size=16, legend_y=1.15)
     return pie, final_pie
 
 # ----------------------------
@@ -185,7 +165,10 @@ st.markdown("""
 # ----------------------------
 # Load
 # ----------------------------
-_df = load_data()
+get_refresher().on_update("app_LAN.py", prepare_version)
+data_ver = data_version()
+fidx = load_filter_index(data_ver)
+columns_present = column_names(data_ver)
 
 # ============================================================
 # Sidebar: SECTION-AWARE FILTERS (Period → Venue → Stakeholder)
@@ -203,109 +186,193 @@ with st.sidebar:
 
     st.markdown("---")
     st.header("🗓️ Select Period")
-    period_options = ["Olympic", "Paralympic"] if available(_df, COL_PERIOD) else []
+    period_options = ["Olympic", "Paralympic"] if COL_PERIOD in columns_present else []
     if period_options:
         period_sel = st.selectbox("", period_options, index=0, key="period_sel", label_visibility="collapsed")
     else:
         period_sel = None
         st.info("Colonna 'License Period' non trovata. Mostro tutti i periodi.")
 
-    # Dataframe che guida le OPZIONI dei menù
-    df_options = _df.copy()
-    if period_sel and available(df_options, COL_PERIOD):
-        df_options = df_options[df_options[COL_PERIOD] == period_sel]
-    if section_for_filters == "Map" and available(df_options, COL_FINAL):
-        df_options = df_options[df_options[COL_FINAL].astype(str).str.upper() == "JUNIPER"]
+    # Righe che guidano le OPZIONI dei menù (posizioni nell'indice, niente copie del frame)
+    rows_options = fidx.select(None, COL_PERIOD, [period_sel] if period_sel else None)
+    if section_for_filters == "Map":
+        rows_options = fidx.select(rows_options, FINAL_UPPER, ["JUNIPER"])
 
     st.markdown("---")
     # Venue FIRST
     venue_sel = None
-    if available(df_options, COL_VENUE):
+    if COL_VENUE in columns_present:
         st.header("📍 Venue")
-        venues = sorted(df_options[COL_VENUE].dropna().astype(str).unique())
+        venues = fidx.options(rows_options, COL_VENUE)
         venue_sel = st.multiselect("", venues, default=venues, key="venue_sel", label_visibility="collapsed")
 
     st.markdown("---")
     # Stakeholder SECOND
-    if available(df_options, COL_STAKE):
+    if COL_STAKE in columns_present:
         st.header("👥 Stakeholder")
-        df_stake_scope = df_options.copy()
-        if venue_sel and available(df_stake_scope, COL_VENUE):
-            df_stake_scope = df_stake_scope[df_stake_scope[COL_VENUE].astype(str).isin([str(x) for x in venue_sel])]
-        stakeholders = sorted(df_stake_scope[COL_STAKE].dropna().astype(str).unique())
+        rows_stake_scope = fidx.select(rows_options, COL_VENUE, venue_sel)
+        stakeholders = fidx.options(rows_stake_scope, COL_STAKE)
         stake_sel = st.multiselect("", stakeholders, default=stakeholders, key="stake_sel", label_visibility="collapsed")
     else:
         stake_sel = None
 
+    # Eta' dei dati ed esito dell'ultimo refresh in background
+    st.markdown("---")
+    refresh = get_refresher().status()
+    now = time.time()
+    if refresh["outcome"] == FAILED:
+        st.warning(f"Ultimo aggiornamento fallito ({refresh['error']}); dati caricati "
+                   f"{age_text(now - refresh['loaded_at'])} fa.")
+    st.caption(f"Dati `{refresh['version']}` · caricati {age_text(now - refresh['loaded_at'])} fa · "
+               f"ultimo controllo {age_text(now - refresh['checked_at'])} fa: {refresh['outcome']}")
+
 # ----------------------------
 # Applica filtri al dataset COMPLETO (globale)
 # ----------------------------
-filtered = _df.copy()
-if period_sel and available(filtered, COL_PERIOD):
-    filtered = filtered[filtered[COL_PERIOD] == period_sel]
-if venue_sel and available(filtered, COL_VENUE):
-    filtered = filtered[filtered[COL_VENUE].astype(str).isin([str(x) for x in venue_sel])]
-if stake_sel and available(filtered, COL_STAKE):
-    filtered = filtered[filtered[COL_STAKE].astype(str).isin([str(x) for x in stake_sel])]
-
-# Subset per la MAPPA: solo JUNIPER
-filtered_map = filtered.copy()
-if available(filtered_map, COL_FINAL):
-    filtered_map = filtered_map[filtered_map[COL_FINAL].astype(str).str.upper() == "JUNIPER"]
+with timings.stage("lan.filter") as filter_stage:
+    rows = fidx.select(None, COL_PERIOD, [period_sel] if period_sel else None)
+    rows = fidx.select(rows, COL_VENUE, venue_sel)
+    rows = fidx.select(rows, COL_STAKE, stake_sel)
+    filter_stage["rows"] = len(rows)
+# La sessione tiene solo le posizioni selezionate: ogni sezione materializza le righe
+# (e le colonne) che le servono
+
+# Subset per la MAPPA: solo JUNIPER (per ora basta il conteggio, nessuna riga materializzata)
+map_rows = fidx.select(rows, FINAL_UPPER, ["JUNIPER"]) if FINAL_UPPER in fidx else rows
 
 # ----------------------------
 # RENDER "SEZIONE" SCELTA (niente tabs: resti dove sei)
 # ----------------------------
 st.subheader("Dashboard")
 
-section = st.session_state.get("section_for_filters", "Status")
+# Cosa e' cambiato rispetto alla versione servita prima (stesso processo del server)
+previous = previous_dataset(data_ver)
+if previous is not None:
+    diff = version_diff(previous, load_dataset(get_source(), data_ver), view="lan")
+    counts = diff.summary()
+    with st.expander("🆕 What changed since the last refresh" + ("" if diff else " (nothing)")):
+        st.caption(f"Rispetto a `{previous.version}`: {counts['added']:,} aggiunte · {counts['removed']:,} rimosse · "
+                   f"{counts['changed_rows']:,} richieste modificate ({counts['changed_cells']:,} celle) · "
+                   f"{counts['venues']:,} venue e {counts['stakeholders']:,} stakeholder toccati")
+        if diff:
+            if diff.touches(venues=venue_sel, stakeholders=stake_sel):
+                st.caption("La selezione corrente puo' includere richieste modificate.")
+            st.dataframe(diff.table(limit=1000), use_container_width=True, hide_index=True)
+
+section =st.session_state.get("section_for_filters", "Status")
 
 if section == "Status":
     st.markdown("## 📊 Status")
-    pie, final_pie = make_status_pies(filtered)
+    with timings.stage("lan.figure.status", rows=len(rows)):
+        pie, final_pie = make_status_pies(take(load_columns(data_ver, [COL_BX, COL_FINAL]), rows))
     c1, c2 = st.columns([1, 1])
     with c1:
         if pie is not None:
-            st.plotly_chart(pie, use_container_width=True)
+            plot("status", pie)
         else:
             st.info("Nessun dato per generare lo stato principale.")
     with c2:
         if final_pie is not None:
-            st.plotly_chart(final_pie, use_container_width=True)
+            plot("final_status", final_pie)
         else:
             st.info("Nessun dato 'FINAL Status' (solo per NOT ASSIGNED) disponibile.")
 
 elif section == "Map":
     st.markdown("## 🗺️ Map (JUNIPER only)")
-    if filtered_map.empty:
+    if not len(map_rows):
         st.info("Nessun record con FINAL Status = 'JUNIPER' per i filtri selezionati.")
     else:
         # Nessuna tabella qui, solo placeholder visivo
-        st.success(f"Records: {len(filtered_map)}")
+        st.success(f"Records: {len(map_rows)}")
         st.info("La mappa verrà aggiunta qui (nessuna tabella visualizzata).")
 
 elif section == "Table":
+    from rtca.ui import LABELS_IT, paged_table
+
     st.markdown("## 📋 Table")
-    if filtered.empty:
+    if not len(rows):
         st.info("Nessuna riga corrisponde ai filtri selezionati.")
     else:
-        st.dataframe(filtered, use_container_width=True, hide_index=True)
-        csv = filtered.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            "⬇️ Scarica CSV filtrato",
-            data=csv,
-            file_name="lan_assignments_filtered.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+        # Solo la pagina visibile va al browser; ordinamento e ricerca sulle posizioni della selezione
+        try:
+            table_df = load_normalized(data_ver)
+        except VersionUnavailable:   # workbook cambiato dopo il caricamento: la prossima versione arriva a breve
+            st.info("Il workbook è cambiato: la tabella completa sarà disponibile con la prossima versione.")
+        else:
+            paged_table(table_df, "table", "lan_assignments_filtered", rows=rows, labels=LABELS_IT)
 
 elif section == "Spectrum":
+    from rtca.conflicts import CONFLICT_COLUMNS, involving
+    from rtca.figures import venue_heatmap
+    from rtca.heatmap import VALUES, default_bin, occupancy_grid
+    from rtca.spectrum import payload_kb
+
     st.markdown("## 📡 Spectrum")
-    chart_df, missing = compute_chart_df(filtered)
+    chart_df, missing = compute_chart_df(load_columns(data_ver, SPECTRUM_COLUMNS).take(rows))
     if missing:
         st.error(f"Colonne mancanti per lo spettro: {missing}")
     elif chart_df.empty:
         st.info("Nessun dato disponibile per i filtri selezionati.")
     else:
-        fig = make_spectrum_fig(chart_df, color_by=COL_STAKE)
-        st.plotly_chart(fig, use_container_width=True)
+        # Box select = zoom server-side sul range con i singoli canali
+        x_range = st.session_state.get("spectrum_zoom")
+        t0 = time.perf_counter()
+        conflicts_all, conflicts_total = period_conflicts(data_ver, period_sel)
+        conflicts = involving(conflicts_all, chart_df[COL_REQUEST], venue_sel) if conflicts_total else conflicts_all
+        fig, info = make_spectrum_fig(chart_df, color_by=COL_STAKE, x_range=x_range, conflicts=conflicts)
+        build_ms = (time.perf_counter() - t0) * 1000
+        timings.record("lan.figure.spectrum", build_ms / 1000, rows=len(chart_df))
+        payload = payload_kb(fig)
+        gen = st.session_state.get("spectrum_gen", 0)
+        event = plot("spectrum", fig, nbytes=int(payload * 1024), on_select="rerun", selection_mode="box",
+                     key=f"spectrum_{gen}")
+        box = event.selection.box if event is not None and event.selection else []
+        if box and box[0].get("x") and tuple(sorted(box[0]["x"])) != x_range:
+            st.session_state.spectrum_zoom = tuple(sorted(box[0]["x"]))
+            st.session_state.spectrum_gen = gen + 1
+            st.rerun()
+        mode = "singoli canali" if info["mode"] == "channels" else "bin di frequenza (trascina un box per lo zoom)"
+        st.caption(f"{info['bars']:,} barre per {info['rows']:,} canali, {mode} · "
+                   f"payload {payload:,.0f} kB · build {build_ms:.0f} ms")
+        if x_range is not None and st.button("Reset zoom"):
+            st.session_state.spectrum_zoom = None
+            st.session_state.spectrum_gen = gen + 1
+            st.rerun()
+
+        # Venue x frequenza in una sola traccia: il costo non cresce con le assegnazioni
+        st.markdown("### 🌡️ Occupazione venue × frequenza")
+        c1, c2 = st.columns([1, 2])
+        # Larghezza iniziale dall'estensione dei canali: niente bin allargati al primo render
+        if "heatmap_bin" not in st.session_state:
+            st.session_state.heatmap_bin = default_bin(chart_df)
+        bin_mhz = c1.number_input("Bin width (MHz)", min_value=0.0125, step=0.5, format="%.4f", key="heatmap_bin")
+        value = c2.radio("Value", list(VALUES), format_func=VALUES.get, horizontal=True, key="heatmap_value")
+        with timings.stage("lan.figure.heatmap", rows=len(chart_df)):
+            venues, edges, grid = occupancy_grid(chart_df, bin_mhz, value, x_range=x_range)
+            heat_fig = venue_heatmap(venues, edges, grid, value, title_size=18)
+        if heat_fig is not None:
+            plot("heatmap", heat_fig)
+            if edges[1] - edges[0] > bin_mhz + 1e-9:
+                st.caption(f"Bin allargati a {edges[1] - edges[0]:.4f} MHz per restare nel limite della griglia.")
+
+        st.markdown("### ⚠️ Conflitti co-canale")
+        if conflicts.empty:
+            st.success("Nessun canale sovrapposto nella stessa venue per i filtri selezionati.")
+        else:
+            if len(conflicts_all) < conflicts_total:
+                st.caption(f"Prime {len(conflicts_all):,} di {conflicts_total:,} coppie sovrapposte nel periodo.")
+            st.dataframe(conflicts[CONFLICT_COLUMNS], use_container_width=True, hide_index=True)
+
+timings.record("lan.rerun", time.perf_counter() - rerun_t0, rows=len(rows))
+timings.record_once("lan.first_render", time.perf_counter() - rerun_t0, rows=len(rows))
+
+# Tempi per fase (nascosto: ?diagnostics=1 nell'URL)
+if st.query_params.get("diagnostics"):
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("⏱️ Diagnostics", expanded=True):
+            st.caption(f"Tempi per fase (ms): ultimo e percentili sugli ultimi {timings.window:,} campioni del processo.")
+            st.dataframe(timings.summary(), use_container_width=True, hide_index=True)
+            c1, c2 = st.columns(2)
+            c1.download_button("Prometheus", timings.prometheus(), "rtca_metrics.prom", "text/plain")
+            c2.download_button("JSON lines", timings.jsonl(), "rtca_timings.jsonl", "application/jsonl")
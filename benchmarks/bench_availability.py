@@ -0,0 +1,95 @@
+"""Indice di disponibilita': latenza delle query sui canali liberi e costo di costruzione/aggiornamento.
+
+    python -m benchmarks.bench_availability [--rows 10000] [--workdir .bench] [--queries 1000]
+
+Sul workbook sintetico: costruzione completa dell'indice, aggiornamento delle
+sole venue di un diff simulato (``--changed`` venue) con verifica che il
+risultato coincida con la costruzione completa, poi ``--queries`` ricerche
+casuali (venue, periodo, tuning range, larghezza, passo) con percentili di
+latenza. Ogni risposta viene confrontata col calcolo diretto sui canali
+assegnati: nessun centro restituito deve toccare un canale assegnato e ogni
+centro libero dentro un singolo range di capacita' deve comparire.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.bench_pipeline import ensure_workbook
+from rtca.availability import AvailabilityIndex
+from rtca.columns import CAP_FROM, CAP_TO, CAP_VENUE, CENTER, COL_PERIOD, COL_VENUE, WIDTH_MHZ
+from rtca.core import chart_rows, load_dataset, olympic_capacity, olympic_frame
+from rtca.sources import LocalFileSource
+
+PERIODS = ["Olympic", "Paralympic"]
+EPS = 1e-7
+
+
+def brute_force(clean, cap, venue, period, tune_from, tune_to, bandwidth_khz, step_khz):
+    """(centri liberi dentro un singolo range di capacita', intervalli assegnati) della venue nel periodo."""
+    step, half = (step_khz or bandwidth_khz) / 1000.0, bandwidth_khz / 2000.0
+    centers = tune_from + np.arange(int(np.floor((tune_to - tune_from) / step + 1e-9)) + 1) * step
+    ranges = cap[cap[CAP_VENUE].astype(str) == venue]
+    inside = ((centers[:, None] - half >= ranges[CAP_FROM].to_numpy(float) - 1e-9)
+              & (centers[:, None] + half <= ranges[CAP_TO].to_numpy(float) + 1e-9)).any(axis=1)
+    rows = clean[(clean[COL_VENUE].astype(str) == venue).to_numpy() & (clean[COL_PERIOD].astype(str) == period).to_numpy()]
+    left = (rows[CENTER] - rows[WIDTH_MHZ] / 2).dropna().to_numpy()
+    right = (rows[CENTER] + rows[WIDTH_MHZ] / 2).dropna().to_numpy()
+    hit = ((centers[:, None] - half < right) & (centers[:, None] + half > left)).any(axis=1)
+    return centers[inside & ~hit], left, right
+
+
+def same(a, b):
+    return a._free.keys() == b._free.keys() and all(
+        np.array_equal(x, y) for key in a._free for x, y in zip(a._free[key], b._free[key]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=5, help="venues touched by the simulated diff")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    source = LocalFileSource(ensure_workbook(os.path.abspath(args.workdir), args.rows, args.seed))
+    ds = load_dataset(source, source.refresh(), os.path.join(os.path.abspath(args.workdir), "cache"))
+    clean, cap = chart_rows(olympic_frame(ds)), olympic_capacity(ds)
+    rng = np.random.default_rng(args.seed)
+
+    t0 = time.perf_counter()
+    index = AvailabilityIndex.build(clean, cap)
+    t_build = time.perf_counter() - t0
+    changed = rng.choice(index.venues, size=min(args.changed, len(index.venues)), replace=False)
+    t0 = time.perf_counter()
+    updated = index.updated(clean, changed)
+    t_update = time.perf_counter() - t0
+    print(f"{len(clean):,} drawable rows, {len(index.venues)} venues with capacity, {len(index._free)} (venue, period)")
+    print(f"full build {t_build * 1e3:.1f} ms, update of {len(changed)} venues {t_update * 1e3:.1f} ms, "
+          f"{'ok' if same(index, updated) else 'MISMATCH'}")
+
+    latency, missing, false_free = [], 0, 0
+    for _ in range(args.queries):
+        venue, period = str(rng.choice(index.venues)), str(rng.choice(PERIODS))
+        lo, hi = index.capacity_range(venue)
+        tune_from = rng.uniform(lo, hi)
+        tune_to = min(hi, tune_from + rng.uniform(0.5, 30))
+        bandwidth = float(rng.choice([12.5, 25, 200, 1000]))
+        step = [6.25, 12.5, 25, None][rng.integers(4)]
+        t0 = time.perf_counter()
+        slots = index.free_slots(venue, period, tune_from, tune_to, bandwidth, step)
+        latency.append(time.perf_counter() - t0)
+        expected, left, right = brute_force(clean, cap, venue, period, tune_from, tune_to, bandwidth, step)
+        missing += not set(np.round(expected, 6)) <= set(np.round(slots, 6))
+        half = bandwidth / 2000.0
+        false_free += bool(((slots[:, None] - half < right - EPS) & (slots[:, None] + half > left + EPS)).any())
+    p50, p95, p99 = np.percentile(np.array(latency) * 1e6, [50, 95, 99])
+    print(f"{args.queries} queries: p50 {p50:.0f} µs, p95 {p95:.0f} µs, p99 {p99:.0f} µs, max {max(latency) * 1e6:.0f} µs")
+    print(f"queries missing a free center: {missing}, returning an occupied center: {false_free}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Avvio a freddo: import e primo render di ogni dashboard / sezione, con e senza warm-up.
+
+    python -m benchmarks.bench_coldstart [--rows 10000] [--workdir .bench] [--sections Status Map Table Spectrum]
+
+Ogni misura gira in un processo nuovo (dashboard puntate a un workbook
+sintetico, come in benchmarks.bench_pipeline) ed esegue lo script una volta
+con ``AppTest``, come la prima sessione dopo l'avvio del server. Tre stati:
+
+- ``xlsx``: nessuno snapshot su disco, il primo render parsa il workbook;
+- ``snapshot``: snapshot Arrow gia' su disco (server riavviato sulla stessa versione);
+- ``warmed``: ``rtca.warmup.warm_up`` completato nel processo prima della sessione.
+
+Per ciascuno: tempo della prima esecuzione, fasi registrate da rtca.timing
+(``*.imports``, ``parse``, ``*.first_render``) e quali moduli pesanti sono
+stati importati (plotly.express solo nelle sezioni con grafici).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from benchmarks.bench_pipeline import REPO_ROOT, ensure_workbook, run_child
+
+HEAVY = ["plotly.express", "rtca.figures", "rtca.tables", "rtca.heatmap", "rtca.imd", "rtca.solver", "rtca.scenario",
+         "rtca.availability"]
+STAGES = ["imports", "parse", "first_render"]
+
+
+def first_session(app, section, warm):
+    """Eseguito nel processo figlio: prima esecuzione di ``app`` (sezione ``section`` per app_LAN.py)."""
+    import logging
+    import warnings
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore")
+    from streamlit.testing.v1 import AppTest
+
+    from rtca.timing import timings
+
+    view = "lan" if app == "app_LAN.py" else "olympic"
+    if warm:
+        from rtca.core import shared_source
+        from rtca.warmup import ENV_VARS, warm_up
+        warm_up(shared_source(ENV_VARS[view], None, "frequenze.xlsx"), view, background=False)
+    loaded = set(sys.modules)
+    at = AppTest.from_file(os.path.join(REPO_ROOT, app), default_timeout=600)
+    if section:
+        at.session_state["section_for_filters"] = section
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    prefix = "lan" if view == "lan" else "app"
+    stages = {row["stage"]: row["last_ms"] for row in timings.summary()}
+    return {"first_run_ms": elapsed * 1000, "errors": len(at.exception),
+            **{s: stages.get(f"{prefix}.{s}", stages.get(s)) for s in STAGES},
+            "heavy": [m for m in HEAVY if m in sys.modules and m not in loaded]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--sections", nargs="+", default=["Status", "Map", "Table", "Spectrum"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--app", help=argparse.SUPPRESS)
+    parser.add_argument("--section", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(first_session(args.app, args.section, args.warm)))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    workdir = os.path.abspath(args.workdir)
+    path = ensure_workbook(workdir, args.rows, args.seed)
+    cache_dir = os.path.join(workdir, f"coldstart_{args.rows}_{args.seed}")
+    cases = [("app.py", None)] + [("app_LAN.py", s) for s in args.sections]
+    print(f"{args.rows:,} rows")
+    print(f"{'app':<11} {'section':<9} {'state':<9} {'first run ms':>13} {'imports':>8} {'parse':>8} "
+          f"{'render':>8}  heavy modules imported by the session")
+    for app, section in cases:
+        for state in ("xlsx", "snapshot", "warmed"):
+            if state == "xlsx":
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            extra = ["--app", app] + (["--section", section] if section else []) + (["--warm"] if state == "warmed" else [])
+            r = run_child("benchmarks.bench_coldstart", path, cache_dir, workdir, extra)
+            ms = lambda v: "" if v is None else f"{v:.0f}"   # noqa: E731
+            print(f"{app:<11} {section or '-':<9} {state:<9} {r['first_run_ms']:>13.0f} {ms(r['imports']):>8} "
+                  f"{ms(r['parse']):>8} {ms(r['first_render']):>8}  {', '.join(r['heavy']) or '-'}"
+                  + (f"  ({r['errors']} errors)" if r["errors"] else ""))
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark di rtca.conflicts.find_conflicts, con verifica contro il confronto a coppie.
+
+    python -m benchmarks.bench_conflicts [--sizes 1000 10000 100000 300000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rtca.conflicts import find_conflicts
+
+BRUTE_MAX_ROWS = 3000
+
+
+def synthetic(n, n_venues=60, seed=0):
+    rng = np.random.default_rng(seed)
+    bw = rng.choice([12.5, 25.0, 200.0, 8000.0], n, p=[0.4, 0.4, 0.15, 0.05])
+    return pd.DataFrame({
+        "Venue Code": rng.choice([f"V{i:03d}" for i in range(n_venues)], n),
+        "Request ID": np.arange(n),
+        "Stakeholder Business ID": rng.choice([f"S{i:03d}" for i in range(200)], n),
+        "center": rng.uniform(30.0, 6000.0, n).round(4),
+        "width_mhz": bw / 1000.0,
+        "power_dBm": rng.uniform(0.0, 40.0, n),
+    })
+
+
+def brute_force(data):
+    pairs = set()
+    for _, grp in data.groupby("Venue Code"):
+        left = (grp["center"] - grp["width_mhz"] / 2).to_numpy()
+        right = (grp["center"] + grp["width_mhz"] / 2).to_numpy()
+        ids = grp["Request ID"].to_numpy()
+        hit = (left[:, None] < right[None, :]) & (left[None, :] < right[:, None])
+        for x, y in zip(*np.nonzero(np.triu(hit, 1))):
+            pairs.add(frozenset((ids[x], ids[y])))
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 300000])
+    args = parser.parse_args(argv)
+
+    print(f"{'assignments':>12} {'ms':>8} {'pairs':>9} {'check':>6}")
+    for n in args.sizes:
+        data = synthetic(n)
+        t0 = time.perf_counter()
+        out = find_conflicts(data)
+        ms = (time.perf_counter() - t0) * 1000
+        check = "-"
+        if n <= BRUTE_MAX_ROWS:
+            found = {frozenset(p) for p in zip(out["Request ID A"], out["Request ID B"])}
+            check = "ok" if found == brute_force(data) else "FAIL"
+        print(f"{n:>12} {ms:>8.1f} {out.attrs['total_pairs']:>9} {check:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cache dei download: quanti download fanno N sessioni e P processi che scadono insieme.
+
+    python -m benchmarks.bench_downloads [--sessions 16] [--processes 4] [--delay 1] [--size-mb 8]
+
+Download finto al posto di gdown: scrive ``--size-mb`` MB a pezzi in
+``--delay`` secondi (un lettore che aprisse il file a meta' lo vedrebbe
+troncato) e conta le chiamate in un file condiviso. Ogni processo lancia
+``--sessions`` thread che chiamano ``DownloadCache.fetch`` nello stesso
+istante; per ogni ondata si contano i download effettivi (atteso: 1), si
+misura l'attesa delle sessioni e si verifica che ogni path restituito sia
+completo (hash del file = hash nel nome). Per confronto, la stessa ondata
+senza cache (ogni sessione riscrive lo stesso ``frequenze.xlsx``, come prima).
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from rtca.downloads import FRESH_SECONDS, DownloadCache, file_digest
+
+CHUNKS = 16
+
+
+def fake_download(path, counter, size, delay, content):
+    """Scrive ``size`` byte in ``CHUNKS`` pezzi in ``delay`` secondi e registra la chiamata."""
+    with open(counter, "a") as f:
+        f.write("x")
+    block = bytes([content % 256]) * (size // CHUNKS)
+    with open(path, "wb") as f:
+        for _ in range(CHUNKS):
+            f.write(block)
+            f.flush()
+            time.sleep(delay / CHUNKS)
+
+
+def session(cache, counter, size, delay, content, barrier, out, naive_dir=None):
+    barrier.wait()
+    t0 = time.perf_counter()
+    if naive_dir is None:
+        path, digest = cache.fetch(lambda p: fake_download(p, counter, size, delay, content))
+    else:   # senza cache: ogni sessione scarica nello stesso file di output
+        path = os.path.join(naive_dir, "frequenze.xlsx")
+        fake_download(path, counter, size, delay, content)
+        digest = None
+    ok = digest is None or file_digest(path) == digest
+    out.append((time.perf_counter() - t0, ok, os.path.getsize(path) == size))
+
+
+def process_wave(download_dir, counter, sessions, size, delay, content, start, naive_dir, results):
+    cache = DownloadCache("bench", download_dir)
+    barrier, out = threading.Barrier(sessions), []
+    while time.time() < start:   # tutti i processi partono insieme
+        time.sleep(0.001)
+    threads = [threading.Thread(target=session, args=(cache, counter, size, delay, content, barrier, out, naive_dir))
+               for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(out)
+
+
+def wave(workdir, args, content, naive=False):
+    counter = os.path.join(workdir, f"calls_{content}_{naive}")
+    results = mp.Queue()
+    start = time.time() + 0.5
+    procs = [mp.Process(target=process_wave, args=(os.path.join(workdir, "downloads"), counter, args.sessions,
+                                                   args.size_mb << 20, args.delay, content, start,
+                                                   workdir if naive else None, results))
+             for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    samples = [s for _ in procs for s in results.get()]
+    for p in procs:
+        p.join()
+    with open(counter) as f:
+        calls = len(f.read())
+    waits = sorted(s[0] for s in samples)
+    complete = "n/a" if naive else f"{sum(s[1] and s[2] for s in samples)}/{len(samples)}"
+    label = "naive (no cache)" if naive else f"cache, content {content}"
+    print(f"{label:<20} {len(samples):>8} {calls:>9} {waits[len(waits) // 2]:>8.2f} {waits[-1]:>8.2f} "
+          f"{complete:>11}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=16, help="threads per process")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=1.0, help="simulated download time (s)")
+    parser.add_argument("--size-mb", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="rtca_downloads_")
+    try:
+        print(f"{'wave':<20} {'sessions':>8} {'downloads':>9} {'p50 s':>8} {'max s':>8} {'complete':>11}")
+        wave(workdir, args, content=1)
+        time.sleep(FRESH_SECONDS + 1)   # oltre la finestra di riuso: la prossima ondata riscarica
+        wave(workdir, args, content=2)
+        wave(workdir, args, content=3, naive=True)
+        print("files in cache:", sorted(os.listdir(os.path.join(workdir, "downloads", "bench"))))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
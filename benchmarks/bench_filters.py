@@ -0,0 +1,88 @@
+"""Benchmark della cascata di filtri della sidebar: pandas (vecchio codice) contro FilterIndex.
+
+    python -m benchmarks.bench_filters [--sizes 10000 100000 500000]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rtca.filters import FilterIndex
+
+PERIOD, STAKE, TICKET, SERVICE, VENUE = "License Period", "Stakeholder Business ID", "FG out", "Service Tri Code", "Venue Code"
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        PERIOD:  pd.Categorical(rng.choice(["Olympic", "Paralympic"], n)),
+        STAKE:   pd.Categorical(rng.choice([f"S{i:04d}" for i in range(800)], n)),
+        TICKET:  pd.Categorical(rng.choice([f"FG-{i}" for i in range(40)] + [None], n)),
+        SERVICE: pd.Categorical(rng.choice([f"SV{i}" for i in range(30)], n)),
+        VENUE:   pd.Categorical(rng.choice([f"V{i:03d}" for i in range(120)], n)),
+    })
+
+
+def cascade_pandas(df, period, stake, ticket):
+    # Stessa sequenza del vecchio sidebar di app.py
+    df_period = df[df[PERIOD] == period]
+    stakeholders = sorted(df_period[STAKE].dropna().astype(str).unique())
+    df_stake = df_period[df_period[STAKE] == stake]
+    tickets = sorted(df_stake[TICKET].dropna().astype(str).unique())
+    df_ticket = df_stake if ticket == "All" else df_stake[df_stake[TICKET].astype(str) == ticket]
+    services = sorted(df_ticket[SERVICE].dropna().astype(str).unique())
+    df_service = df_ticket[df_ticket[SERVICE].astype(str).isin(services)]
+    venues = sorted(df_service[VENUE].dropna().unique())
+    filtered = df[df[PERIOD] == period]
+    filtered = filtered[filtered[STAKE] == stake]
+    if ticket != "All":
+        filtered = filtered[filtered[TICKET].astype(str) == ticket]
+    filtered = filtered[filtered[SERVICE].astype(str).isin(services)]
+    filtered = filtered[filtered[VENUE].isin(venues)]
+    return (stakeholders, tickets, services, venues), filtered.index.to_numpy()
+
+
+def cascade_index(fidx, period, stake, ticket):
+    rows = fidx.select(None, PERIOD, [period])
+    stakeholders = fidx.options(rows, STAKE)
+    rows = fidx.select(rows, STAKE, [stake])
+    tickets = fidx.options(rows, TICKET)
+    if ticket != "All":
+        rows = fidx.select(rows, TICKET, [ticket])
+    services = fidx.options(rows, SERVICE)
+    rows = fidx.select(rows, SERVICE, services)
+    venues = fidx.options(rows, VENUE)
+    rows = fidx.select(rows, VENUE, venues)
+    return (stakeholders, tickets, services, venues), rows
+
+
+def best_of(fn, *args, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'build ms':>9} {'pandas ms':>10} {'index ms':>9} {'same':>5}")
+    for n in args.sizes:
+        df = synthetic(n)
+        t0 = time.perf_counter()
+        fidx = FilterIndex(df, [PERIOD, STAKE, TICKET, SERVICE, VENUE])
+        build = time.perf_counter() - t0
+        stake = str(df[STAKE].iloc[0])
+        t_pd, (opts_pd, rows_pd) = best_of(cascade_pandas, df, "Olympic", stake, "All", repeat=5)
+        t_ix, (opts_ix, rows_ix) = best_of(cascade_index, fidx, "Olympic", stake, "All")
+        same = opts_pd == opts_ix and np.array_equal(rows_pd, rows_ix)
+        print(f"{n:>8} {build * 1e3:>9.1f} {t_pd * 1e3:>10.2f} {t_ix * 1e3:>9.3f} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Heatmap venue x frequenza: binning vettoriale e costo della figura al crescere delle assegnazioni.
+
+    python -m benchmarks.bench_heatmap [--sizes 1000 10000 100000 500000] [--bin 1.0]
+
+Per ogni taglia: tempo di ``occupancy_grid`` (MHz e canali), costruzione
+della figura + ``to_json`` e dimensione del payload, che dipende solo da
+venue x bin. Fino a ``CHECK_MAX_ROWS`` la griglia viene confrontata con il
+calcolo diretto delle sovrapposizioni canale/bin.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_occupancy import synthetic
+from rtca.figures import venue_heatmap
+from rtca.heatmap import occupancy_grid
+
+CHECK_MAX_ROWS = 20000
+
+
+def brute_force(clean, venues, edges):
+    """Sovrapposizione di ogni canale con ogni bin, per venue (riferimento)."""
+    left = (clean["center"] - clean["width_mhz"] / 2).to_numpy()
+    right = (clean["center"] + clean["width_mhz"] / 2).to_numpy()
+    grid = np.zeros((len(venues), len(edges) - 1))
+    for i, venue in enumerate(venues):
+        mask = (clean["Venue Code"] == venue).to_numpy()
+        for l, r in zip(left[mask], right[mask]):
+            grid[i] += np.clip(np.minimum(r, edges[1:]) - np.maximum(l, edges[:-1]), 0, None)
+    return grid
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 500000])
+    parser.add_argument("--venues", type=int, default=60)
+    parser.add_argument("--bin", type=float, default=1.0, help="requested bin width (MHz)")
+    args = parser.parse_args(argv)
+
+    print(f"{'assignments':>12} {'bins':>6} {'MHz grid ms':>12} {'count grid ms':>14} {'figure+json ms':>15} "
+          f"{'payload kB':>11} {'max abs diff':>13}")
+    for n in args.sizes:
+        clean, _ = synthetic(n, n_venues=args.venues)
+        t_bw, (venues, edges, grid) = timed(occupancy_grid, clean, args.bin, "bandwidth")
+        t_ch, _ = timed(occupancy_grid, clean, args.bin, "channels")
+        t_fig, spec = timed(lambda: venue_heatmap(venues, edges, grid).to_json())
+        diff = float("nan")
+        if n <= CHECK_MAX_ROWS:
+            diff = float(np.max(np.abs(brute_force(clean, venues, edges) - grid)))
+        print(f"{n:>12} {len(edges) - 1:>6} {t_bw * 1e3:>12.2f} {t_ch * 1e3:>14.2f} {t_fig * 1e3:>15.1f} "
+              f"{len(spec) / 1024:>11,.0f} {diff:>13.2e}")
+
+
+if __name__ == "__main__":
+    main()
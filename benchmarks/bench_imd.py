@@ -0,0 +1,46 @@
+"""Benchmark di rtca.imd.analyze: esecuzione seriale contro process pool.
+
+    python -m benchmarks.bench_imd [--per-venue 100 200 400] [--venues 8]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rtca.imd import analyze
+
+
+def synthetic(per_venue, n_venues, seed=0):
+    rng = np.random.default_rng(seed)
+    n = per_venue * n_venues
+    return pd.DataFrame({
+        "Venue Code": np.repeat([f"V{i:02d}" for i in range(n_venues)], per_venue),
+        "Request ID": np.arange(n).astype(str),
+        "center": rng.uniform(470.0, 694.0, n).round(3),
+        "width_mhz": rng.choice([0.0125, 0.025, 0.2], n),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-venue", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--venues", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    print(f"{'per venue':>10} {'serial s':>9} {'pool s':>8} {'hits':>10}")
+    for per_venue in args.per_venue:
+        data = synthetic(per_venue, args.venues)
+        t0 = time.perf_counter()
+        _, totals = analyze(data, workers=0)
+        serial = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        _, totals_pool = analyze(data, workers=args.workers)
+        pooled = time.perf_counter() - t0
+        assert totals == totals_pool
+        print(f"{per_venue:>10} {serial:>9.2f} {pooled:>8.2f} {sum(totals.values()):>10}")
+
+
+if __name__ == "__main__":
+    main()
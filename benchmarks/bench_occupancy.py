@@ -0,0 +1,87 @@
+"""Benchmark di rtca.occupancy.occupancy contro il vecchio doppio iterrows.
+
+    python -m benchmarks.bench_occupancy [--sizes 1000 10000 100000 200000]
+
+Per le taglie piccole verifica anche che le percentuali coincidano con
+l'implementazione originale di build_occupancy_chart.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rtca.occupancy import occupancy
+
+LEGACY_MAX_ROWS = 5000
+
+
+def synthetic(n_assign, n_venues=60, ranges_per_venue=4, seed=0):
+    rng = np.random.default_rng(seed)
+    venues = [f"V{i:03d}" for i in range(n_venues)]
+    clean = pd.DataFrame({
+        "Venue Code": rng.choice(venues, n_assign),
+        "center": rng.uniform(30.0, 6000.0, n_assign).round(4),
+        "width_mhz": rng.choice([0.0125, 0.025, 0.2, 1.0, 8.0, 20.0], n_assign),
+    })
+    rows = []
+    for v in venues:
+        edges = np.sort(rng.uniform(30.0, 6000.0, ranges_per_venue * 2)).round(3)
+        for f_from, f_to in edges.reshape(-1, 2):
+            rows.append({"Venue": v, "Freq. From [MHz]": f_from, "Freq. To [MHz]": f_to, "Tot MHz": f_to - f_from})
+    return clean, pd.DataFrame(rows)
+
+
+def legacy_occupancy(clean_df, cap_df):
+    # Copia del loop originale di build_occupancy_chart (app.py), usata come riferimento
+    venues_list = clean_df.groupby("Venue Code")["width_mhz"].sum().index.tolist()
+    usage_list = []
+    for _, r in cap_df[cap_df["Venue"].isin(venues_list)].iterrows():
+        f_from, f_to, tot = float(r["Freq. From [MHz]"]), float(r["Freq. To [MHz]"]), float(r["Tot MHz"])
+        overlaps = []
+        for _, a in clean_df[clean_df["Venue Code"] == r["Venue"]].iterrows():
+            start = max(a["center"] - a["width_mhz"] / 2, f_from)
+            end = min(a["center"] + a["width_mhz"] / 2, f_to)
+            if end > start:
+                overlaps.append((start, end))
+        merged = []
+        for interval in sorted(overlaps):
+            if not merged or interval[0] > merged[-1][1]:
+                merged.append(list(interval))
+            else:
+                merged[-1][1] = max(merged[-1][1], interval[1])
+        assigned = sum(e - s for s, e in merged)
+        usage_list.append({"Venue": r["Venue"], "Range": f"{f_from}-{f_to} MHz",
+                           "Occupancy": (assigned / tot * 100) if tot > 0 else 0})
+    return pd.DataFrame(usage_list)
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 200000])
+    parser.add_argument("--venues", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    print(f"{'assignments':>12} {'vectorized ms':>14} {'legacy ms':>10} {'max abs diff %':>15}")
+    for n in args.sizes:
+        clean, cap = synthetic(n, n_venues=args.venues)
+        t_new, new = timed(occupancy, clean, cap)
+        t_old, diff = float("nan"), float("nan")
+        if n <= LEGACY_MAX_ROWS:
+            t_old, old = timed(legacy_occupancy, clean, cap, repeat=1)
+            assert list(old["Range"]) == list(new["Range"])
+            diff = float(np.max(np.abs(old["Occupancy"].to_numpy(float) - new["Occupancy"].to_numpy(float))))
+        print(f"{n:>12} {t_new * 1e3:>14.2f} {t_old * 1e3:>10.1f} {diff:>15.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Tempo e memoria di ogni stadio delle dashboard su workbook sintetici di varie taglie.
+
+    python -m benchmarks.bench_pipeline [--sizes 1000 10000 100000] [--workdir .bench] [--json out.jsonl]
+
+Per ogni taglia genera (una volta, in --workdir) un workbook con
+benchmarks.workbook_gen e avvia un processo nuovo con RTCA_WORKBOOK e
+RTCA_LAN_WORKBOOK puntati al file: niente gdown, tutto offline. Nel processo
+app.py e app_LAN.py girano in bare mode (senza server Streamlit: i widget
+restituiscono i default, cioe' periodo Olympic e tutti gli stakeholder), poi
+ogni stadio viene richiamato direttamente con le funzioni delle app.
+
+Per stadio: tempo migliore su --repeat esecuzioni e picco di memoria
+allocata (tracemalloc, in un'esecuzione separata); per processo: picco RSS.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(fn, repeat, traced=True):
+    """(ms migliore, picco MB allocati, risultato) di fn(); senza ``traced`` il picco e' nan."""
+    import tracemalloc
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    if not traced:
+        return best * 1000, float("nan"), out
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 2**20, out
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(l.split()[1]) for l in f if l.startswith("VmHWM:")) / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stages(path, repeat):
+    """Eseguito nel processo figlio: ritorna [(stadio, ms, MB)]."""
+    import logging
+    import runpy
+    import warnings
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore")
+
+    import plotly.io as pio
+
+    from rtca.columns import SHEET_ALL_NP
+    from rtca.core import build_dataset, take
+    from rtca.cube import Cube
+    from rtca.figcache import FigureCache
+    from rtca.filters import FilterIndex
+    from rtca.normalize import normalize
+    from rtca.workbook import ALL_NP_SCHEMA, WORKBOOK_TYPES, read_workbook
+
+    results = []
+
+    def stage(name, fn, times=repeat, traced=True):
+        ms, mb, out = measure(fn, times, traced)
+        results.append((name, ms, mb))
+        return out
+
+    # Script completi a freddo (snapshot Arrow, cache, sidebar): una sola esecuzione, la seconda sarebbe in cache
+    app = stage("app.py script (cold)", lambda: runpy.run_path(os.path.join(REPO_ROOT, "app.py")), 1, False)
+    lan = stage("app_LAN.py script (cold)", lambda: runpy.run_path(os.path.join(REPO_ROOT, "app_LAN.py")), 1, False)
+
+    # Caricamento: parse dell'xlsx (primo avvio) e lettura dello snapshot (avvii successivi)
+    stage("load: xlsx parse", lambda: read_workbook(path, WORKBOOK_TYPES, require_sheets=False), times=1)
+    source, version = app["get_source"](), app["data_ver"]
+    raw = stage("load: snapshot read", lambda: build_dataset(source, version).frame(SHEET_ALL_NP, ALL_NP_SCHEMA))
+    cap_df = app["load_capacity"](version)
+
+    df = stage("OTH normalization", lambda: normalize(raw))
+    cols = [app["col_period"], app["col_stake"], app["col_ticket"], app["col_service"], app["col_venue"]]
+    fidx = stage("filter index build", lambda: FilterIndex(df, cols))
+
+    def sidebar(stake):
+        rows = fidx.select(None, app["col_period"], ["Olympic"])
+        if stake is not None:
+            rows = fidx.select(rows, app["col_stake"], [stake])
+        services = fidx.options(rows, app["col_service"])
+        rows = fidx.select(rows, app["col_service"], services)
+        venues = fidx.options(rows, app["col_venue"])
+        return df.take(fidx.select(rows, app["col_venue"], venues))
+
+    filtered = stage("sidebar filtering (all)", lambda: sidebar(None))
+    one = fidx.options(fidx.select(None, app["col_period"], ["Olympic"]), app["col_stake"])[0]
+    stage("sidebar filtering (one stakeholder)", lambda: sidebar(one))
+
+    clean = filtered.dropna(subset=[app["col_ao"], app["col_aq"], app["col_request"]])
+    fig, _ = stage("make_fig", lambda: app["make_fig"](clean))
+    # Quello che st.plotly_chart fa a ogni rerun: to_dict + to_json, da figura nuova o dalla cache
+    stage("spectrum serialize (no cache)", lambda: pio.to_json(fig.to_dict(), validate=False))
+    cache = FigureCache()
+    cache.get(version, (), "spectrum", lambda: fig)
+    stage("spectrum serialize (figure cache hit)",
+          lambda: pio.to_json(cache.get(version, (), "spectrum", None)[0].to_dict(), validate=False))
+    stage("build_occupancy_chart", lambda: app["build_occupancy_chart"](clean, cap_df))
+    cube = stage("aggregate cube build", lambda: Cube(df, fidx))
+    view = stage("cube roll-up (all)", lambda: cube.rollup({app["col_period"]: ["Olympic"]}))
+    stage("stats_fig", lambda: app["stats_fig"](view))
+    stage("KO by priority", lambda: app["ko_priority_fig"](view))
+    stage("KO stakeholder ranking", lambda: app["ko_ranking_fig"](view))
+
+    # La sezione Table/Status di app_LAN.py non tiene piu' un frame filtrato a livello di modulo
+    lan_df = take(lan["load_normalized"](lan["data_ver"]), lan["rows"])
+    stage("LAN compute_chart_df", lambda: lan["compute_chart_df"](lan_df))
+    stage("LAN make_status_pies", lambda: lan["make_status_pies"](lan_df))
+
+    results.append(("dataset in memory (deep)", float("nan"), df.memory_usage(deep=True).sum() / 2**20))
+    results.append(("process peak RSS", float("nan"), peak_rss_mb()))
+    return results
+
+
+def child(path, repeat):
+    print(json.dumps(run_stages(path, repeat)))
+
+
+def ensure_workbook(workdir, rows, seed):
+    """Percorso del workbook sintetico in ``workdir``, generato alla prima richiesta."""
+    from benchmarks.workbook_gen import write_workbook
+
+    path = os.path.join(workdir, f"synthetic_{rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        write_workbook(path + ".tmp.xlsx", rows, seed=seed)
+        os.replace(path + ".tmp.xlsx", path)
+        print(f"generated {path} in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return path
+
+
+def run_child(module, path, cache_dir, workdir, args):
+    """Esegue ``python -m module --child path args`` con le dashboard puntate a ``path``; ritorna l'ultima riga JSON."""
+    env = dict(os.environ, RTCA_WORKBOOK=path, RTCA_LAN_WORKBOOK=path, RTCA_CACHE_DIR=cache_dir,
+               PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-m", module, "--child", path] + list(args),
+                         capture_output=True, text=True, check=True, cwd=workdir, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_size(rows, workdir, repeat, seed):
+    path = ensure_workbook(workdir, rows, seed)
+    cache_dir = os.path.join(workdir, f"cache_{rows}_{seed}")
+    # Snapshot di una corsa precedente: lo script "cold" deve ripartire dall'xlsx
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return run_child("benchmarks.bench_pipeline", path, cache_dir, workdir, ["--repeat", str(repeat)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="aggiunge una riga JSON per (taglia, stadio) a questo file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child(args.child, args.repeat)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    workdir = os.path.abspath(args.workdir)
+    for rows in args.sizes:
+        results = run_size(rows, workdir, args.repeat, args.seed)
+        print(f"\n{rows:,} rows")
+        print(f"{'stage':<38} {'best ms':>10} {'peak MB':>9}")
+        for name, ms, mb in results:
+            print(f"{name:<38} {'' if ms != ms else f'{ms:.1f}':>10} {'' if mb != mb else f'{mb:.1f}':>9}")
+        if args.json:
+            with open(args.json, "a") as f:
+                for name, ms, mb in results:
+                    f.write(json.dumps({"rows": rows, "stage": name, "ms": None if ms != ms else round(ms, 3),
+                                        "mb": None if mb != mb else round(mb, 3), "ts": time.time()}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
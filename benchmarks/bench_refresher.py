@@ -0,0 +1,125 @@
+"""Refresher in background: latenza delle richieste durante un aggiornamento del workbook.
+
+    python -m benchmarks.bench_refresher [--rows 10000] [--workdir .bench] [--delay 2] [--interval 1]
+
+Sorgente locale al posto di Drive (``StandInSource``: un LocalFileSource con
+un ritardo di "download" e un guasto comandabile). Mentre un ciclo di
+richieste chiama ``current_version()`` ogni 10 ms, il workbook viene
+sostituito con un'altra versione e poi la sorgente viene messa in errore:
+si misura la latenza delle richieste, dopo quanto la nuova versione viene
+servita e che dopo il guasto si continui a servire l'ultima versione buona.
+Per confronto, il costo che una richiesta pagava col TTL sul percorso delle
+richieste (refresh + caricamento della nuova versione).
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import ensure_workbook
+from rtca.core import load_dataset
+from rtca.refresher import FAILED, Refresher
+from rtca.sources import LocalFileSource
+
+
+class StandInSource(LocalFileSource):
+    """Sorgente locale con latenza di download simulata e guasto su richiesta."""
+
+    name = "standin"
+
+    def __init__(self, path, delay=0.0):
+        super().__init__(path)
+        self.delay = delay
+        self.fail = False
+
+    def refresh(self):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("stand-in source offline")
+        return super().refresh()
+
+
+def replace_file(src, dst):
+    """Copia atomica di ``src`` su ``dst`` (come il rename del download)."""
+    shutil.copyfile(src, dst + ".tmp")
+    os.replace(dst + ".tmp", dst)
+
+
+def requests(refresher, seconds, period=0.01):
+    """Chiamate a ``current_version()`` per ``seconds``: [(istante, versione, latenza s)]."""
+    out, end = [], time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        version = refresher.current_version()
+        out.append((t0, version, time.perf_counter() - t0))
+        time.sleep(period)
+    return out
+
+
+def report(name, samples):
+    lat = sorted(s[2] for s in samples)
+    p50, p99 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+    print(f"{name:<28} {len(lat):>5} requests · p50 {p50 * 1e6:,.0f} us · p99 {p99 * 1e6:,.0f} us · "
+          f"max {lat[-1] * 1000:,.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--delay", type=float, default=2.0, help="simulated download time (s)")
+    parser.add_argument("--interval", type=float, default=1.0, help="refresh interval (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    workdir = os.path.abspath(args.workdir)
+    first, second = ensure_workbook(workdir, args.rows, args.seed), ensure_workbook(workdir, args.rows, args.seed + 1)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        live = os.path.join(tmp, "live.xlsx")
+        replace_file(first, live)
+        cache_dir = os.path.join(tmp, "cache")
+        source = StandInSource(live, args.delay)
+        refresher = Refresher(source, args.interval, load=lambda s, v: load_dataset(s, v, cache_dir))
+
+        t0 = time.perf_counter()
+        v1 = refresher.current_version()
+        print(f"first load (blocking, nothing to serve yet): {time.perf_counter() - t0:.2f} s -> {v1}")
+        refresher.start()
+
+        report("steady", requests(refresher, 2 * args.interval))
+
+        replace_file(second, live)
+        swapped_at = time.perf_counter()
+        samples = requests(refresher, args.interval + 3 * args.delay + 10)
+        report("during update", samples)
+        served = [t for t, v, _ in samples if v != v1]
+        status = refresher.status()
+        if served:
+            print(f"new version {status['version']} served {served[0] - swapped_at:.2f} s after the file changed "
+                  f"(download + parse off the request path)")
+        else:
+            print("new version not served yet: increase the request window")
+
+        source.fail = True
+        refresher.trigger()
+        samples = requests(refresher, args.interval + 2 * args.delay)
+        report("source failing", samples)
+        status = refresher.status()
+        print(f"last outcome: {status['outcome']} ({status['error']}); still serving {samples[-1][1]}"
+              f" -> {'ok' if status['outcome'] == FAILED and samples[-1][1] == status['version'] else 'UNEXPECTED'}")
+        refresher.stop()
+
+        # Prima: alla scadenza del TTL la richiesta faceva refresh + caricamento della nuova versione
+        other = os.path.join(tmp, "ttl.xlsx")
+        replace_file(second, other)
+        ttl_source = StandInSource(other, args.delay)
+        t0 = time.perf_counter()
+        load_dataset(ttl_source, ttl_source.refresh(), os.path.join(tmp, "cache_ttl"))
+        print(f"before (TTL on the request path): one request blocked {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
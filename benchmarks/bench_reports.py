@@ -0,0 +1,66 @@
+"""Bundle dei riepiloghi: tempo di costruzione e tempo per combinazione, live contro pre-calcolato.
+
+    python -m benchmarks.bench_reports [--rows 10000] [--workdir .bench] [--workers N] [--sample 20]
+
+Genera (una volta, in --workdir) un workbook sintetico, costruisce il bundle
+di rtca.reports e confronta, su --sample combinazioni, il calcolo live dei
+riepiloghi (roll-up del cubo + figure, come main_display) con la lettura del bundle.
+"""
+import argparse
+import os
+import random
+import shutil
+import time
+
+from rtca.core import load_dataset, olympic_index
+from rtca.cube import olympic_cube
+from rtca.reports import build_bundle, combinations, load_summary, rollup, summary
+from rtca.sources import LocalFileSource
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--tickets", action="store_true")
+    parser.add_argument("--sample", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from benchmarks.workbook_gen import write_workbook
+
+    os.makedirs(args.workdir, exist_ok=True)
+    path = os.path.join(args.workdir, f"synthetic_{args.rows}_{args.seed}.xlsx")
+    if not os.path.exists(path):
+        write_workbook(path + ".tmp.xlsx", args.rows, seed=args.seed)
+        os.replace(path + ".tmp.xlsx", path)
+    cache_dir = os.path.join(args.workdir, f"cache_{args.rows}_{args.seed}")
+    out = os.path.join(args.workdir, f"reports_{args.rows}_{args.seed}")
+    shutil.rmtree(out, ignore_errors=True)
+
+    source = LocalFileSource(path)
+    version = source.refresh()
+    dataset = load_dataset(source, version, cache_dir)
+    cube, fidx = olympic_cube(dataset), olympic_index(dataset)
+
+    t0 = time.perf_counter()
+    _, n = build_bundle(source, version, out, args.tickets, args.workers, cache_dir=cache_dir)
+    build_s = time.perf_counter() - t0
+    print(f"bundle: {n:,} combinations in {build_s:.1f} s ({build_s / n * 1000:.0f} ms each, workers={args.workers})")
+
+    combos = random.Random(args.seed).sample(combinations(fidx, args.tickets), min(args.sample, n))
+    digest = source.content_digest(version)
+    live = served = 0.0
+    for combo in combos:
+        t0 = time.perf_counter()
+        summary(rollup(cube, *combo))
+        live += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load_summary(digest, *combo, out=out)
+        served += time.perf_counter() - t0
+    print(f"per combination: live {live / len(combos) * 1000:.1f} ms, served {served / len(combos) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
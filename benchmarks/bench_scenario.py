@@ -0,0 +1,104 @@
+"""Scenari what-if: costo di una modifica col ricalcolo incrementale contro il ricalcolo completo.
+
+    python -m benchmarks.bench_scenario [--rows 10000] [--workdir .bench] [--edits 20]
+
+Sul workbook sintetico si applica una sequenza di modifiche (rimozioni per
+stakeholder / venue / priorita', spostamenti di richieste NOT ASSIGNED,
+aggiunte). Per ogni passo, il percorso della dashboard: delta aggiornato
+con la sola nuova modifica, celle della modifica aggiunte al cubo del passo
+prima, roll-up dei riepiloghi e occupazione delle sole venue toccate dalla
+modifica; contro cubo e occupazione ricostruiti sul frame dello scenario.
+I risultati dei due percorsi vengono confrontati, e il delta incrementale
+con quello ricalcolato da tutte le modifiche.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_pipeline import ensure_workbook
+from rtca import scenario
+from rtca.columns import COL_BX, COL_PERIOD, COL_REQUEST, COL_SERVICE, COL_STAKE, COL_VENUE
+from rtca.core import OLYMPIC_INDEX, chart_rows, load_dataset, olympic_capacity, olympic_frame, olympic_index
+from rtca.cube import Cube, olympic_cube
+from rtca.filters import FilterIndex
+from rtca.occupancy import occupancy
+from rtca.sources import LocalFileSource
+
+PERIOD = "Olympic"
+
+
+def edit_sequence(df, n, seed):
+    """``n`` modifiche plausibili sul periodo: rimozioni, spostamenti di KO, aggiunte."""
+    rng = np.random.default_rng(seed)
+    period = df[df[COL_PERIOD].astype(str) == PERIOD]
+    ko = period.loc[period[COL_BX].isna(), COL_REQUEST].astype(str).to_numpy()
+    pick = lambda col: str(rng.choice(period[col].dropna().astype(str).unique()))   # noqa: E731
+    edits = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            edits.append(scenario.remove(stake=pick(COL_STAKE), priority=str(rng.integers(1, 5)), period=PERIOD))
+        elif kind == 1 and len(ko):
+            edits.append(scenario.retune(rng.choice(ko), rng.uniform(400, 470)))
+        elif kind == 2:
+            edits.append(scenario.add(f"WHATIF-{i}", pick(COL_VENUE), pick(COL_STAKE), pick(COL_SERVICE), PERIOD,
+                                      str(rng.integers(1, 5)), rng.uniform(400, 470), 25.0, 5.0))
+        else:
+            edits.append(scenario.remove(venue=pick(COL_VENUE), period=PERIOD))
+    return edits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--edits", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    source = LocalFileSource(ensure_workbook(os.path.abspath(args.workdir), args.rows, args.seed))
+    ds = load_dataset(source, source.refresh(), os.path.join(os.path.abspath(args.workdir), "cache"))
+    df, fidx, cap = olympic_frame(ds), olympic_index(ds), olympic_capacity(ds)
+    selection = {COL_PERIOD: [PERIOD]}
+    clean = chart_rows(df.take(fidx.select(None, COL_PERIOD, [PERIOD])))
+    base = occupancy(clean, cap)
+    olympic_cube(ds)   # gia' costruito nella dashboard per i riepiloghi della versione
+    edits = edit_sequence(df, args.edits, args.seed)
+
+    print(f"{len(df):,} rows, {len(clean):,} drawable in {PERIOD}")
+    print(f"{'edit':>4} {'removed':>8} {'added':>6} {'venues':>6} {'incremental ms':>15} {'full ms':>8}  ok  change")
+    worst, delta, cube, usage = 0.0, None, None, base
+    for i in range(1, len(edits) + 1):
+        # Come la dashboard: solo la nuova modifica, celle del cubo e venue toccate dall'ultimo passo
+        t0 = time.perf_counter()
+        delta = scenario.apply_edits(ds, edits[i - 1:i], base=delta)
+        cube = scenario.scenario_cube(ds, delta, base=cube)
+        view = cube.rollup(selection)
+        counts, ko = view.status_counts(), view.ko_by_priority()
+        usage = scenario.patch_occupancy(usage, clean, delta, selection, cap, venues=delta.step_venues)
+        t_inc = time.perf_counter() - t0
+        worst = max(worst, t_inc)
+
+        t0 = time.perf_counter()
+        keep = np.ones(len(df), dtype=bool)
+        keep[delta.removed] = False
+        frame = pd.concat([df[keep], delta.added.infer_objects()])
+        full = Cube(frame.reset_index(drop=True), FilterIndex(frame, OLYMPIC_INDEX)).rollup(selection)
+        full_usage = occupancy(chart_rows(scenario._selected(frame, selection)), cap)
+        t_full = time.perf_counter() - t0
+
+        replay = scenario.apply_edits(ds, edits[:i])
+        ok = (np.array_equal(replay.removed, delta.removed) and replay.added.equals(delta.added)
+              and counts.equals(full.status_counts()) and ko.equals(full.ko_by_priority())
+              and np.allclose(usage["Occupancy"].to_numpy(float), full_usage["Occupancy"].to_numpy(float)))
+        print(f"{i:>4} {len(delta.removed):>8,} {len(delta.added):>6} {len(delta.venues):>6} {t_inc * 1e3:>15.1f} "
+              f"{t_full * 1e3:>8.1f}  {'ok' if ok else 'MISMATCH'}  {scenario.describe(edits[i - 1])}")
+    print(f"slowest incremental edit: {worst * 1e3:.1f} ms (target < 100 ms)")
+
+
+if __name__ == "__main__":
+    main()
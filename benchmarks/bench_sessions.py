@@ -0,0 +1,111 @@
+"""Memoria per sessione: dataset condiviso contro copia per rerun (come con st.cache_data).
+
+    python -m benchmarks.bench_sessions [--sizes 10000 100000] [--sessions 8] [--workdir .bench]
+
+In un processo nuovo (dashboard puntate a un workbook sintetico, come in
+benchmarks.bench_pipeline) si tengono vive --sessions esecuzioni di app.py e
+di app_LAN.py, come sessioni concorrenti a meta' rerun, e si misura la
+memoria che ciascuna aggiunge (tracemalloc per gli array NumPy/Python, piu'
+il pool di Arrow per le stringhe).
+
+"before" riproduce il modello precedente: ogni rerun riceve una copia
+profonda del frame dalla cache (st.cache_data = pickle) e ne filtra una
+seconda copia; "after" sono gli script attuali, che lavorano su viste del
+dataset unico e su array di posizioni.
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.bench_pipeline import REPO_ROOT, ensure_workbook, run_child
+
+
+def _allocated():
+    import tracemalloc
+
+    import pyarrow as pa
+    return tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes()
+
+
+def per_session(make, sessions):
+    """MB trattenuti in media da ``make()`` con ``sessions`` risultati vivi insieme."""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    base = _allocated()
+    alive = [make() for _ in range(sessions)]
+    used = _allocated() - base
+    tracemalloc.stop()
+    del alive
+    return used / sessions / 2**20
+
+
+def run_sessions(sessions):
+    """Eseguito nel processo figlio: ritorna [(misura, MB)]."""
+    import logging
+    import pickle
+    import runpy
+    import warnings
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore")
+
+    from rtca.core import lan_table, nbytes, olympic_frame
+
+    app_path, lan_path = os.path.join(REPO_ROOT, "app.py"), os.path.join(REPO_ROOT, "app_LAN.py")
+    # Primo giro: dataset, snapshot e cache di processo caricati una volta
+    app = runpy.run_path(app_path)
+    lan = runpy.run_path(lan_path)
+    dataset = app["dataset"](app["data_ver"])
+    shared = olympic_frame(dataset)
+    shared_lan = lan_table(lan["load_dataset"](lan["get_source"](), lan["data_ver"]))
+    period = app["col_period"]
+
+    def before_app():
+        df = pickle.loads(pickle.dumps(shared))            # copia restituita da st.cache_data
+        filtered = df[df[period] == "Olympic"]             # maschera booleana = seconda copia
+        return df, filtered, filtered.dropna(subset=[app["col_ao"], app["col_aq"], app["col_request"]]).copy()
+
+    def before_lan():
+        df = pickle.loads(pickle.dumps(shared_lan))
+        return df, df.copy(), df.copy()                    # df_options, filtered e filtered_map
+
+    return [
+        ("shared dataset (once per process)", nbytes(shared) / 2**20),
+        ("app.py before: per session", per_session(before_app, sessions)),
+        ("app.py after: per session", per_session(lambda: runpy.run_path(app_path), sessions)),
+        ("app_LAN.py before: per session", per_session(before_lan, sessions)),
+        ("app_LAN.py after: per session", per_session(lambda: runpy.run_path(lan_path), sessions)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--workdir", default=".bench")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_sessions(args.sessions)))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    workdir = os.path.abspath(args.workdir)
+    for rows in args.sizes:
+        path = ensure_workbook(workdir, rows, args.seed)
+        cache_dir = os.path.join(workdir, f"cache_{rows}_{args.seed}")
+        results = run_child("benchmarks.bench_sessions", path, cache_dir, workdir, ["--sessions", str(args.sessions)])
+        print(f"\n{rows:,} rows, {args.sessions} concurrent sessions")
+        for name, mb in results:
+            print(f"{name:<36} {mb:>9.2f} MB")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
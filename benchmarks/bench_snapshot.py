@@ -0,0 +1,96 @@
+"""Cold load: read_excel (percorso attuale) contro il snapshot Arrow in memory map.
+
+    python -m benchmarks.bench_snapshot [--workbook frequenze.xlsx] [--rows 20000]
+
+Ogni misura gira in un processo Python nuovo, cosi' tempo e picco di RSS
+(VmHWM) sono quelli di un avvio a freddo. Senza --workbook viene generato
+un workbook sintetico con i fogli "ALL NP" e "Capacity NP-OLY".
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SHEETS = ["ALL NP", "Capacity NP-OLY"]
+
+PROBE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+mode, path, cache_dir = sys.argv[1:4]
+import pandas as pd
+if mode == "xlsx":
+    frames = [pd.read_excel(path, sheet_name="ALL NP"), pd.read_excel(path, sheet_name="Capacity NP-OLY")]
+else:
+    from rtca.snapshot import read_sheet
+    frames = [read_sheet("bench", s, cache_dir) for s in ("ALL NP", "Capacity NP-OLY")]
+rows = sum(len(f) for f in frames)
+elapsed = time.perf_counter() - t0
+# VmHWM si azzera con exec; ru_maxrss puo' ereditare il picco del processo padre
+try:
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rows": rows, "maxrss_mb": peak_kb / 1024}))
+"""
+
+
+def tiny_workbook(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    venues = [f"V{i:02d}" for i in range(40)]
+    all_np = pd.DataFrame({
+        "Request ID": np.arange(rows),
+        "License Period": rng.choice(["Olympic", "Paralympic"], rows),
+        "Venue Code": rng.choice(venues, rows),
+        "Stakeholder Business ID": rng.choice([f"S{i:03d}" for i in range(150)], rows),
+        "Service Tri Code": rng.choice(["PMR", "WMC", "VLK", "IEM"], rows),
+        "Attributed Frequency TX (MHz)": np.where(rng.random(rows) < 0.8, rng.uniform(30, 6000, rows), np.nan),
+        "Channel Bandwidth (kHz)": rng.choice([12.5, 25, 200, 8000], rows),
+        "Transmission Power (W)": rng.choice([0.01, 0.05, 1, 5], rows),
+        "Notes": rng.choice(["", "indoor", "outdoor", "mobile"], rows),
+    })
+    cap = pd.DataFrame({"Venue": venues, "Freq. From [MHz]": 470.0, "Freq. To [MHz]": 694.0, "Tot MHz": 224.0})
+    with pd.ExcelWriter(path) as xw:
+        all_np.to_excel(xw, sheet_name="ALL NP", index=False)
+        cap.to_excel(xw, sheet_name="Capacity NP-OLY", index=False)
+
+
+def probe(mode, path, cache_dir):
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", PROBE, mode, path, cache_dir],
+                         capture_output=True, text=True, check=True, cwd=repo_root)
+    return json.loads(out.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workbook")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from rtca.snapshot import ensure_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.workbook
+        if path is None:
+            path = os.path.join(tmp, "frequenze.xlsx")
+            tiny_workbook(path, args.rows)
+        cache_dir = os.path.join(tmp, "cache")
+        ensure_snapshot(path, "bench", SHEETS, cache_dir)
+
+        print(f"workbook: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        print(f"{'path':>10} {'rows':>8} {'cold s (best)':>14} {'peak RSS MB':>12}")
+        for mode in ("xlsx", "snapshot"):
+            runs = [probe(mode, path, cache_dir) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            print(f"{mode:>10} {best['rows']:>8} {best['seconds']:>14.3f} {max(r['maxrss_mb'] for r in runs):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Solver delle proposte di frequenza: tempo di un re-plan completo e verifica delle proposte.
+
+    python -m benchmarks.bench_solver [--sizes 1000 5000 20000] [--venues 40]
+
+Meta' delle richieste sono gia' assegnate (occupano lo spettro), le altre
+sono NOT ASSIGNED e vengono pianificate. La verifica controlla che nessuna
+proposta esca dalla capacity della venue o si sovrapponga ad altri canali.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rtca.columns import (
+    CAP_FROM, CAP_TO, CAP_TOT, CAP_VENUE, CENTER, COL_AO, COL_BX, COL_PNRF, COL_PRIORITY, COL_REQUEST,
+    COL_STAKE, COL_TUNE_FROM, COL_TUNE_STEP, COL_TUNE_TO, COL_VENUE, POWER_DBM, WIDTH_MHZ,
+)
+from rtca.solver import PROPOSED, plan
+
+
+def synthetic(n, n_venues=40, seed=0):
+    rng = np.random.default_rng(seed)
+    venues = np.array([f"V{i:02d}" for i in range(n_venues)])
+    bw = rng.choice([12.5, 25.0, 200.0], n, p=[0.5, 0.4, 0.1])
+    tune_from = rng.choice([450.0, 470.0, 600.0], n)
+    assigned = rng.random(n) < 0.5
+    center = np.round(rng.uniform(470.0, 694.0, n) / 0.0125) * 0.0125
+    df = pd.DataFrame({
+        COL_REQUEST: [f"R{i:07d}" for i in range(n)],
+        COL_VENUE: rng.choice(venues, n),
+        COL_STAKE: rng.choice([f"S{i:03d}" for i in range(60)], n),
+        COL_PRIORITY: rng.choice([1, 2, 3, 4], n),
+        COL_PNRF: rng.choice(["", "MoD"], n, p=[0.95, 0.05]),
+        COL_BX: np.where(assigned, center, np.nan),
+        COL_AO: bw,
+        COL_TUNE_FROM: tune_from,
+        COL_TUNE_TO: tune_from + 100.0,
+        COL_TUNE_STEP: 12.5,
+        POWER_DBM: rng.uniform(0.0, 40.0, n),
+    })
+    df[CENTER] = df[COL_BX]
+    df[WIDTH_MHZ] = bw / 1000.0
+    cap = pd.DataFrame({CAP_VENUE: np.repeat(venues, 2),
+                        CAP_FROM: np.tile([470.0, 600.0], n_venues),
+                        CAP_TO: np.tile([560.0, 694.0], n_venues)})
+    cap[CAP_TOT] = cap[CAP_TO] - cap[CAP_FROM]
+    return df, cap
+
+
+def check(df, cap, proposals):
+    """Numero di proposte fuori capacity o sovrapposte ad altri canali (assegnati o proposti)."""
+    ok = proposals[proposals["Result"] == PROPOSED]
+    chans = pd.concat([
+        pd.DataFrame({"venue": df[COL_VENUE], "lo": df[CENTER] - df[WIDTH_MHZ] / 2, "hi": df[CENTER] + df[WIDTH_MHZ] / 2,
+                      "proposed": False}).dropna(),
+        pd.DataFrame({"venue": ok["Venue Code"], "lo": ok[CENTER] - ok[WIDTH_MHZ] / 2, "hi": ok[CENTER] + ok[WIDTH_MHZ] / 2,
+                      "proposed": True}),
+    ], ignore_index=True)
+    bad = 0
+    for venue, grp in chans.groupby("venue"):
+        rng = cap[cap[CAP_VENUE] == venue]
+        grp = grp.sort_values("lo")
+        lo, hi, prop = grp["lo"].to_numpy(), grp["hi"].to_numpy(), grp["proposed"].to_numpy()
+        inside = ((lo[:, None] >= rng[CAP_FROM].to_numpy() - 1e-9) & (hi[:, None] <= rng[CAP_TO].to_numpy() + 1e-9)).any(1)
+        bad += int((prop & ~inside).sum())
+        overlap = lo[1:] < np.maximum.accumulate(hi)[:-1] - 1e-9
+        bad += int((overlap & (prop[1:] | prop[:-1])).sum())
+    return bad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--venues", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'to plan':>8} {'proposed':>9} {'no fit':>7} {'plan ms':>9} {'bad':>5}")
+    for n in args.sizes:
+        df, cap = synthetic(n, args.venues)
+        t0 = time.perf_counter()
+        proposals = plan(df, cap)
+        ms = (time.perf_counter() - t0) * 1000
+        outcome = proposals["Result"].value_counts()
+        print(f"{n:>8} {len(proposals):>8} {outcome.get(PROPOSED, 0):>9} {len(proposals) - outcome.get(PROPOSED, 0):>7}"
+              f" {ms:>9.0f} {check(df, cap, proposals):>5}")
+
+
+if __name__ == "__main__":
+    main()
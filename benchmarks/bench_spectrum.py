@@ -0,0 +1,74 @@
+"""Spettro: una traccia per stakeholder con maschere (vecchio make_fig) contro spectrum_traces.
+
+    python -m benchmarks.bench_spectrum [--sizes 1000 10000 50000 200000]
+
+Riporta tempo di costruzione della figura e dimensione del JSON inviato al browser,
+per la vista intera e per uno zoom su 5 MHz.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from rtca.spectrum import payload_kb, spectrum_traces
+
+STAKE, BW = "Stakeholder Business ID", "Channel Bandwidth (kHz)"
+
+
+def synthetic(n, seed=0):
+    rng = np.random.default_rng(seed)
+    bw = rng.choice([12.5, 25.0, 200.0, 8000.0], n)
+    return pd.DataFrame({
+        STAKE: rng.choice([f"S{i:03d}" for i in range(60)], n),
+        BW: bw,
+        "center": rng.uniform(400.0, 2500.0, n),
+        "width_mhz": bw / 1000.0,
+        "power_dBm": rng.uniform(0.0, 40.0, n),
+        "req_id": np.arange(n).astype(str),
+    })
+
+
+def legacy_fig(data):
+    # Loop del vecchio make_fig (app.py): una maschera booleana per stakeholder
+    fig = go.Figure()
+    palette = px.colors.qualitative.Dark24
+    for i, stake in enumerate(sorted(data[STAKE].astype(str).unique())):
+        grp = data[data[STAKE] == stake]
+        fig.add_trace(go.Bar(x=grp["center"], y=grp["power_dBm"], width=grp["width_mhz"], name=stake,
+                             marker_color=palette[i % len(palette)], opacity=0.8,
+                             customdata=list(zip(grp["req_id"], grp[BW]))))
+    return fig
+
+
+def lod_fig(data, x_range=None):
+    traces, info = spectrum_traces(data, STAKE, BW, x_range=x_range)
+    return go.Figure(traces), info
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return (time.perf_counter() - t0) * 1000, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 200000])
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'legacy ms':>10} {'legacy kB':>10} {'LOD ms':>8} {'LOD kB':>8} {'mode':>9}"
+          f" {'zoom ms':>8} {'zoom kB':>8} {'zoom bars':>9}")
+    for n in args.sizes:
+        data = synthetic(n)
+        t_old, old = timed(legacy_fig, data)
+        t_new, (new, info) = timed(lod_fig, data)
+        t_zoom, (zoom, zinfo) = timed(lod_fig, data, (1000.0, 1005.0))
+        print(f"{n:>8} {t_old:>10.1f} {payload_kb(old):>10.0f} {t_new:>8.1f} {payload_kb(new):>8.0f} {info['mode']:>9}"
+              f" {t_zoom:>8.1f} {payload_kb(zoom):>8.0f} {zinfo['bars']:>9}")
+
+
+if __name__ == "__main__":
+    main()
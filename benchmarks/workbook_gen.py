@@ -0,0 +1,136 @@
+"""Workbook sintetico con i fogli "ALL NP" e "Capacity NP-OLY", da 1k a 1M righe.
+
+    python -m benchmarks.workbook_gen frequenze.xlsx --rows 100000 [--venues 80] [--stakeholders 400]
+
+Le colonne sono quelle lette da app.py e app_LAN.py (schemi in rtca.workbook
+piu' "Stakeholder ID" e "FINAL Status"). Le frequenze cadono nelle bande
+tipiche PMSE, con venue OTH da sostituire, richieste MoD, righe NOT ASSIGNED
+con tuning range e un paio di range di capacity per venue. Il foglio viene
+scritto in streaming (openpyxl write-only), quindi anche 1M righe stanno in
+memoria senza problemi; Excel ne accetta al massimo 1.048.575.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from rtca.columns import (
+    CAP_FROM, CAP_TO, CAP_TOT, CAP_VENUE, COL_AO, COL_AQ, COL_BX, COL_NEW_SERVICE, COL_NEW_VENUE, COL_PERIOD,
+    COL_PNRF, COL_PRIORITY, COL_REQUEST, COL_SERVICE, COL_STAKE, COL_STATO, COL_TICKET, COL_TUNE_FROM,
+    COL_TUNE_STEP, COL_TUNE_TO, COL_VENUE,
+)
+
+MAX_ROWS = 1_048_575
+
+# (da MHz, a MHz, larghezze di canale in kHz): bande in cui cadono richieste e capacity
+BANDS = [
+    (146.0, 174.0, [12.5, 25.0]),
+    (406.0, 470.0, [12.5, 25.0]),
+    (470.0, 694.0, [200.0, 8000.0]),
+    (1785.0, 1805.0, [200.0, 600.0]),
+    (2400.0, 2483.5, [10000.0, 20000.0]),
+    (5725.0, 5875.0, [20000.0, 40000.0]),
+]
+SERVICES = ["PMR", "WMC", "IEM", "VLK", "TAL", "OTH"]
+STATI = ["Pending", "Rejected", "In review", None]
+FINAL = ["JUNIPER", "ASSIGNED", "REJECTED", None]
+
+
+def generate(rows, venues=80, stakeholders=400, seed=0):
+    """Ritorna (all_np, capacity) come DataFrame."""
+    rng = np.random.default_rng(seed)
+    venue_codes = np.array([f"V{i:03d}" for i in range(venues)] + ["OTH"])
+    stake_codes = np.array([f"S{i:04d}" for i in range(stakeholders)])
+
+    band = rng.integers(0, len(BANDS), rows)
+    lo = np.array([b[0] for b in BANDS])[band]
+    hi = np.array([b[1] for b in BANDS])[band]
+    bw = np.empty(rows)
+    for k, (_, _, widths) in enumerate(BANDS):
+        sel = band == k
+        bw[sel] = rng.choice(widths, int(sel.sum()))
+    step = np.where(bw <= 25.0, 12.5, 100.0)
+    # Centro sul raster del tuning step, canale dentro la banda
+    n_steps = np.floor((hi - lo - bw / 1000) / (step / 1000)).astype(np.int64)
+    center = lo + bw / 2000 + rng.integers(0, np.maximum(n_steps, 1)) * step / 1000
+
+    venue = rng.choice(venue_codes, rows, p=np.r_[np.full(venues, 0.97 / venues), 0.03])
+    service = rng.choice(SERVICES, rows, p=[0.3, 0.25, 0.15, 0.15, 0.1, 0.05])
+    pnrf = rng.choice(["", "X", "MoD"], rows, p=[0.85, 0.1, 0.05])
+    assigned = (rng.random(rows) < 0.8) & (pnrf != "MoD")
+    stake = rng.choice(stake_codes, rows)
+
+    all_np = pd.DataFrame({
+        COL_REQUEST: [f"RQ{i:07d}" for i in range(rows)],
+        COL_PERIOD: rng.choice(["Olympic", "Paralympic"], rows, p=[0.7, 0.3]),
+        COL_VENUE: venue,
+        COL_STAKE: stake,
+        "Stakeholder ID": stake,
+        COL_SERVICE: service,
+        COL_TICKET: rng.choice([f"T{i:02d}" for i in range(20)], rows),
+        COL_PNRF: pnrf,
+        COL_NEW_VENUE: np.where(venue == "OTH", rng.choice(venue_codes[:-1], rows), None),
+        COL_NEW_SERVICE: np.where(service == "OTH", rng.choice(SERVICES[:-1], rows), None),
+        COL_BX: np.where(assigned, np.round(center, 6), np.nan),
+        COL_AO: bw,
+        COL_AQ: rng.choice([0.01, 0.05, 0.1, 1.0, 5.0, 10.0], rows),
+        COL_STATO: np.where(assigned, None, rng.choice(np.array(STATI, dtype=object), rows)),
+        "FINAL Status": np.where(assigned, "ASSIGNED", rng.choice(np.array(FINAL, dtype=object), rows)),
+        COL_PRIORITY: rng.choice([1, 2, 3, 4], rows, p=[0.2, 0.3, 0.3, 0.2]),
+        "Usage Type": rng.choice(["Fixed", "Mobile", "Portable"], rows),
+        "Transmission Type": rng.choice(["Analog", "Digital"], rows),
+        "Is Simplex": rng.choice(["Yes", "No"], rows),
+        COL_TUNE_FROM: lo,
+        COL_TUNE_TO: hi,
+        COL_TUNE_STEP: step,
+        "Notes": rng.choice(["", "indoor", "outdoor", "mobile"], rows),
+        "Note ottimizzazione": "",
+        "IMD step": rng.choice(["", "1", "2"], rows),
+        "Note di lavorazione": "",
+    })
+
+    # Due o tre range di capacity per venue, presi dalle bande
+    cap_rows = []
+    for v in venue_codes[:-1]:
+        for k in rng.choice(len(BANDS), rng.integers(2, 4), replace=False):
+            f_from, f_to = BANDS[k][0], BANDS[k][1]
+            cap_rows.append({CAP_VENUE: v, CAP_FROM: f_from, CAP_TO: f_to, CAP_TOT: round(f_to - f_from, 3)})
+    return all_np, pd.DataFrame(cap_rows)
+
+
+def _write_sheet(wb, title, df):
+    ws = wb.create_sheet(title)
+    ws.append(list(df.columns))
+    cols = [df[c].to_numpy(dtype=object) for c in df.columns]
+    for row in zip(*cols):
+        ws.append([None if v is None or (isinstance(v, float) and v != v) else v for v in row])
+
+
+def write_workbook(path, rows, venues=80, stakeholders=400, seed=0):
+    if rows > MAX_ROWS:
+        raise ValueError(f"Excel accepts at most {MAX_ROWS:,} data rows, got {rows:,}")
+    all_np, capacity = generate(rows, venues, stakeholders, seed)
+    wb = Workbook(write_only=True)
+    _write_sheet(wb, "ALL NP", all_np)
+    _write_sheet(wb, "Capacity NP-OLY", capacity)
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--venues", type=int, default=80)
+    parser.add_argument("--stakeholders", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    t0 = time.perf_counter()
+    write_workbook(args.path, args.rows, args.venues, args.stakeholders, args.seed)
+    print(f"{args.path}: {args.rows:,} rows in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
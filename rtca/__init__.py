@@ -0,0 +1 @@
+"""Streamlit-free compute helpers for the Real-Time Channel Assignment dashboards."""
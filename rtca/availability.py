@@ -0,0 +1,153 @@
+"""Indice di disponibilita' dello spettro per venue e periodo, con ricerca dei canali liberi.
+
+Per ogni (venue, periodo) l'indice tiene gli intervalli liberi, ordinati e
+disgiunti: i range di Capacity NP-OLY della venue meno l'unione dei canali
+assegnati (righe disegnabili, center +/- width_mhz/2). La domanda "dove, alla
+venue V, nel tuning range [a, b] con passo s, c'e' un canale libero largo w?"
+diventa una ``searchsorted`` sugli intervalli liberi e qualche operazione per
+intervallo, senza scorrere lo spettro::
+
+    index = availability_index(dataset)
+    index.first_free("V012", "Olympic", 450.0, 470.0, bandwidth_khz=25, step_khz=12.5)
+    index.free_slots("V012", "Olympic", 450.0, 470.0, bandwidth_khz=25, step_khz=12.5, limit=20)
+
+L'indice e' uno per versione dei dati. Alla versione successiva, se la
+capacita' non cambia, si ricalcolano solo le venue toccate dal diff per
+Request ID (``incremental.version_diff``); le altre passano cosi' come sono.
+"""
+import numpy as np
+
+from .columns import CAP_FROM, CAP_TO, CAP_VENUE, CENTER, COL_PERIOD, COL_VENUE, WIDTH_MHZ
+from .core import chart_rows, olympic_capacity, olympic_frame
+from .incremental import version_diff
+from .occupancy import merge_intervals
+from .timing import timings
+
+EPS = 1e-9
+EMPTY = (np.empty(0), np.empty(0))
+
+
+def subtract(starts, ends, cut_starts, cut_ends):
+    """Intervalli (starts, ends) meno (cut_starts, cut_ends); entrambi ordinati e disgiunti."""
+    if not len(starts) or not len(cut_starts):
+        return starts, ends
+    # Buchi fra i tagli, poi intersezione con gli intervalli di partenza
+    gap_s = np.concatenate(([-np.inf], cut_ends))
+    gap_e = np.concatenate((cut_starts, [np.inf]))
+    first = np.searchsorted(gap_e, starts, side="right")
+    last = np.searchsorted(gap_s, ends, side="left")
+    n = np.maximum(last - first, 0)
+    i = np.repeat(np.arange(len(starts)), n)
+    j = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + np.repeat(first, n)
+    out_s, out_e = np.maximum(starts[i], gap_s[j]), np.minimum(ends[i], gap_e[j])
+    keep = out_e > out_s
+    return out_s[keep], out_e[keep]
+
+
+def _capacity(cap_df):
+    """Venue -> range di capacita' fusi (starts, ends)."""
+    out = {}
+    for venue, grp in cap_df.groupby(cap_df[CAP_VENUE].astype(str), sort=False):
+        starts, ends = merge_intervals(grp[CAP_FROM].astype(float), grp[CAP_TO].astype(float))
+        if len(starts):
+            out[venue] = (starts, ends)
+    return out
+
+
+def _free(clean, capacity):
+    """(venue, periodo) -> intervalli liberi, per le righe assegnate di ``clean`` nelle venue con capacita'."""
+    assigned = clean[np.isfinite(clean[CENTER].to_numpy(dtype=float))
+                     & np.isfinite(clean[WIDTH_MHZ].to_numpy(dtype=float))]
+    venue = assigned[COL_VENUE].astype(str)
+    assigned = assigned[venue.isin(capacity).to_numpy()]
+    out = {}
+    keys = [assigned[COL_VENUE].astype(str), assigned[COL_PERIOD].astype(str)]
+    for (venue, period), grp in assigned.groupby(keys, sort=False):
+        half = grp[WIDTH_MHZ].to_numpy(dtype=float) / 2
+        center = grp[CENTER].to_numpy(dtype=float)
+        out[venue, period] = subtract(*capacity[venue], *merge_intervals(center - half, center + half))
+    return out
+
+
+class AvailabilityIndex:
+    """Intervalli liberi per (venue, periodo); read-only, uno per versione dei dati."""
+
+    def __init__(self, capacity, free):
+        self._capacity = capacity   # venue -> range di capacita' (liberi se nessun canale assegnato)
+        self._free = free           # (venue, periodo) -> intervalli liberi
+
+    @classmethod
+    def build(cls, clean, cap_df):
+        capacity = _capacity(cap_df)
+        return cls(capacity, _free(clean, capacity))
+
+    def updated(self, clean, venues):
+        """Nuovo indice con le sole ``venues`` ricalcolate su ``clean`` (stessa capacita')."""
+        venues = {str(v) for v in venues}
+        free = {key: value for key, value in self._free.items() if key[0] not in venues}
+        rows = clean[clean[COL_VENUE].astype(str).isin(venues).to_numpy()]
+        free.update(_free(rows, self._capacity))
+        return AvailabilityIndex(self._capacity, free)
+
+    @property
+    def venues(self):
+        return sorted(self._capacity)
+
+    def capacity_range(self, venue):
+        """(da, a) MHz dei range di capacita' della venue, o None."""
+        starts, ends = self._capacity.get(str(venue), EMPTY)
+        return (float(starts[0]), float(ends[-1])) if len(starts) else None
+
+    def free_intervals(self, venue, period):
+        """(starts, ends) liberi in MHz; vuoti se la venue non ha range di capacita'."""
+        venue = str(venue)
+        return self._free.get((venue, str(period)), self._capacity.get(venue, EMPTY))
+
+    def free_slots(self, venue, period, tune_from, tune_to, bandwidth_khz, step_khz=None, guard_khz=0.0,
+                   limit=None):
+        """Centri liberi (MHz, crescenti) ``tune_from + k * step`` in [tune_from, tune_to] per un canale largo
+        ``bandwidth_khz`` (piu' ``guard_khz`` per lato) tutto dentro un intervallo libero.
+
+        Senza ``step_khz`` il passo e' la larghezza del canale. ``limit`` tronca ai primi centri.
+        """
+        starts, ends = self.free_intervals(venue, period)
+        half = (bandwidth_khz / 2 + guard_khz) / 1000.0
+        step = (step_khz or bandwidth_khz) / 1000.0
+        if not len(starts) or tune_to < tune_from or step <= 0:
+            return np.empty(0)
+        n_steps = int(np.floor((tune_to - tune_from) / step + EPS))
+        # Solo gli intervalli che possono contenere un canale centrato nel tuning range
+        lo = np.searchsorted(ends, tune_from + half - EPS, side="left")
+        hi = np.searchsorted(starts, tune_to - half + EPS, side="right")
+        s, e = starts[lo:hi], ends[lo:hi]
+        k_lo = np.maximum(np.ceil((s + half - tune_from) / step - EPS), 0).astype(np.int64)
+        k_hi = np.minimum(np.floor((e - half - tune_from) / step + EPS), n_steps).astype(np.int64)
+        n = np.maximum(k_hi - k_lo + 1, 0)
+        if limit is not None:
+            # Bastano gli intervalli che arrivano a ``limit`` centri
+            n = np.minimum(n, np.maximum(limit - (np.cumsum(n) - n), 0))
+        k = np.repeat(k_lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        return tune_from + k * step
+
+    def first_free(self, venue, period, tune_from, tune_to, bandwidth_khz, step_khz=None, guard_khz=0.0):
+        """Primo centro libero (MHz) o None."""
+        slots = self.free_slots(venue, period, tune_from, tune_to, bandwidth_khz, step_khz, guard_khz, limit=1)
+        return float(slots[0]) if len(slots) else None
+
+
+def availability_index(dataset, previous=None):
+    """``AvailabilityIndex`` della vista Olympic, uno per dataset.
+
+    Con ``previous`` (dataset della versione prima, con il suo indice gia'
+    costruito) e la stessa capacita', si ricalcolano solo le venue del diff.
+    """
+    def build(ds):
+        clean = chart_rows(olympic_frame(ds))
+        base = None if previous is None else previous.peek("availability")
+        if base is not None and olympic_capacity(previous).equals(olympic_capacity(ds)):
+            venues = version_diff(previous, ds).venues
+            with timings.stage("availability.update", rows=len(venues)):
+                return base.updated(clean, venues)
+        with timings.stage("availability.build", rows=len(clean)):
+            return AvailabilityIndex.build(clean, olympic_capacity(ds))
+    return dataset.memo("availability", build)
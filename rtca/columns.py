@@ -0,0 +1,42 @@
+# Nomi colonne del workbook (devono combaciare con il file)
+
+SHEET_ALL_NP   = "ALL NP"
+SHEET_CAPACITY = "Capacity NP-OLY"
+
+# Sheet "ALL NP"
+COL_BX          = "Attributed Frequency TX (MHz)"   # frequenza centrale
+COL_AO          = "Channel Bandwidth (kHz)"         # larghezza canale
+COL_AQ          = "Transmission Power (W)"          # potenza
+COL_VENUE       = "Venue Code"
+COL_STAKE       = "Stakeholder Business ID"
+COL_REQUEST     = "Request ID"
+COL_PERIOD      = "License Period"
+COL_SERVICE     = "Service Tri Code"
+COL_TICKET      = "FG out"
+COL_PNRF        = "PNRF"
+COL_NEW_VENUE   = "New venue code for OTH"
+COL_NEW_SERVICE = "New service code for OTH"
+COL_STATO       = "Stato"
+COL_PRIORITY    = "Priority Indicator per Stakeholder"
+COL_TUNE_FROM   = "Tuning Range From"
+COL_TUNE_TO     = "Tuning Range To"
+COL_TUNE_STEP   = "Tuning Step (kHz)"
+COL_STAKE_ID    = "Stakeholder ID"    # stakeholder nel workbook LAN
+COL_FINAL       = "FINAL Status"      # esito finale nel workbook LAN (opzionale)
+
+# Colonne mostrate nella tabella "Failed Assignments"
+KO_COLUMNS = ['Request ID', 'Service Tri Code', 'Venue Code', 'Usage Type', 'Transmission Type', 'Is Simplex',
+              'Tuning Range From', 'Tuning Range To', 'Channel Bandwidth (kHz)', 'Tuning Step (kHz)',
+              'Transmission Power (W)', 'Notes', 'Note ottimizzazione', 'IMD step', 'Note di lavorazione']
+
+# Sheet "Capacity NP-OLY"
+CAP_VENUE = "Venue"
+CAP_FROM  = "Freq. From [MHz]"
+CAP_TO    = "Freq. To [MHz]"
+CAP_TOT   = "Tot MHz"
+
+# Colonne derivate (calcolate dal dashboard)
+CENTER    = "center"
+WIDTH_MHZ = "width_mhz"
+POWER_DBM = "power_dBm"
+REQ_ID    = "req_id"
@@ -0,0 +1,416 @@
+"""Nucleo di calcolo senza Streamlit, condiviso da app.py e app_LAN.py.
+
+Un ``Dataset`` e' una versione di un workbook: il snapshot Arrow dei fogli
+(memory map, solo le colonne dichiarate in ``WORKBOOK_TYPES``) e le colonne
+pandas convertite al primo uso, condivise da tutte le viste e da non
+modificare. Le colonne non dichiarate si leggono solo su richiesta
+(``Dataset.full_frame``, la Table di app_LAN.py). I dataset stanno in una cache di processo per
+(sorgente, versione): due dashboard nello stesso server che leggono lo stesso
+workbook lo scaricano, lo parsano e lo tengono in memoria una volta sola.
+
+Le viste (``olympic_frame``, ``lan_frame``, ``lan_table``, gli indici dei filtri) e gli
+oggetti derivati sono calcolati una volta per dataset; le aggregazioni sono
+funzioni pure sui DataFrame filtrati.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .columns import (
+    CENTER, COL_AO, COL_AQ, COL_BX, COL_FINAL, COL_NEW_SERVICE, COL_NEW_VENUE, COL_PERIOD, COL_PNRF,
+    COL_PRIORITY, COL_REQUEST, COL_SERVICE, COL_STAKE, COL_STAKE_ID, COL_TICKET, COL_VENUE, POWER_DBM,
+    REQ_ID, SHEET_ALL_NP, SHEET_CAPACITY, WIDTH_MHZ,
+)
+from .filters import FilterIndex
+from .normalize import add_spectrum_columns, substitute_oth
+from .snapshot import CACHE_DIR, ensure_snapshot, read_table, sheet_path
+from .sources import source_from_env
+from .timing import timings
+from .workbook import (
+    ALL_NP_SCHEMA, CAPACITY_SCHEMA, WORKBOOK_TYPES, check_required, schema_token, workbook_reader,
+)
+
+# Copy-on-Write sempre attivo da pandas 3: solo allora session_view puo' restituire una vista
+COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+MAX_DATASETS = 4   # es. due workbook x (versione corrente + precedente)
+
+_lock = threading.Lock()
+_sources = {}
+_datasets = OrderedDict()
+_loading = {}
+
+
+class VersionUnavailable(LookupError):
+    """Il file di una versione non c'e' piu' (file locale riscritto, download rimosso)."""
+
+    def __init__(self, version):
+        self.version = version
+        super().__init__(f"Workbook version {version} is no longer available")
+
+
+# ----------------------------
+# Sorgenti e dataset condivisi nel processo
+# ----------------------------
+def shared_source(env_var, file_id, output_file):
+    """Una sola sorgente per workbook nel processo (``source_from_env``: file locale da ``env_var``, altrimenti Drive).
+
+    I download Drive vanno nella cache per contenuto di ``rtca.downloads``
+    (``<download_dir>/drive_<file_id>/<sha256>.xlsx``), da ``output_file`` si
+    prende solo l'estensione: dashboard e processi con file diversi o uguali
+    non si sovrascrivono ne' leggono a vicenda un file a meta'.
+    """
+    source = source_from_env(env_var, file_id, output_file)   # costruirla non legge ne' scarica niente
+    with _lock:
+        return _sources.setdefault(source.key, source)
+
+
+class Dataset:
+    """Una versione di un workbook, read-only: i DataFrame restituiti condividono le colonne."""
+
+    def __init__(self, source_key, version, tables, full_table):
+        self.source_key = source_key
+        self.version = version
+        self._tables = tables
+        self._full_table = full_table   # sheet -> tabella Arrow con tutte le colonne
+        self._columns = {}
+        self._memo = {}
+        self._building = {}
+        self._lock = threading.RLock()
+
+    def columns(self, sheet):
+        """Nomi delle colonne del foglio, None se il foglio non c'e' nel workbook."""
+        names = self._tables[sheet].column_names
+        return names or None
+
+    def n_rows(self, sheet):
+        return self._tables[sheet].num_rows
+
+    def column(self, sheet, name):
+        with self._lock:
+            key = (sheet, name)
+            if key not in self._columns:
+                # select + to_pandas usa i metadati pandas del snapshot (Int64, category)
+                self._columns[key] = self._tables[sheet].select([name]).to_pandas()[name]
+            return self._columns[key]
+
+    def frame(self, sheet, columns=None):
+        """Le colonne richieste (tutte con None; le assenti vengono saltate) senza copiarle."""
+        present = self._tables[sheet].column_names
+        names = present if columns is None else [c for c in columns if c in set(present)]
+        if not names:
+            return pd.DataFrame(index=pd.RangeIndex(self.n_rows(sheet)))
+        return pd.concat([self.column(sheet, c) for c in names], axis=1)
+
+    def full_frame(self, sheet):
+        """Tutte le colonne del foglio, anche le non dichiarate, nell'ordine del workbook.
+
+        Il foglio intero viene letto alla prima richiesta; le colonne dichiarate
+        sono quelle gia' convertite, condivise con le viste.
+        """
+        def build(ds):
+            table = ds._full_table(sheet)
+            declared = set(ds._tables[sheet].column_names)
+            extra = table.select([c for c in table.column_names if c not in declared]).to_pandas()
+            columns = [ds.column(sheet, c) if c in declared else extra[c] for c in table.column_names]
+            return pd.concat(columns, axis=1) if columns else pd.DataFrame(index=pd.RangeIndex(ds.n_rows(sheet)))
+        return self.memo(f"full:{sheet}", build)
+
+    def memo(self, name, build):
+        """``build(self)`` calcolato una volta per dataset.
+
+        Un lock per nome, come ``load_dataset``: chi chiede lo stesso oggetto
+        durante il calcolo aspetta quello gia' in corso, gli altri oggetti del
+        dataset (colonne, altre viste) restano disponibili nel frattempo.
+        """
+        with self._lock:
+            if name in self._memo:
+                return self._memo[name]
+            building = self._building.setdefault(name, threading.Lock())
+        with building:
+            with self._lock:
+                if name in self._memo:
+                    return self._memo[name]
+            value = build(self)
+            with self._lock:
+                self._memo[name] = value
+                self._building.pop(name, None)
+            return value
+
+    def peek(self, name):
+        """Valore di ``memo(name, ...)`` se gia' calcolato, altrimenti None (senza calcolarlo)."""
+        with self._lock:
+            return self._memo.get(name)
+
+
+def snapshot_key(version, project=True):
+    return f"{version}-{schema_token(WORKBOOK_TYPES, project=project)}"
+
+
+def full_table(source, version, sheet, cache_dir=CACHE_DIR):
+    """Tabella Arrow di ``sheet`` con tutte le colonne, da un snapshot a parte creato alla prima richiesta.
+
+    Solleva VersionUnavailable se il file di ``version`` non c'e' piu': il
+    file corrente darebbe le righe di un'altra versione.
+    """
+    key = snapshot_key(version, project=False)
+    if not os.path.exists(sheet_path(key, sheet, cache_dir)):
+        path = source.version_path(version)
+        if path is None:
+            raise VersionUnavailable(version)
+        with timings.stage("parse.full"):
+            ensure_snapshot(path, key, [sheet], cache_dir,
+                            reader=workbook_reader(WORKBOOK_TYPES, project=False, require_sheets=False))
+    return read_table(key, sheet, cache_dir)
+
+
+def build_dataset(source, version, cache_dir=CACHE_DIR):
+    """Dataset di ``version`` senza passare dalla cache di processo (snapshot creato se manca).
+
+    Il snapshot condiviso legge solo le colonne di ``WORKBOOK_TYPES`` (``usecols``);
+    il resto del foglio resta nell'xlsx finche' non lo chiede ``Dataset.full_frame``.
+    """
+    key = snapshot_key(version)
+    sheets = list(WORKBOOK_TYPES)
+    reader = workbook_reader(WORKBOOK_TYPES, require_sheets=False)
+    with timings.stage("parse") as stage:   # xlsx -> snapshot se manca, altrimenti solo memory map
+        ensure_snapshot(source.path, key, sheets, cache_dir, reader=reader)
+        tables = {s: read_table(key, s, cache_dir) for s in sheets}
+        stage["rows"] = tables[SHEET_ALL_NP].num_rows
+        stage["bytes"] = os.path.getsize(source.path)
+    return Dataset(source.key, version, tables, lambda sheet: full_table(source, version, sheet, cache_dir))
+
+
+def load_dataset(source, version, cache_dir=CACHE_DIR):
+    """Dataset condiviso per (sorgente, versione); chi arriva durante il caricamento aspetta lo stesso."""
+    key = (source.key, version)
+    with _lock:
+        if key in _datasets:
+            _datasets.move_to_end(key)
+            return _datasets[key]
+        loading = _loading.setdefault(key, threading.Lock())
+    with loading:
+        with _lock:
+            if key in _datasets:
+                return _datasets[key]
+        dataset = build_dataset(source, version, cache_dir)
+        with _lock:
+            _datasets[key] = dataset
+            while len(_datasets) > MAX_DATASETS:
+                _datasets.popitem(last=False)
+            _loading.pop(key, None)
+        return dataset
+
+
+def cached_dataset(source, version):
+    """Dataset gia' nella cache di processo, None se non c'e' (non carica niente)."""
+    with _lock:
+        return _datasets.get((source.key, version))
+
+
+def session_view(df):
+    """Frame di una sessione su un frame condiviso, modificabile senza toccare il dataset.
+
+    Da pandas 3 e' una vista (nessun dato copiato): con il Copy-on-Write
+    assegnare colonne o scrivere celle copia solo cio' che cambia. Su pandas
+    2.x, dove il Copy-on-Write e' un'opzione globale che qui non si tocca, e'
+    una copia.
+    """
+    return df.copy(deep=not COPY_ON_WRITE)
+
+
+def take(df, rows, columns=None):
+    """Righe ``rows`` (posizioni) di ``df``; con ``columns`` materializza solo quelle presenti."""
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.take(rows)
+
+
+def nbytes(df):
+    """Memoria di ``df`` in byte, contenuto delle stringhe compreso."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def spectrum_columns(dataset):
+    """center / width_mhz / power_dBm / req_id per tutto ALL NP, calcolati una volta e condivisi dalle viste."""
+    def build(ds):
+        source = ds.frame(SHEET_ALL_NP, [COL_BX, COL_AO, COL_AQ, COL_REQUEST])
+        if len(source.columns) < 4:
+            return None
+        return add_spectrum_columns(source)[[CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID]]
+    return dataset.memo("spectrum", build)
+
+
+# ----------------------------
+# Vista Olympic (app.py)
+# ----------------------------
+OLYMPIC_SCHEMAS = {SHEET_ALL_NP: ALL_NP_SCHEMA, SHEET_CAPACITY: CAPACITY_SCHEMA}
+OLYMPIC_INDEX = [COL_PERIOD, COL_STAKE, COL_TICKET, COL_SERVICE, COL_VENUE]
+
+
+def _check_olympic(dataset):
+    return dataset.memo("olympic_check", lambda ds: check_required(
+        {s: ds.columns(s) for s in OLYMPIC_SCHEMAS}, OLYMPIC_SCHEMAS))
+
+
+def olympic_frame(dataset):
+    """ALL NP proiettato sulle colonne di ALL_NP_SCHEMA, OTH sostituiti, colonne dello spettro."""
+    def build(ds):
+        _check_olympic(ds)
+        with timings.stage("normalize.olympic", rows=ds.n_rows(SHEET_ALL_NP)):
+            df = ds.frame(SHEET_ALL_NP, ALL_NP_SCHEMA)
+            df[COL_VENUE] = substitute_oth(df, COL_VENUE, COL_NEW_VENUE)
+            df[COL_SERVICE] = substitute_oth(df, COL_SERVICE, COL_NEW_SERVICE)
+            return pd.concat([df, spectrum_columns(ds)], axis=1)
+    return dataset.memo("olympic_frame", build)
+
+
+def olympic_capacity(dataset):
+    _check_olympic(dataset)
+    return dataset.memo("olympic_capacity", lambda ds: ds.frame(SHEET_CAPACITY, CAPACITY_SCHEMA))
+
+
+def olympic_index(dataset):
+    def build(ds):
+        df = olympic_frame(ds)
+        with timings.stage("index.olympic", rows=len(df)):
+            return FilterIndex(df, OLYMPIC_INDEX)
+    return dataset.memo("olympic_index", build)
+
+
+# ----------------------------
+# Vista LAN (app_LAN.py)
+# ----------------------------
+LAN_INDEX = [COL_PERIOD, COL_VENUE, COL_STAKE_ID]
+FINAL_UPPER = "final_upper"   # chiave derivata dell'indice: FINAL Status in maiuscolo
+
+
+def lan_frame(dataset):
+    """Colonne dichiarate di ALL NP piu' quelle dello spettro, se calcolabili (diff e conflitti LAN)."""
+    def build(ds):
+        with timings.stage("normalize.lan", rows=ds.n_rows(SHEET_ALL_NP)):
+            df = ds.frame(SHEET_ALL_NP)
+            spectrum = spectrum_columns(ds)
+            return df if spectrum is None else pd.concat([df, spectrum], axis=1)
+    return dataset.memo("lan_frame", build)
+
+
+def lan_table(dataset):
+    """Tutte le colonne di ALL NP, anche le non dichiarate, piu' lo spettro: solo per la sezione Table."""
+    def build(ds):
+        with timings.stage("normalize.lan_table", rows=ds.n_rows(SHEET_ALL_NP)):
+            df = ds.full_frame(SHEET_ALL_NP)
+            spectrum = spectrum_columns(ds)
+            return df if spectrum is None else pd.concat([df, spectrum], axis=1)
+    return dataset.memo("lan_table", build)
+
+
+def lan_columns(dataset, columns):
+    """Solo le colonne ``columns`` della vista LAN (ALL NP e spettro; le assenti vengono saltate).
+
+    Converte da Arrow solo cio' che la sezione usa: Status e Spectrum non
+    pagano le altre colonne di ALL NP, che servono solo alla Table (``lan_table``).
+    """
+    spectrum = [c for c in columns if c in (CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID)]
+    df = dataset.frame(SHEET_ALL_NP, [c for c in columns if c not in spectrum])
+    if spectrum and spectrum_columns(dataset) is not None:
+        df = pd.concat([df, spectrum_columns(dataset)[spectrum]], axis=1)
+    return df
+
+
+def lan_index(dataset):
+    def build(ds):
+        df = ds.frame(SHEET_ALL_NP, LAN_INDEX + [COL_FINAL])   # senza convertire le altre colonne
+        with timings.stage("index.lan", rows=len(df)):
+            derived = {FINAL_UPPER: df[COL_FINAL].astype(str).str.upper()} if COL_FINAL in df.columns else {}
+            return FilterIndex(df, LAN_INDEX, derived=derived)
+    return dataset.memo("lan_index", build)
+
+
+# ----------------------------
+# Aggregazioni (funzioni pure sul frame filtrato)
+# ----------------------------
+ASSIGNED, NOT_ASSIGNED, MOD_COORDINATION = "ASSIGNED", "NOT ASSIGNED", "MoD COORDINATION"
+STATUS_COLORS = {ASSIGNED: '#2ECC71', NOT_ASSIGNED: '#E74C3C', MOD_COORDINATION: '#F1C40F'}
+PRIORITIES = ['1', '2', '3', '4']
+
+
+def chart_rows(df, ao=COL_AO, aq=COL_AQ, request=COL_REQUEST, plotted_only=False):
+    """Righe disegnabili: con banda, potenza e Request ID (e, con ``plotted_only``, centro/larghezza/potenza)."""
+    subset = [ao, aq, request] + ([CENTER, WIDTH_MHZ, POWER_DBM] if plotted_only else [])
+    return df.dropna(subset=subset)
+
+
+def is_mod(df, pnrf=COL_PNRF):
+    """Richieste in coordinamento MoD (PNRF == "MoD"); tutte False se la colonna manca."""
+    if pnrf is None or pnrf not in df.columns:
+        return pd.Series(False, index=df.index)
+    return df[pnrf].astype(str).str.strip().eq("MoD")
+
+
+def not_assigned(df, bx=COL_BX, pnrf=COL_PNRF):
+    """Righe NOT ASSIGNED (KO): senza frequenza attribuita, escluse le MoD."""
+    return df[df[bx].isna() & ~is_mod(df, pnrf)]
+
+
+def status_counts(df, bx=COL_BX, pnrf=COL_PNRF):
+    """Conteggi ASSIGNED / NOT ASSIGNED (/ MoD COORDINATION se ``pnrf`` non e' None) in un frame Status/Count."""
+    mod = is_mod(df, pnrf)
+    assigned = df[bx].notna() & ~mod if bx in df.columns else pd.Series(False, index=df.index)
+    status = [ASSIGNED, NOT_ASSIGNED]
+    counts = [int(assigned.sum()), int((~assigned & ~mod).sum())]
+    if pnrf is not None:
+        status.append(MOD_COORDINATION)
+        counts.append(int(mod.sum()))
+    return pd.DataFrame({'Status': status, 'Count': counts})
+
+
+def breakdown(rows, col, fill="Not Analysed"):
+    """Frame Status/Count con i valori di ``col`` (vuoti = ``fill``), dal piu' frequente (a pari merito per nome)."""
+    counts = rows[col].astype(object).fillna(fill).value_counts()
+    counts = counts.sort_index(key=lambda i: i.astype(str)).sort_values(ascending=False, kind="stable")
+    return pd.DataFrame({'Status': counts.index, 'Count': counts.values})
+
+
+def ko_priority_table(ko, total, priorities=PRIORITIES):
+    """Frame Priority, Count, Total, Percentage da KO e totali per priorita' (Series con indice stringa).
+
+    Le righe vanno dal numero di KO piu' alto (a pari merito per priorita'); le
+    priorita' senza KO hanno una barra a zero, con il totale medio come riferimento.
+    """
+    ko = ko.sort_index().sort_values(ascending=False, kind="stable")
+    out = pd.DataFrame({'Priority': ko.index, 'Count': ko.to_numpy(), 'Total': total.reindex(ko.index).to_numpy()})
+    out['Percentage'] = (out['Count'] / out['Total'] * 100).round(2)
+    pad = [p for p in priorities if p not in set(out['Priority'])]
+    if pad:
+        out = pd.concat([out, pd.DataFrame({'Priority': pad, 'Count': 0, 'Total': total.mean(), 'Percentage': 0.0})],
+                        ignore_index=True)
+    return out
+
+
+def ko_by_priority(filtered, ko_df, priority=COL_PRIORITY, priorities=PRIORITIES):
+    """KO per priorita': Priority, Count, Total, Percentage; le priorita' senza KO hanno Count 0."""
+    total = filtered.groupby(priority, observed=True).size()
+    total.index = total.index.astype(str)
+    ko = ko_df[priority].value_counts()
+    ko.index = ko.index.astype(str)
+    return ko_priority_table(ko, total, priorities)
+
+
+def ko_ranking_table(ko, total, stake=COL_STAKE):
+    """Frame stake, KO_count, total_count, KO_percent, label_text da KO e totali per stakeholder (KO > 0)."""
+    out = pd.DataFrame({stake: ko.index.astype(object), 'KO_count': ko.to_numpy(),
+                        'total_count': total.reindex(ko.index).fillna(0).to_numpy()})
+    out['KO_percent'] = (out['KO_count'] / out['total_count'] * 100).round(1)
+    out = out.sort_values(by='KO_percent', ascending=False, ignore_index=True)
+    out['label_text'] = out['KO_count'].astype(int).astype(str) + " (" + out['KO_percent'].astype(str) + "%)"
+    return out
+
+
+def ko_ranking(filtered, ko_df, stake=COL_STAKE):
+    """Stakeholder con almeno un KO: KO_count, total_count, KO_percent, label_text; % decrescente."""
+    total = filtered.groupby(stake, observed=True).size()
+    ko = ko_df.groupby(stake, observed=True).size()
+    return ko_ranking_table(ko[ko > 0], total, stake)
@@ -0,0 +1,264 @@
+"""Cubo dei conteggi per versione dei dati: i riepiloghi di app.py per roll-up.
+
+Le righe di ALL NP vengono contate per (periodo, stakeholder, ticket,
+servizio, venue, priorita', Stato, esito ASSIGNED / NOT ASSIGNED / MoD): ogni
+cella e' una combinazione presente con il suo numero di righe. Ciambelle di
+stato, KO per priorita' e classifica degli stakeholder sono somme pesate
+sulle celle selezionate, quindi costano in proporzione alle celle e non alle
+righe. Con molte dimensioni ad alta cardinalita' le celle possono avvicinarsi
+alle righe, ma restano semplici array NumPy (niente groupby/merge a ogni rerun).
+
+La selezione segue le regole della sidebar (``FilterIndex.select``): lista
+vuota = nessun filtro, valori confrontati come stringhe, nulli esclusi dalle
+colonne filtrate. Le dimensioni dell'indice riusano i codici di
+``olympic_index``, quindi cubo e righe filtrate coincidono.
+"""
+import numpy as np
+import pandas as pd
+
+from .columns import COL_BX, COL_PNRF, COL_PRIORITY, COL_STAKE, COL_STATO
+from .core import (
+    ASSIGNED, MOD_COORDINATION, NOT_ASSIGNED, OLYMPIC_INDEX, PRIORITIES, is_mod, ko_priority_table,
+    ko_ranking_table, olympic_frame, olympic_index, take,
+)
+from .filters import label_codes
+from .incremental import version_diff
+from .timing import timings
+
+STATUS = "status"   # dimensione derivata: posizione in STATUSES
+STATUSES = [ASSIGNED, NOT_ASSIGNED, MOD_COORDINATION]
+TAIL_CELLS = 4096   # spazio libero in coda ai cubi degli scenari (``Cube.adjusted``)
+MAX_UPDATED = 0.1   # oltre questa frazione di righe entrate il cubo si ricostruisce (``_row_codes`` riga per riga)
+
+
+class Cube:
+    """Celle (codici per dimensione, -1 = nullo) e conteggi; read-only, da costruire una volta per versione."""
+
+    def __init__(self, df, fidx, dims=OLYMPIC_INDEX, extra=(COL_PRIORITY, COL_STATO), bx=COL_BX, pnrf=COL_PNRF):
+        codes = {d: fidx.codes(d) for d in dims if d in fidx}
+        for col in extra:
+            if col in df.columns:
+                codes[col] = label_codes(df[col])
+        mod = is_mod(df, pnrf).to_numpy()
+        status = np.where(mod, 2, np.where(df[bx].notna().to_numpy(), 0, 1)).astype(np.int32)
+        codes[STATUS] = (status, np.array(STATUSES, dtype=object))
+
+        self._bx, self._pnrf = bx, pnrf
+        self._dims = [d for d in dims if d in fidx]   # codici presi dall'indice dei filtri
+        self._rows = {n: codes[n][0] for n in codes}   # codici per riga, per ``adjusted`` e ``updated``
+        self._labels = {n: codes[n][1] for n in codes}
+        self._lookup = {n: {label: code for code, label in enumerate(self._labels[n])} for n in codes}
+        self._merge(self._rows, np.ones(len(df), dtype=np.int64))
+
+    def _merge(self, columns, weights):
+        """Celle distinte di ``columns`` (codici per dimensione) con la somma dei ``weights``; via le celle a zero."""
+        names = list(columns)
+        sizes = [len(self._labels[n]) + 1 for n in names]   # +1: i nulli (-1) diventano 0
+        stacked = np.stack([columns[n].astype(np.int64) + 1 for n in names], axis=1)
+        if float(np.prod(sizes, dtype=float)) < 2 ** 62:
+            key = np.ravel_multi_index(tuple(stacked.T), sizes)
+            _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+            cells = stacked[first]
+        else:
+            cells, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=weights, minlength=len(cells)).astype(np.int64)
+        keep = counts != 0
+        self._cells = {n: (cells[keep, i] - 1).astype(np.int32) for i, n in enumerate(names)}
+        self._counts = counts[keep]
+        self._tail = None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, name):
+        return name in self._cells
+
+    def adjusted(self, removed, added, dropped=None):
+        """Cubo con le righe in posizione ``removed`` tolte (conteggio -1) e il frame ``added`` aggiunto (+1).
+
+        Niente ricostruzione: le righe diventano celle in piu' (anche se
+        ripetono celle esistenti, i roll-up sommano i conteggi) e le etichette
+        nuove finiscono in coda. ``dropped``: righe aggiunte da un ``adjusted``
+        precedente da togliere di nuovo (-1), cosi' un cubo gia' modificato
+        riceve solo le celle di una modifica in piu'. Per gli scenari what-if (``rtca.scenario``).
+        """
+        frames = [(added, 1)] + ([] if dropped is None else [(dropped, -1)])
+        out = object.__new__(Cube)
+        out._bx, out._pnrf, out._dims, out._rows = self._bx, self._pnrf, self._dims, self._rows
+        out._labels, out._lookup = dict(self._labels), dict(self._lookup)
+        cells = {name: np.concatenate([self._rows[name][removed]] + [out._row_codes(name, f) for f, _ in frames])
+                 for name in self._cells}
+        counts = np.concatenate([np.full(len(removed), -1, dtype=np.int64)]
+                                + [np.full(len(f), weight, dtype=np.int64) for f, weight in frames])
+        out._append(self, cells, counts)
+        return out
+
+    def _append(self, base, cells, counts):
+        """Celle di ``base`` seguite da ``cells`` / ``counts``, in un buffer con spazio in coda.
+
+        Il buffer passa da un cubo modificato al successivo: finche' nessun
+        altro ci ha scritto dopo ``base``, le celle nuove vanno in coda senza
+        ricopiare le precedenti (le viste di ``base`` restano intatte). Il
+        cubo di una versione non ha buffer e non viene mai scritto.
+        """
+        n, end = len(base._counts), len(base._counts) + len(counts)
+        tail = base._tail
+        if tail is None or tail["used"] != n or len(tail["counts"]) < end:
+            size = end + max(len(counts), TAIL_CELLS)
+            tail = {"used": n, "counts": np.empty(size, dtype=np.int64),
+                    "cells": {name: np.empty(size, dtype=np.int32) for name in base._cells}}
+            tail["counts"][:n] = base._counts
+            for name, values in base._cells.items():
+                tail["cells"][name][:n] = values
+        tail["counts"][n:end] = counts
+        for name, values in cells.items():
+            tail["cells"][name][n:end] = values
+        tail["used"] = end
+        self._tail = tail
+        self._cells = {name: values[:end] for name, values in tail["cells"].items()}
+        self._counts = tail["counts"][:end]
+
+    def updated(self, df, fidx, positions):
+        """Cubo della versione successiva (frame ``df``, indice ``fidx``) da questo e dalle posizioni del diff.
+
+        ``positions`` come ``VersionDiff.positions``: le righe uscite vengono
+        tolte, quelle entrate aggiunte e le celle sommate di nuovo; le righe
+        invariate non vengono ricontate. Stesse celle e conteggi di ``Cube(df, fidx)``.
+        """
+        gone, came, (old, new) = positions
+        extra = [n for n in self._cells if n not in self._dims and n != STATUS]
+        added = take(df, came, extra + [self._bx, self._pnrf])
+        out = object.__new__(Cube)
+        out._bx, out._pnrf, out._dims = self._bx, self._pnrf, self._dims
+        out._labels, out._lookup, out._rows = dict(self._labels), dict(self._lookup), {}
+        columns = {}
+        for name, cells in self._cells.items():
+            if name in self._dims:   # etichette dell'indice nuovo: codici vecchi rimappati
+                out._rows[name], out._labels[name] = fidx.codes(name)
+                out._lookup[name] = {label: code for code, label in enumerate(out._labels[name])}
+                remap = np.fromiter((out._lookup[name].get(label, -1) for label in self._labels[name]),
+                                    dtype=np.int32, count=len(self._labels[name]))
+                remap = np.append(remap, np.int32(-1))   # il codice -1 (nullo) resta -1
+            else:   # etichette vecchie piu' quelle nuove in coda: i codici vecchi valgono ancora
+                remap = None
+                rows = np.empty(len(df), dtype=np.int32)
+                rows[new] = self._rows[name][old]
+                rows[came] = out._row_codes(name, added)
+                out._rows[name] = rows
+            before = np.concatenate([cells, self._rows[name][gone]])
+            columns[name] = np.concatenate([before if remap is None else remap[before], out._rows[name][came]])
+        out._merge(columns, np.concatenate([self._counts, np.full(len(gone), -1, dtype=np.int64),
+                                            np.ones(len(came), dtype=np.int64)]))
+        return out
+
+    def _row_codes(self, name, rows):
+        """Codici di ``rows`` nella dimensione ``name`` (valori come stringhe, -1 per i nulli)."""
+        if name == STATUS:
+            mod = is_mod(rows, self._pnrf).to_numpy()
+            return np.where(mod, 2, np.where(rows[self._bx].notna().to_numpy(), 0, 1))
+        values = rows[name].astype(object) if name in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+        labels = [None if pd.isna(v) else str(v) for v in values]
+        new = [label for label in dict.fromkeys(labels) if label is not None and label not in self._lookup[name]]
+        if new:
+            self._lookup[name] = {**self._lookup[name], **{label: len(self._labels[name]) + i
+                                                           for i, label in enumerate(new)}}
+            self._labels[name] = np.concatenate([self._labels[name], np.array(new, dtype=object)])
+        lookup = self._lookup[name]
+        return np.fromiter((-1 if label is None else lookup[label] for label in labels), dtype=np.int64,
+                           count=len(labels))
+
+    def labels(self, name):
+        return self._labels[name].tolist()
+
+    def rollup(self, selection):
+        """``CubeView`` delle celle che rispettano ``selection`` ({dimensione: valori})."""
+        mask = np.ones(len(self._counts), dtype=bool)
+        for name, values in selection.items():
+            if not values or name not in self:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            lookup = self._lookup[name]
+            wanted = np.fromiter((lookup.get(str(v), -1) for v in values), dtype=np.intp)
+            allowed = np.zeros(len(self._labels[name]) + 1, dtype=bool)
+            allowed[wanted[wanted >= 0]] = True    # l'ultima cella (codice -1, nullo) resta False
+            mask &= allowed[self._cells[name]]
+        return CubeView(self, np.flatnonzero(mask))
+
+
+class CubeView:
+    """Celle selezionate di un ``Cube``: i riepiloghi sono somme dei loro conteggi."""
+
+    def __init__(self, cube, cells):
+        self._cube = cube
+        self._cells = cells
+        self._weights = cube._counts[cells]
+
+    @property
+    def n_rows(self):
+        return int(self._weights.sum())
+
+    def has(self, name):
+        return name in self._cube
+
+    def options(self, name):
+        """Etichette non nulle presenti nella selezione, come ``FilterIndex.options``."""
+        counts = self._sum(name)
+        return sorted(counts.index[counts.to_numpy() > 0])
+
+    def _sum(self, name, status=None):
+        """Righe per etichetta di ``name`` (nulli esclusi, zeri compresi), eventualmente per un solo esito."""
+        codes = self._cube._cells[name][self._cells]
+        keep = codes >= 0
+        if status is not None:
+            keep &= self._cube._cells[STATUS][self._cells] == STATUSES.index(status)
+        sums = np.bincount(codes[keep], weights=self._weights[keep], minlength=len(self._cube._labels[name]))
+        return pd.Series(sums.astype(np.int64), index=pd.Index(self._cube._labels[name], dtype=object))
+
+    def status_counts(self, mod=True):
+        """Come ``core.status_counts``: ASSIGNED / NOT ASSIGNED (/ MoD COORDINATION con ``mod``)."""
+        counts = self._sum(STATUS)
+        status = STATUSES if mod else STATUSES[:2]
+        return pd.DataFrame({'Status': status, 'Count': [int(counts[s]) for s in status]})
+
+    def breakdown(self, name, status=NOT_ASSIGNED, fill="Not Analysed"):
+        """Come ``core.breakdown`` sulle righe con esito ``status``: frame Status/Count, dal piu' frequente."""
+        counts = self._sum(name, status)
+        hit = self._cube._cells[STATUS][self._cells] == STATUSES.index(status)
+        missing = int(self._weights[hit & (self._cube._cells[name][self._cells] < 0)].sum())
+        if missing:
+            counts[fill] = counts.get(fill, 0) + missing
+        counts = counts[counts > 0].sort_index().sort_values(ascending=False, kind="stable")
+        return pd.DataFrame({'Status': counts.index, 'Count': counts.to_numpy()})
+
+    def ko_by_priority(self, priority=COL_PRIORITY, priorities=PRIORITIES):
+        """Come ``core.ko_by_priority``: Priority, Count, Total, Percentage."""
+        total = self._sum(priority)
+        ko = self._sum(priority, NOT_ASSIGNED)
+        return ko_priority_table(ko[ko > 0], total[total > 0], priorities)
+
+    def ko_ranking(self, stake=COL_STAKE):
+        """Come ``core.ko_ranking``: stakeholder con almeno un KO, % decrescente."""
+        total = self._sum(stake)
+        ko = self._sum(stake, NOT_ASSIGNED)
+        return ko_ranking_table(ko[ko > 0].sort_index(), total[total > 0], stake)
+
+
+def olympic_cube(dataset, previous=None):
+    """Cubo della vista Olympic (righe di ``olympic_frame``, dimensioni di ``olympic_index``), uno per dataset.
+
+    Con ``previous`` (dataset della versione prima, con il cubo gia'
+    calcolato) e poche righe cambiate, il cubo viene derivato dal precedente
+    col diff (``Cube.updated``) invece di ricontare tutte le righe.
+    """
+    def build(ds):
+        df, fidx = olympic_frame(ds), olympic_index(ds)
+        base = previous.peek("olympic_cube") if previous is not None else None
+        if base is not None and list(olympic_frame(previous).columns) == list(df.columns):
+            diff = version_diff(previous, ds)
+            if len(diff.positions[1]) <= MAX_UPDATED * len(df):
+                with timings.stage("cube.olympic.updated", rows=len(diff.positions[0]) + len(diff.positions[1])):
+                    return base.updated(df, fidx, diff.positions)
+        with timings.stage("cube.olympic", rows=len(df)):
+            return Cube(df, fidx)
+    return dataset.memo("olympic_cube", build)
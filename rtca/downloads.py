@@ -0,0 +1,179 @@
+"""Cache dei download, indirizzata per contenuto e sicura fra sessioni, dashboard e processi.
+
+Ogni sorgente ha una cartella ``<download_dir>/<source_id>/`` con:
+
+- ``<sha256>.<ext>``: i file scaricati, con il nome dato dall'hash del
+  contenuto. Un file non viene mai riscritto: chi ha un path in mano (parse
+  in corso, snapshot) lo legge intero anche se nel frattempo arriva una
+  versione nuova;
+- ``LATEST``: l'ultimo download (hash e istante), sostituito con un rename
+  atomico;
+- ``.lock``: lock di file, un solo download per sorgente alla volta anche
+  fra processi diversi (due server Streamlit, ``python -m rtca.reports``).
+
+Il download va in un temporaneo nella stessa cartella e diventa
+``<sha256>.<ext>`` con ``os.replace``: nessun lettore vede un file a meta'.
+
+Single-flight: le chiamate concorrenti a ``fetch`` per la stessa sorgente
+nello stesso processo aspettano il download gia' in corso e ne ricevono il
+risultato; fra processi, chi prende il lock dopo un download fatto mentre
+aspettava (o negli ultimi ``fresh_seconds``) riusa ``LATEST`` senza
+riscaricare. N sessioni che scadono insieme fanno un solo download.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from .snapshot import _slug
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+DOWNLOAD_DIR = os.environ.get("RTCA_DOWNLOAD_DIR", ".rtca_downloads")
+FRESH_SECONDS = float(os.environ.get("RTCA_DOWNLOAD_FRESH_SECONDS", "5"))
+KEEP_FILES = 3   # file per sorgente: l'ultimo piu' i precedenti che un parse potrebbe ancora leggere
+LATEST = "LATEST"
+CHUNK_SIZE = 1 << 20
+
+_lock = threading.Lock()
+_flights = {}
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@contextmanager
+def file_lock(path):
+    """Lock esclusivo su ``path`` (creato se manca), valido fra processi."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:   # LK_LOCK rinuncia dopo ~10 s: si riprova
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Flight:
+    """Un download in corso: chi arriva dopo aspetta ``done`` e legge ``result`` / ``error``."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DownloadCache:
+    """File scaricati di una sorgente, per hash del contenuto.
+
+    ``fetch(download)`` chiama ``download(path)`` (scrive il file in ``path``)
+    e ritorna ``(path_in_cache, sha256)``.
+    """
+
+    def __init__(self, source_id, download_dir=DOWNLOAD_DIR, suffix=".xlsx", fresh_seconds=FRESH_SECONDS,
+                 keep=KEEP_FILES, clock=time.time):
+        self.source_id = str(source_id)
+        self.dir = os.path.join(os.path.abspath(download_dir), _slug(source_id))
+        self.suffix = suffix
+        self.fresh_seconds = fresh_seconds
+        self.keep = keep
+        self._clock = clock
+
+    def path_for(self, digest):
+        return os.path.join(self.dir, digest + self.suffix)
+
+    def latest(self):
+        """(path, sha256, istante) dell'ultimo download di qualunque processo, None se non c'e'."""
+        try:
+            with open(os.path.join(self.dir, LATEST), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self.path_for(entry["digest"])
+        return (path, entry["digest"], entry["fetched_at"]) if os.path.exists(path) else None
+
+    def fetch(self, download):
+        """Path e hash del contenuto corrente della sorgente; un solo download per le chiamate concorrenti."""
+        key = (self.dir, self.suffix)
+        with _lock:
+            flight = _flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._fetch_locked(download, started=self._clock())
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with _lock:
+                _flights.pop(key, None)
+            flight.done.set()
+
+    def _fetch_locked(self, download, started):
+        os.makedirs(self.dir, exist_ok=True)
+        with file_lock(os.path.join(self.dir, ".lock")):
+            latest = self.latest()
+            if latest is not None and latest[2] >= started - self.fresh_seconds:
+                return latest[:2]   # scaricato da un altro processo mentre si aspettava il lock
+            fd, tmp = tempfile.mkstemp(suffix=self.suffix + ".part", dir=self.dir)
+            os.close(fd)
+            try:
+                download(tmp)
+                digest = file_digest(tmp)
+                path = self.path_for(digest)
+                if os.path.exists(path):
+                    os.utime(path)   # contenuto gia' in cache: resta fra i piu' recenti
+                else:
+                    os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._write_latest(digest)
+            self._prune(path)
+            return path, digest
+
+    def _write_latest(self, digest):
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"digest": digest, "fetched_at": self._clock()}, f)
+        os.replace(tmp, os.path.join(self.dir, LATEST))
+
+    def _prune(self, current):
+        files = [os.path.join(self.dir, n) for n in os.listdir(self.dir) if n.endswith(self.suffix)]
+        files = sorted((f for f in files if f != current), key=os.path.getmtime, reverse=True)
+        for old in files[self.keep - 1:]:
+            try:
+                os.remove(old)
+            except OSError:   # Windows: file ancora aperto da un lettore, lo si toglie al prossimo giro
+                pass
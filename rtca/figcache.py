@@ -0,0 +1,149 @@
+"""Cache LRU delle figure Plotly serializzate, per (versione dei dati, filtri, grafico).
+
+A ogni interazione Streamlit riesegue lo script: senza cache ogni grafico
+viene ricostruito (validazione Plotly dei trace) e riserializzato da
+``st.plotly_chart`` (``to_dict`` + ``to_json``), anche quando cambia solo un
+widget che non lo riguarda. La cache tiene il JSON della figura, con un
+limite in byte ed eviction LRU; su hit la figura torna come ``CachedFigure``,
+che ``st.plotly_chart`` serializza ripartendo dal JSON (un ``json.loads``)
+invece che dal grafo di oggetti Plotly.
+
+La cache e' unica nel processo e condivisa fra le sessioni: la chiave
+contiene la versione dei dati e i filtri normalizzati, quindi due utenti con
+la stessa selezione usano la stessa figura. ``stats()`` espone hit, miss ed
+eviction, totali e per grafico.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+from .timing import timings
+
+MAX_BYTES = int(float(os.environ.get("RTCA_FIGURE_CACHE_MB", "128")) * 2**20)
+
+
+class CachedFigure(go.Figure):
+    """Figura gia' serializzata: ``to_dict`` / ``to_json`` partono dal JSON salvato, senza ricostruire i trace.
+
+    Da trattare come read-only: gli attributi Plotly (``layout``, ``data``) sono vuoti.
+    """
+
+    def __init__(self, spec):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return json.loads(self._spec)
+
+    def to_plotly_json(self):
+        return self.to_dict()
+
+    def to_json(self, *args, **kwargs):
+        return self._spec
+
+
+def _normalize(value):
+    """Valori dei filtri come chiave stabile: liste/insiemi ordinati (l'ordine delle multiselect non conta)."""
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(sorted(str(v) for v in value))
+    if isinstance(value, tuple):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, float):
+        return round(value, 9)
+    return value
+
+
+def filter_key(**filters):
+    """Tupla ordinata (nome, valore normalizzato) dei filtri che determinano un grafico."""
+    return tuple((name, _normalize(filters[name])) for name in sorted(filters))
+
+
+class FigureCache:
+    """LRU thread-safe di (spec JSON, meta) con limite in byte; ``None`` (nessun grafico) e' un valore valido."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {}   # chart -> [hit, miss]
+        self.evictions = 0
+
+    def get(self, version, filters, chart, build):
+        """(figura, meta) del grafico ``chart``: dalla cache, altrimenti da ``build()``.
+
+        ``build`` ritorna la figura (o None) oppure (figura, meta); ``meta`` e'
+        conservato accanto al JSON (es. le info del downsampling dello spettro).
+        """
+        key = (version, filters, chart)
+        with self._lock:
+            entry = self._entries.get(key)
+            counter = self._counters.setdefault(chart, [0, 0])
+            if entry is not None:
+                self._entries.move_to_end(key)
+                counter[0] += 1
+            else:
+                counter[1] += 1
+        if entry is None:
+            with timings.stage(f"figure.{chart}"):
+                out = build()
+            fig, meta = out if isinstance(out, tuple) else (out, None)
+            with timings.stage(f"serialize.{chart}") as stage:
+                entry = (None if fig is None else fig.to_json(), meta)
+                stage["bytes"] = len(entry[0] or "")
+            self._put(key, entry)
+        spec, meta = entry
+        return (None if spec is None else CachedFigure(spec)), meta
+
+    def _put(self, key, entry):
+        size = len(entry[0] or "")
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0] or "")
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (spec, _) = self._entries.popitem(last=False)
+                self._bytes -= len(spec or "")
+                self.evictions += 1
+
+    def carry_over(self, old_version, new_version, keep):
+        """Copia sotto ``new_version`` le figure di ``old_version`` per cui ``keep(filters, chart)`` e' vero.
+
+        Per una nuova versione dei dati che non tocca quelle selezioni (vedi
+        rtca.incremental): il primo rerun dopo il refresh le trova gia' in cache.
+        Ritorna il numero di figure copiate.
+        """
+        with self._lock:
+            carried = [((new_version, filters, chart), entry) for (version, filters, chart), entry
+                       in self._entries.items() if version == old_version]
+        carried = [(key, entry) for key, entry in carried if keep(key[1], key[2])]
+        for key, entry in carried:
+            self._put(key, entry)
+        return len(carried)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Contatori per gli operatori: totali, occupazione e hit/miss per grafico."""
+        with self._lock:
+            hits = sum(c[0] for c in self._counters.values())
+            misses = sum(c[1] for c in self._counters.values())
+            return {
+                "hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "evictions": self.evictions, "entries": len(self._entries), "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "charts": {chart: {"hits": h, "misses": m} for chart, (h, m) in sorted(self._counters.items())},
+            }
+
+
+figure_cache = FigureCache()
@@ -0,0 +1,155 @@
+"""Figure Plotly comuni alle dashboard (spettro, heatmap, ciambelle di stato, barre dei KO), senza Streamlit."""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .columns import CENTER, POWER_DBM, WIDTH_MHZ
+from .heatmap import VALUES
+from .spectrum import conflict_trace, proposal_trace, spectrum_traces
+
+GRID, MINOR_GRID = 'rgba(255,255,255,0.5)', 'rgba(255,255,255,0.2)'
+
+
+def spectrum_figure(data, color_by, bw_col, x_range=None, conflicts=None, proposals=None, opacity=0.8,
+                    title_size=20, fit_axes=True):
+    """Spettro scuro con i canali di ``data`` e i layer opzionali di conflitti e proposte.
+
+    Ritorna (fig, info di spectrum_traces), o (None, None) senza dati. Con
+    ``fit_axes`` gli assi sono adattati ai canali (piu' un margine del 5%),
+    altrimenti decide Plotly quando non c'e' zoom.
+    """
+    if data.empty:
+        return None, None
+    extent = data[[CENTER, WIDTH_MHZ]]
+    if proposals is not None and not proposals.empty:
+        extent = pd.concat([extent, proposals[[CENTER, WIDTH_MHZ]]])
+    left = extent[CENTER] - extent[WIDTH_MHZ] / 2
+    right = extent[CENTER] + extent[WIDTH_MHZ] / 2
+    min_x, max_x = float(left.min()), float(right.max())
+    min_y, max_y = float(data[POWER_DBM].min()), float(data[POWER_DBM].max())
+    dx = max((max_x - min_x) * 0.05, 1.0)
+
+    # Un gruppo per ``color_by`` in una passata; sopra MAX_BARS canali visibili si aggregano in bin
+    traces, info = spectrum_traces(data, color_by, bw_col, x_range=x_range, opacity=opacity)
+    fig = go.Figure(traces)
+    if conflicts is not None and not conflicts.empty:
+        fig.add_trace(conflict_trace(conflicts, x_range=x_range))
+    if proposals is not None and not proposals.empty:
+        fig.add_trace(proposal_trace(proposals, x_range=x_range))
+
+    if x_range is not None:
+        x_axis_range = list(x_range)
+    else:
+        x_axis_range = [min_x - dx, max_x + dx] if fit_axes else None
+    title_font = dict(size=title_size, color='#FFF')
+    fig.update_layout(
+        template='plotly_dark', barmode='overlay', dragmode='select' if info['mode'] == 'binned' else 'zoom',
+        plot_bgcolor='#111', paper_bgcolor='#111', font_color='#FFF',
+        xaxis=dict(range=x_axis_range, showgrid=True, gridcolor=GRID, gridwidth=1,
+                   minor=dict(showgrid=True, gridcolor=MINOR_GRID, gridwidth=1),
+                   title=dict(text='<b>Frequency (MHz)</b>', font=title_font)),
+        yaxis=dict(range=[min_y, max_y] if fit_axes else None, showgrid=True, gridcolor=GRID, gridwidth=1,
+                   minor=dict(showgrid=True, gridcolor=MINOR_GRID, gridwidth=1),
+                   title=dict(text='<b>Power (dBm)</b>', font=title_font)),
+        legend=dict(font=dict(color='#FFF'))
+    )
+    return fig, info
+
+
+def venue_heatmap(venues, edges, grid, value="bandwidth", title_size=20):
+    """Heatmap venue x bin di frequenza (da heatmap.occupancy_grid) in una sola traccia; celle vuote trasparenti.
+
+    Le venue senza canali nel range sono omesse; None se non ne resta nessuna.
+    """
+    keep = grid.any(axis=1) if len(venues) else np.zeros(0, dtype=bool)
+    if not keep.any():
+        return None
+    venues, grid = [v for v, k in zip(venues, keep) if k], grid[keep]
+    step = edges[1] - edges[0]
+    fig = go.Figure(go.Heatmap(
+        z=np.where(grid > 0, grid.round(4), np.nan), x=(edges[:-1] + step / 2).round(6), y=venues,
+        colorscale='Inferno', zmin=0, colorbar=dict(title=VALUES[value], thickness=15),
+        hovertemplate=('Venue: %{y}<br>Bin: %{x:.4f} MHz ± ' + f'{step / 2:.4f}'
+                       + '<br>' + VALUES[value] + ': %{z}<extra></extra>'),
+    ))
+    title_font = dict(size=title_size, color='#FFF')
+    fig.update_layout(
+        template='plotly_dark', plot_bgcolor='#111', paper_bgcolor='#111', font_color='#FFF',
+        xaxis=dict(showgrid=True, gridcolor=MINOR_GRID, title=dict(text='<b>Frequency (MHz)</b>', font=title_font)),
+        yaxis=dict(type='category', title=dict(text='<b>Venue</b>', font=title_font)),
+        height=max(400, 30 * len(venues) + 150),   # 30px per venue
+        margin=dict(l=100, r=50, t=30, b=50)
+    )
+    return fig
+
+
+def status_pie(stats, color_map=None, text_size=18, legend_y=1.2, pull=False):
+    """Ciambella da un frame Status/Count; senza ``color_map`` i colori vengono da Set1 in ordine."""
+    if color_map is None:
+        palette = px.colors.qualitative.Set1
+        color_map = {status: palette[i % len(palette)] for i, status in enumerate(stats['Status'].unique())}
+    fig = px.pie(stats, names='Status', values='Count', color='Status', hole=0.6, template='plotly',
+                 color_discrete_map=color_map)
+    fig.update_traces(
+        textinfo='percent',
+        texttemplate='%{percent:.1%} (%{value})',
+        textfont=dict(size=text_size),
+        textposition='outside',
+        marker=dict(line=dict(color='#FFF', width=2)),
+        **({'pull': [0.1] * len(stats)} if pull else {})
+    )
+    fig.update_layout(
+        margin=dict(l=20, r=20, t=20, b=20),
+        legend=dict(title='', orientation='h', x=0.5, xanchor='center', y=legend_y, yanchor='bottom',
+                    font=dict(size=14)),
+        showlegend=True
+    )
+    return fig
+
+
+def ko_priority_bar(ko_counts, priorities=('1', '2', '3', '4')):
+    """% di NOT ASSIGNED per priorita' (frame di core.ko_by_priority), con il numero assoluto sopra le barre."""
+    priorities = list(priorities)
+    # Palette colori diversa per ogni barra
+    palette = px.colors.qualitative.Set3
+    colors = {p: palette[i % len(palette)] for i, p in enumerate(priorities)}
+    fig = px.bar(ko_counts, x='Priority', y='Percentage', text='Count',
+                 labels={'Priority': 'Priority', 'Percentage': '% NOT ASSIGNED'},
+                 category_orders={'Priority': priorities}, template='plotly')   # asse X fisso
+    fig.update_traces(
+        marker_color=[colors.get(str(p), palette[0]) for p in ko_counts['Priority']],
+        texttemplate='<b>%{text}</b>',
+        textposition='outside',
+        textfont_size=18,
+        width=0.4
+    )
+    fig.update_layout(
+        xaxis_title='Stakeholder Priority',
+        yaxis_title='% NOT ASSIGNED',
+        yaxis=dict(range=[0, ko_counts['Percentage'].max() * 1.2]),   # 20% sopra il valore massimo
+        showlegend=False,
+        xaxis=dict(tickmode='array', tickvals=priorities, ticktext=priorities)
+    )
+    return fig
+
+
+def ko_ranking_bar(ranking, stake):
+    """Barre orizzontali degli stakeholder per % NOT ASSIGNED (frame di core.ko_ranking), il piu' alto in cima."""
+    fig = go.Figure(go.Bar(
+        x=ranking['KO_percent'],
+        y=ranking[stake],
+        orientation='h',
+        marker_color='#EF553B',
+        text=ranking['label_text'],
+        textposition='outside',
+        textfont=dict(size=14)
+    ))
+    fig.update_layout(
+        template='plotly',   # esplicito: uguale nella dashboard e nei bundle di rtca.reports
+        xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
+        yaxis=dict(autorange='reversed'),
+        margin=dict(l=150, r=50, t=50, b=50),
+        height=max(400, ranking.shape[0] * 30)   # almeno 400px, poi 30px per stakeholder
+    )
+    return fig
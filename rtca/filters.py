@@ -0,0 +1,96 @@
+"""Indice invertito per i filtri a cascata della sidebar.
+
+Per ogni colonna indicizzata i valori (confrontati come stringhe, come fa la
+sidebar) diventano codici interi; per ogni codice si tiene la lista ordinata
+delle posizioni di riga. Selezioni e liste di opzioni si ottengono da array di
+posizioni, senza ``astype(str)`` / ``unique()`` sul DataFrame a ogni rerun.
+"""
+import numpy as np
+import pandas as pd
+
+
+def label_codes(values):
+    """(codici int32, etichette): valori confrontati come stringhe, -1 per i nulli."""
+    raw_codes, uniques = pd.factorize(pd.Series(values).reset_index(drop=True))
+    # Valori diversi con la stessa stringa (1 e "1") finiscono nello stesso codice
+    by_label, labels = pd.factorize(pd.Index([str(u) for u in uniques], dtype=object))
+    codes = np.where(raw_codes >= 0, by_label[np.clip(raw_codes, 0, None)] if len(uniques) else -1, -1)
+    return codes.astype(np.int32), np.asarray(labels, dtype=object)
+
+
+class FilterIndex:
+    """Indice read-only di un DataFrame, da costruire una volta per versione dei dati.
+
+    Le righe selezionate sono array di posizioni (``np.intp``) da passare a ``df.take``.
+    ``rows=None`` significa "tutte le righe".
+    """
+
+    def __init__(self, df, columns, derived=None):
+        self.n_rows = len(df)
+        self._codes, self._labels, self._lookup, self._by_label, self._order, self._offsets = {}, {}, {}, {}, {}, {}
+        series = {c: df[c] for c in columns if c in df.columns}
+        series.update(derived or {})
+        for name, values in series.items():
+            self._add(name, values)
+
+    def _add(self, name, values):
+        codes, labels = label_codes(values)
+        order = np.argsort(codes, kind="stable")
+        offsets = np.searchsorted(codes[order], np.arange(-1, len(labels) + 1))
+        self._codes[name] = codes
+        self._labels[name] = labels
+        self._lookup[name] = {label: code for code, label in enumerate(labels)}
+        self._by_label[name] = np.argsort(self._labels[name], kind="stable")
+        self._order[name] = order
+        self._offsets[name] = offsets
+
+    def __contains__(self, name):
+        return name in self._codes
+
+    def codes(self, name):
+        """(codici per riga, etichette) della colonna ``name``, da non modificare."""
+        return self._codes[name], self._labels[name]
+
+    def lookup(self, name, values):
+        """Codici dei ``values`` presenti nella colonna (confronto come stringhe)."""
+        if isinstance(values, str):
+            values = [values]
+        lookup = self._lookup[name]
+        wanted = np.fromiter((lookup.get(str(v), -1) for v in values), dtype=np.intp)
+        return wanted[wanted >= 0]
+
+    def all_rows(self):
+        return np.arange(self.n_rows, dtype=np.intp)
+
+    def positions(self, name, value):
+        """Posizioni (ordinate) delle righe con ``str(valore) == value``."""
+        code = self._lookup[name].get(str(value), -1)
+        if code < 0:
+            return np.empty(0, dtype=np.intp)
+        lo, hi = self._offsets[name][code + 1], self._offsets[name][code + 2]
+        return self._order[name][lo:hi]
+
+    def select(self, rows, name, values):
+        """Restringe ``rows`` alle righe il cui valore in ``name`` e' fra ``values``.
+
+        ``values`` vuoto/None non filtra, come nella sidebar (multiselect vuota = tutto).
+        """
+        if not values or name not in self:
+            return self.all_rows() if rows is None else rows
+        wanted = self.lookup(name, values)
+        if rows is None:
+            if len(wanted) == 1:
+                return self.positions(name, self._labels[name][wanted[0]])
+            rows = self.all_rows()
+        allowed = np.zeros(len(self._labels[name]) + 1, dtype=bool)
+        allowed[wanted] = True    # l'ultima cella (codice -1, NaN) resta False
+        return rows[allowed[self._codes[name][rows]]]
+
+    def options(self, rows, name):
+        """Valori non nulli presenti in ``rows`` per la colonna ``name``, ordinati."""
+        if name not in self:
+            return []
+        codes = self._codes[name] if rows is None else self._codes[name][rows]
+        present = np.bincount(codes[codes >= 0], minlength=len(self._labels[name])) > 0
+        by_label = self._by_label[name]
+        return self._labels[name][by_label[present[by_label]]].tolist()
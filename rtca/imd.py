@@ -0,0 +1,207 @@
+"""Intermodulazione di terzo ordine (IMD3) fra i canali assegnati di ogni venue.
+
+Per ogni venue si calcolano i prodotti 2f1 - f2 e f1 + f2 - f3 delle portanti
+assegnate e si segnalano le *vittime*: canali la cui banda (center +/-
+width/2, piu' una tolleranza) contiene un prodotto generato da altre portanti.
+
+Il numero di prodotti e' O(n^2) e O(n^3) per venue: i prodotti vengono
+generati a blocchi (broadcasting NumPy limitato a ``block`` elementi), e le
+venue vengono distribuite su un process pool quando il lavoro e' abbastanza
+grande da ripagare l'avvio dei processi.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .columns import CENTER, COL_REQUEST, COL_VENUE, WIDTH_MHZ
+
+BLOCK = 1_000_000            # elementi per blocco di prodotti (qualche decina di MB con gli indici)
+MAX_HITS_PER_VENUE = 50_000
+PARALLEL_MIN_PRODUCTS = 5e7  # sotto questa soglia il pool costa piu' di quanto fa risparmiare
+
+TWO_TONE, THREE_TONE = "2f1-f2", "f1+f2-f3"
+HIT_COLUMNS = ["Venue Code", "Victim Request ID", "Victim Freq (MHz)", "Product", "Product (MHz)",
+               "f1 Request ID", "f2 Request ID", "f3 Request ID"]
+
+
+def _victims_of(products, lo, hi, max_half):
+    """Per ogni prodotto, le vittime v (ordinate per lo) con lo[v] <= p <= hi[v]: (indice prodotto, vittima)."""
+    first = np.searchsorted(lo, products - 2 * max_half, side="left")
+    last = np.searchsorted(lo, products, side="right")
+    n_cand = last - first
+    if not n_cand.any():
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    p_idx = np.repeat(np.arange(len(products)), n_cand)
+    starts = np.r_[0, np.cumsum(n_cand)[:-1]]
+    v = np.repeat(first, n_cand) + np.arange(int(n_cand.sum())) - np.repeat(starts, n_cand)
+    hit = products[p_idx] <= hi[v]
+    return p_idx[hit], v[hit]
+
+
+def _pair_blocks(n, size):
+    """Coppie (i, j) con i < j a blocchi di ``size``, nell'ordine di ``np.triu_indices``, senza materializzarle.
+
+    Ogni blocco prende la coda j > i di una riga i dopo l'altra.
+    """
+    i, j = 0, 1
+    while i < n - 1:
+        bi, bj, room = [], [], size
+        while room and i < n - 1:
+            take = min(room, n - j)
+            bi.append(np.full(take, i))
+            bj.append(np.arange(j, j + take))
+            room -= take
+            j += take
+            if j == n:
+                i, j = i + 1, i + 2
+        yield np.concatenate(bi), np.concatenate(bj)
+
+
+def venue_imd(centers, half_widths, tolerance=0.0, max_spread=None, block=BLOCK, max_hits=MAX_HITS_PER_VENUE):
+    """IMD3 di una venue. Ritorna (hits, total) con hits array (n, 5): victim, kind, i, j, k (k=-1 per 2 toni).
+
+    Gli indici si riferiscono all'ordine di ``centers``. ``max_spread`` (MHz)
+    limita le combinazioni a portanti distanti al massimo tanto fra loro.
+    """
+    centers = np.asarray(centers, dtype=float)
+    n = len(centers)
+    if n < 3:
+        return np.empty((0, 5), dtype=np.int64), 0
+    order = np.argsort(centers, kind="stable")
+    c = centers[order]
+    half = np.asarray(half_widths, dtype=float)[order] + tolerance
+    lo, hi = c - half, c + half
+    lo_order = np.argsort(lo, kind="stable")
+    lo_sorted, hi_by_lo = lo[lo_order], hi[lo_order]
+    max_half = float(half.max())
+    f_min, f_max = lo.min(), hi.max()
+
+    found, total = [], 0
+
+    def collect(products, kind, i, j, k):
+        nonlocal total
+        inside = (products >= f_min) & (products <= f_max)
+        if max_spread is not None:
+            inside &= np.abs(c[i] - c[j]) <= max_spread
+            if k is not None:
+                inside &= (np.abs(c[i] - c[k]) <= max_spread) & (np.abs(c[j] - c[k]) <= max_spread)
+        sel = np.flatnonzero(inside)
+        p_idx, v = _victims_of(products[sel], lo_sorted, hi_by_lo, max_half)
+        v = lo_order[v]
+        p_idx = sel[p_idx]
+        ii, jj = i[p_idx], j[p_idx]
+        kk = k[p_idx] if k is not None else np.full(len(p_idx), -1)
+        keep = (v != ii) & (v != jj) & (v != kk)
+        total += int(keep.sum())
+        room = max_hits - sum(len(f) for f in found)
+        if room > 0 and keep.any():
+            rows = np.column_stack((v[keep], np.full(keep.sum(), kind), ii[keep], jj[keep], kk[keep]))[:room]
+            found.append(rows)
+
+    # 2f1 - f2, i != j: blocchi di righe i
+    rows_per_block = max(1, block // n)
+    j_all = np.arange(n)
+    for start in range(0, n, rows_per_block):
+        i_blk = np.arange(start, min(n, start + rows_per_block))
+        i = np.repeat(i_blk, n)
+        j = np.tile(j_all, len(i_blk))
+        mask = i != j
+        i, j = i[mask], j[mask]
+        collect(2 * c[i] - c[j], 0, i, j, None)
+
+    # f1 + f2 - f3, i < j, k diverso da entrambi: blocchi di coppie (i, j) generati uno alla volta
+    for bi, bj in _pair_blocks(n, max(1, block // n)):
+        i = np.repeat(bi, n)
+        j = np.repeat(bj, n)
+        k = np.tile(j_all, len(bi))
+        mask = (k != i) & (k != j)
+        i, j, k = i[mask], j[mask], k[mask]
+        collect(c[i] + c[j] - c[k], 1, i, j, k)
+
+    hits = np.concatenate(found) if found else np.empty((0, 5), dtype=np.int64)
+    # Indici riportati all'ordine originale di ``centers``
+    remap = np.append(order, -1)
+    hits[:, [0, 2, 3, 4]] = remap[hits[:, [0, 2, 3, 4]]]
+    three = hits[:, 1] == 1
+    hits[three, 2:4] = np.sort(hits[three, 2:4], axis=1)   # f1 + f2 e' simmetrico
+    return hits, total
+
+
+def _venue_task(args):
+    venue, centers, half_widths, kwargs = args
+    hits, total = venue_imd(centers, half_widths, **kwargs)
+    return venue, hits, total
+
+
+def analyze(data, venue_col=COL_VENUE, request_col=COL_REQUEST, tolerance=0.0, max_spread=None,
+            workers=None, block=BLOCK):
+    """IMD3 per tutte le venue di ``data`` (righe con center / width_mhz).
+
+    Ritorna (hits, totals): ``hits`` ha una riga per (vittima, combinazione)
+    con colonne HIT_COLUMNS; ``totals`` e' {venue: numero totale di colpi},
+    che puo' superare le righe di ``hits`` quando una venue supera
+    MAX_HITS_PER_VENUE. ``workers=0`` forza l'esecuzione nel processo corrente.
+    """
+    center = pd.to_numeric(data[CENTER], errors="coerce").to_numpy(dtype=float)
+    width = pd.to_numeric(data[WIDTH_MHZ], errors="coerce").to_numpy(dtype=float)
+    ok = np.isfinite(center) & np.isfinite(width) & data[venue_col].notna().to_numpy()
+    pos = np.flatnonzero(ok)
+    venues = data[venue_col].to_numpy(dtype=object)[pos]
+    codes, uniques = pd.factorize(venues)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    groups = {uniques[g]: pos[order[bounds[g]:bounds[g + 1]]] for g in range(len(uniques))}
+
+    kwargs = {"tolerance": tolerance, "max_spread": max_spread, "block": block}
+    tasks = [(v, center[rows], width[rows] / 2, kwargs) for v, rows in groups.items() if len(rows) >= 3]
+    tasks.sort(key=lambda t: -len(t[1]))   # le venue piu' pesanti per prime
+    work = sum(len(t[1]) ** 3 / 2 for t in tasks)
+    if workers != 0 and len(tasks) > 1 and work >= PARALLEL_MIN_PRODUCTS:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(_venue_task, tasks))
+    else:
+        results = [_venue_task(t) for t in tasks]
+
+    request = data[request_col].to_numpy(dtype=object)
+    frames, totals = [], {}
+    for venue, hits, total in results:
+        totals[venue] = total
+        if not len(hits):
+            continue
+        rows = groups[venue]
+        rid = np.append(request[rows], None)
+        f = center[rows]
+        kind = hits[:, 1]
+        prod = np.where(kind == 0, 2 * f[hits[:, 2]] - f[hits[:, 3]],
+                        f[hits[:, 2]] + f[hits[:, 3]] - f[hits[:, 4]])
+        frames.append(pd.DataFrame({
+            "Venue Code": venue,
+            "Victim Request ID": rid[hits[:, 0]],
+            "Victim Freq (MHz)": f[hits[:, 0]],
+            "Product": np.where(kind == 0, TWO_TONE, THREE_TONE),
+            "Product (MHz)": np.round(prod, 6),
+            "f1 Request ID": rid[hits[:, 2]],
+            "f2 Request ID": rid[hits[:, 3]],
+            "f3 Request ID": rid[hits[:, 4]],
+        }))
+    hits = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=HIT_COLUMNS)
+    return hits, totals
+
+
+def victims_summary(hits, examples=3):
+    """Una riga per vittima: numero di prodotti che la colpiscono e le prime combinazioni."""
+    if hits.empty:
+        return pd.DataFrame(columns=["Venue Code", "Victim Request ID", "Victim Freq (MHz)", "Hits", "Generated by"])
+    combo = hits["f1 Request ID"].astype(str) + " & " + hits["f2 Request ID"].astype(str)
+    combo = combo.where(hits["f3 Request ID"].isna(), combo + " - " + hits["f3 Request ID"].astype(str))
+    combo = "(" + hits["Product"] + ") " + combo
+    keys = ["Venue Code", "Victim Request ID", "Victim Freq (MHz)"]
+    grouped = combo.groupby([hits[k] for k in keys], sort=False)
+    out = pd.DataFrame({
+        "Hits": grouped.size(),
+        "Generated by": grouped.agg(lambda s: "; ".join(s.iloc[:examples]) + (" ..." if len(s) > examples else "")),
+    }).reset_index()
+    return out.sort_values("Hits", ascending=False, ignore_index=True)
@@ -0,0 +1,175 @@
+"""Differenze fra versioni per Request ID e ricalcolo incrementale.
+
+Fra due refresh cambiano di solito poche righe (una frequenza attribuita,
+uno Stato). ``version_diff`` allinea due versioni per Request ID e ritorna
+righe aggiunte, rimosse e celle cambiate, con le venue e gli stakeholder
+toccati (valori prima e dopo). Da li':
+
+- ``dataset_conflicts`` riusa i conflitti co-canale della versione precedente
+  quando nessuna venue del periodo e' stata toccata (i conflitti sono sempre
+  fra canali della stessa venue);
+- ``VersionDiff.touches`` dice se una selezione della sidebar contiene righe
+  cambiate: le figure delle selezioni non toccate (stato, KO, occupazione)
+  passano alla nuova versione senza ricalcolo (``FigureCache.carry_over``).
+
+Request ID ripetuti vengono allineati per occorrenza (il primo con il primo).
+"""
+import numpy as np
+import pandas as pd
+
+from .columns import (
+    CENTER, COL_AO, COL_AQ, COL_BX, COL_PERIOD, COL_REQUEST, COL_STAKE, COL_STAKE_ID, COL_VENUE, POWER_DBM,
+    REQ_ID, WIDTH_MHZ,
+)
+from .conflicts import find_conflicts, no_conflicts
+from .core import chart_rows, lan_frame, lan_index, olympic_frame, olympic_index
+from .timing import timings
+
+DERIVED = [CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID]   # colonne calcolate: cambiano con quelle del workbook
+CHANGE_COLUMNS = ["Request ID", "Column", "Before", "After"]
+
+# vista -> (frame, indice, colonna stakeholder, solo righe disegnabili)
+VIEWS = {
+    "olympic": (olympic_frame, olympic_index, COL_STAKE, False),
+    "lan": (lan_frame, lan_index, COL_STAKE_ID, True),
+}
+
+
+class VersionDiff:
+    """Righe aggiunte / rimosse (Request ID), celle cambiate, venue e stakeholder toccati."""
+
+    def __init__(self, old_version, new_version, added, removed, changed, venues, stakeholders, positions=None):
+        self.old_version = old_version
+        self.new_version = new_version
+        self.added = added
+        self.removed = removed
+        self.changed = changed          # DataFrame CHANGE_COLUMNS, una riga per cella
+        self.venues = venues            # frozenset, valori prima e dopo
+        self.stakeholders = stakeholders
+        # posizioni: (uscite dal frame vecchio, entrate nel nuovo, (vecchie, nuove) delle righe invariate)
+        self.positions = positions
+
+    @property
+    def changed_rows(self):
+        return self.changed["Request ID"].nunique()
+
+    def __bool__(self):
+        return bool(len(self.added) or len(self.removed) or len(self.changed))
+
+    def touches(self, venues=None, stakeholders=None):
+        """True se una selezione (venue, stakeholder; vuoto/None = tutti) puo' contenere righe cambiate.
+
+        Conservativo: venue e stakeholder sono confrontati separatamente.
+        """
+        def overlaps(touched, selected):
+            return not selected or not touched.isdisjoint(str(v) for v in selected)
+        return bool(self) and overlaps(self.venues, venues) and overlaps(self.stakeholders, stakeholders)
+
+    def table(self, limit=None):
+        """Una riga per cella cambiata e per richiesta aggiunta/rimossa, valori come testo (per st.dataframe)."""
+        def text(values):
+            return [None if pd.isna(v) else str(v) for v in values]
+        marks = [pd.DataFrame({"Request ID": text(ids), "Column": label, "Before": None, "After": None})
+                 for ids, label in ((self.added, "(added)"), (self.removed, "(removed)")) if len(ids)]
+        changed = self.changed.head(limit) if limit else self.changed
+        cells = pd.DataFrame({"Request ID": text(changed["Request ID"]), "Column": changed["Column"].to_numpy(),
+                              "Before": text(changed["Before"]), "After": text(changed["After"])})
+        out = pd.concat(marks + [cells], ignore_index=True)
+        return out.head(limit) if limit else out
+
+    def summary(self):
+        return {"added": len(self.added), "removed": len(self.removed), "changed_rows": self.changed_rows,
+                "changed_cells": len(self.changed), "venues": len(self.venues),
+                "stakeholders": len(self.stakeholders)}
+
+
+def _row_keys(df, key):
+    """(Request ID come stringa, occorrenza): unica anche con ID ripetuti o mancanti."""
+    ids = df[key].astype(object).where(df[key].notna(), "<NA>").astype(str)
+    return pd.MultiIndex.from_arrays([ids.to_numpy(), ids.groupby(ids).cumcount().to_numpy()])
+
+
+def _values(df, col, rows):
+    return df[col].to_numpy(dtype=object)[rows]
+
+
+def _labels(*arrays):
+    return frozenset(str(v) for a in arrays for v in a if not pd.isna(v))
+
+
+def diff_frames(old, new, key=COL_REQUEST, columns=None, venue_col=COL_VENUE, stake_col=COL_STAKE,
+                old_version=None, new_version=None):
+    """``VersionDiff`` fra due frame con la stessa vista (colonne confrontate: ``columns`` o quelle comuni)."""
+    columns = [c for c in (columns if columns is not None else new.columns)
+               if c in old.columns and c != key and c not in DERIVED]
+    new_keys = _row_keys(new, key)
+    match = new_keys.get_indexer(_row_keys(old, key))
+    kept = match >= 0
+    a, b = np.flatnonzero(kept), match[kept]            # stessa riga: posizione vecchia, nuova
+    removed = np.flatnonzero(~kept)
+    is_added = np.ones(len(new), dtype=bool)
+    is_added[b] = False
+    added = np.flatnonzero(is_added)
+
+    parts, dirty = [], np.zeros(len(a), dtype=bool)
+    for col in columns:
+        before, after = _values(old, col, a), _values(new, col, b)
+        na_before, na_after = pd.isna(before), pd.isna(after)
+        same = (na_before & na_after) | (~na_before & ~na_after & (before == after))
+        rows = np.flatnonzero(~same)
+        if len(rows):
+            dirty[rows] = True
+            parts.append(pd.DataFrame({"Request ID": _values(new, key, b[rows]), "Column": col,
+                                       "Before": before[rows], "After": after[rows]}))
+    changed = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=CHANGE_COLUMNS)
+
+    def touched(col):
+        if col not in old.columns or col not in new.columns:
+            return frozenset()
+        return _labels(_values(old, col, removed), _values(new, col, added),
+                       _values(old, col, a[dirty]), _values(new, col, b[dirty]))
+
+    positions = (np.concatenate([removed, a[dirty]]), np.concatenate([added, b[dirty]]), (a[~dirty], b[~dirty]))
+    return VersionDiff(old_version, new_version, _values(new, key, added), _values(old, key, removed), changed,
+                       touched(venue_col), touched(stake_col), positions)
+
+
+def version_diff(previous, dataset, view="olympic"):
+    """Diff fra due dataset nella vista ``view``, calcolato una volta (memo sul dataset nuovo)."""
+    frame, _, stake_col, _ = VIEWS[view]
+
+    def build(ds):
+        with timings.stage(f"diff.{view}") as stage:
+            diff = diff_frames(frame(previous), frame(ds), stake_col=stake_col,
+                               old_version=previous.version, new_version=ds.version)
+            stage["rows"] = len(diff.added) + len(diff.removed) + diff.changed_rows
+        return diff
+    return dataset.memo(f"{view}_diff:{previous.version}", build)
+
+
+def dataset_conflicts(dataset, period, view="olympic", previous=None):
+    """Conflitti co-canale del periodo (tutti gli stakeholder), una volta per dataset.
+
+    Con ``previous`` (dataset della versione prima, con i conflitti del
+    periodo gia' calcolati): se nessuna venue toccata dal diff compare nel
+    periodo, prima o dopo, il risultato precedente vale ancora e viene riusato.
+    Altrimenti si ricalcola tutto: ricucire solo le venue toccate costa quanto
+    il calcolo intero, che e' dominato dalla tabella delle coppie.
+    """
+    frame, index, stake_col, plotted_only = VIEWS[view]
+    name = f"{view}_conflicts:{period}"
+
+    def build(ds):
+        df = frame(ds)
+        if any(c not in df.columns for c in (COL_BX, COL_AO, COL_AQ, COL_REQUEST, COL_VENUE)):
+            return no_conflicts()
+        periods = [period] if period else None
+        data = chart_rows(df.take(index(ds).select(None, COL_PERIOD, periods)), plotted_only=plotted_only)
+        base = None if previous is None else previous.peek(name)
+        if base is not None:
+            old = frame(previous)[COL_VENUE].take(index(previous).select(None, COL_PERIOD, periods))
+            if _labels(data[COL_VENUE].unique(), old.unique()).isdisjoint(version_diff(previous, ds, view).venues):
+                return base
+        with timings.stage(f"conflicts.{view}", rows=len(data)):
+            return find_conflicts(data, stake_col=stake_col)
+    return dataset.memo(name, build)
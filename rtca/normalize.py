@@ -0,0 +1,41 @@
+"""Normalizzazione al caricamento: sostituzione OTH e colonne derivate per lo spettro.
+
+Tutto vettoriale e calcolato una volta per versione dei dati, cosi' un rerun
+della dashboard deve solo filtrare.
+"""
+import numpy as np
+import pandas as pd
+
+from .columns import (
+    CENTER, COL_AO, COL_AQ, COL_BX, COL_NEW_SERVICE, COL_NEW_VENUE, COL_REQUEST, COL_SERVICE,
+    COL_VENUE, POWER_DBM, REQ_ID, WIDTH_MHZ,
+)
+
+OTH = "OTH"
+
+
+def substitute_oth(df, col, new_col):
+    """Dove ``col`` vale "OTH" usa il valore di ``new_col`` (anche se vuoto), altrimenti lascia invariato."""
+    values = df[col]
+    is_categorical = isinstance(values.dtype, pd.CategoricalDtype)
+    values = values.astype(object)
+    out = values.mask(values == OTH, df[new_col].astype(object))
+    return out.astype("category") if is_categorical else out
+
+
+def add_spectrum_columns(df, bx=COL_BX, ao=COL_AO, aq=COL_AQ, request=COL_REQUEST):
+    """Aggiunge center / width_mhz / power_dBm / req_id a tutto il frame (in place)."""
+    df[CENTER] = pd.to_numeric(df[bx], errors="coerce")
+    df[WIDTH_MHZ] = pd.to_numeric(df[ao], errors="coerce") / 1000.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df[POWER_DBM] = 10 * np.log10(pd.to_numeric(df[aq], errors="coerce") * 1000)
+    df[REQ_ID] = df[request].astype(str)
+    return df
+
+
+def normalize(df):
+    """Copia di ``df`` (foglio ALL NP) con OTH sostituiti e colonne derivate calcolate."""
+    df = df.copy()
+    df[COL_VENUE] = substitute_oth(df, COL_VENUE, COL_NEW_VENUE)
+    df[COL_SERVICE] = substitute_oth(df, COL_SERVICE, COL_NEW_SERVICE)
+    return add_spectrum_columns(df)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from .columns import CAP_FROM, CAP_TO, CAP_TOT, CAP_VENUE, CENTER, COL_VENUE, WIDTH_MHZ
+
+OCCUPANCY_COLUMNS = ["Venue", "Range", "Occupancy"]
+
+
+def merge_intervals(left, right):
+    """Unione di intervalli 1-D: ritorna (starts, ends) ordinati e disgiunti.
+
+    Intervalli vuoti (right <= left) vengono ignorati; intervalli che si toccano
+    vengono fusi, come nel vecchio loop di build_occupancy_chart.
+    """
+    left = np.asarray(left, dtype=float)
+    right = np.asarray(right, dtype=float)
+    keep = right > left
+    left, right = left[keep], right[keep]
+    if left.size == 0:
+        return np.empty(0), np.empty(0)
+    order = np.argsort(left, kind="stable")
+    left, right = left[order], right[order]
+    run_max = np.maximum.accumulate(right)
+    new_seg = np.empty(left.size, dtype=bool)
+    new_seg[0] = True
+    new_seg[1:] = left[1:] > run_max[:-1]
+    first = np.flatnonzero(new_seg)
+    return left[first], np.maximum.reduceat(right, first)
+
+
+def covered_length(starts, ends, a, b):
+    """Lunghezza coperta dai segmenti disgiunti (starts, ends) dentro [a, b], vettoriale su a/b."""
+    a = np.asarray(a, dtype=float)
+    b = np.maximum(np.asarray(b, dtype=float), a)
+    if starts.size == 0:
+        return np.zeros(a.shape)
+    lengths = ends - starts
+    cum = np.concatenate(([0.0], np.cumsum(lengths)))
+
+    def upto(x):
+        # Copertura di (-inf, x]: segmenti interi prima di k, piu' la parte del k-esimo
+        k = np.searchsorted(starts, x, side="right") - 1
+        kk = np.clip(k, 0, None)
+        partial = np.clip(x - starts[kk], 0.0, lengths[kk])
+        return np.where(k >= 0, cum[kk] + partial, 0.0)
+
+    return upto(b) - upto(a)
+
+
+def occupancy(clean_df, cap_df, venue_col=COL_VENUE):
+    """Occupazione (%) di ogni range di Capacity NP-OLY da parte dei canali assegnati.
+
+    Gli intervalli center +/- width_mhz/2 di tutte le venue vengono ordinati una
+    sola volta: ogni venue e' spostata in una propria "banda" disgiunta sull'asse
+    delle frequenze, cosi' un unico merge + searchsorted risponde per tutti i range.
+    Stesse percentuali (unione delle sovrapposizioni / Tot MHz) del vecchio doppio
+    iterrows; le righe seguono l'ordine di cap_df, limitate alle venue in clean_df,
+    con l'indice di cap_df (per ricucire i risultati di poche venue, rtca.scenario).
+    """
+    venues = pd.Index(clean_df[venue_col].dropna().unique())
+    cap = cap_df[cap_df[CAP_VENUE].isin(venues)]
+    if cap.empty:
+        return pd.DataFrame(columns=OCCUPANCY_COLUMNS)
+
+    center = pd.to_numeric(clean_df[CENTER], errors="coerce").to_numpy(dtype=float)
+    width = pd.to_numeric(clean_df[WIDTH_MHZ], errors="coerce").to_numpy(dtype=float)
+    left = center - width / 2
+    right = center + width / 2
+    v_idx = venues.get_indexer(clean_df[venue_col])
+    ok = (v_idx >= 0) & ~np.isnan(left) & ~np.isnan(right)
+    left, right, v_idx = left[ok], right[ok], v_idx[ok]
+
+    f_from = cap[CAP_FROM].astype(float).to_numpy()
+    f_to = cap[CAP_TO].astype(float).to_numpy()
+    tot = cap[CAP_TOT].astype(float).to_numpy()
+    c_idx = venues.get_indexer(cap[CAP_VENUE])
+
+    if left.size:
+        lo = np.nanmin(np.concatenate((left, f_from, [np.inf])))
+        hi = np.nanmax(np.concatenate((right, f_to, [-np.inf])))
+        band = hi - lo + 1.0
+        # Un range con estremo mancante non limita da quel lato
+        a = np.where(np.isnan(f_from), lo, f_from) - lo + c_idx * band
+        b = np.where(np.isnan(f_to), hi, f_to) - lo + c_idx * band
+        starts, ends = merge_intervals(left - lo + v_idx * band, right - lo + v_idx * band)
+        covered = covered_length(starts, ends, a, b)
+    else:
+        covered = np.zeros(len(cap))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(tot > 0, covered / tot * 100, 0.0)
+
+    return pd.DataFrame({
+        "Venue": cap[CAP_VENUE].to_numpy(),
+        "Range": [f"{a}-{b} MHz" for a, b in zip(f_from, f_to)],
+        "Occupancy": pct,
+    }, index=cap.index)
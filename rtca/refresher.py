@@ -0,0 +1,180 @@
+"""Aggiornamento del workbook in background (stale-while-revalidate).
+
+Con ``st.cache_data(ttl=60)`` sulla versione, il primo utente dopo la
+scadenza aspettava il download e il parse del nuovo workbook. Un
+``Refresher`` fa lo stesso lavoro in un thread: ogni ``interval`` secondi
+chiama ``source.refresh()`` e, se la versione e' cambiata, carica il dataset
+(snapshot Arrow, cache di processo di rtca.core); solo a caricamento
+riuscito la nuova versione sostituisce quella servita. Nel frattempo, e
+anche se il refresh fallisce, le sessioni continuano a ricevere l'ultima
+versione buona.
+
+L'unica attesa sul percorso delle richieste e' il primo caricamento del
+processo, quando non c'e' ancora niente da servire. Sorgente, funzione di
+caricamento e orologio sono iniettabili: con una sorgente locale (o finta)
+il refresher si prova senza rete e senza thread, chiamando ``refresh_now()``.
+"""
+import os
+import threading
+import time
+
+from .core import MAX_DATASETS, load_dataset
+from .timing import timings
+
+REFRESH_SECONDS = float(os.environ.get("RTCA_REFRESH_SECONDS", "60"))
+UPDATED, UNCHANGED, FAILED = "updated", "unchanged", "failed"
+
+_lock = threading.Lock()
+_refreshers = {}
+
+
+class Refresher:
+    """Versione servita di una sorgente, aggiornata fuori dal percorso delle richieste."""
+
+    def __init__(self, source, interval=REFRESH_SECONDS, load=load_dataset, clock=time.time):
+        self.source = source
+        self.interval = interval
+        self._load = load
+        self._clock = clock
+        self._lock = threading.Lock()        # stato servito e contatori
+        self._cycle = threading.RLock()      # un solo refresh alla volta
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._version = None
+        self._dataset = None   # dataset servito, per gli hook della versione successiva
+        self._loaded_at = None
+        self._exc = None
+        self._previous = {}   # versione -> versione servita prima di lei, solo le ultime MAX_DATASETS
+        self._hooks = {}
+        self._status = {"outcome": None, "checked_at": None, "error": None, "duration_s": None,
+                        "refreshes": 0, "failures": 0}
+
+    # ---- ciclo di refresh ----
+    def refresh_now(self):
+        """Un controllo della sorgente, nel thread chiamante; ritorna l'esito (UPDATED / UNCHANGED / FAILED)."""
+        with self._cycle:
+            t0, exc = self._clock(), None
+            try:
+                with timings.stage("download"):   # Drive: download + hash; locale: stat (+ hash)
+                    version = self.source.refresh()
+                if version == self._version:
+                    outcome = UNCHANGED
+                else:
+                    dataset = self._load(self.source, version)   # parse/snapshot prima dello scambio
+                    exc = self._run_hooks(self._dataset, dataset)
+                    with self._lock:
+                        self._previous.pop(version, None)   # in fondo anche se la versione torna
+                        self._previous[version] = self._version
+                        while len(self._previous) > MAX_DATASETS:   # oltre, il dataset non e' piu' in cache
+                            del self._previous[next(iter(self._previous))]
+                        self._version, self._dataset, self._loaded_at = version, dataset, self._clock()
+                    outcome = UPDATED
+            except Exception as e:   # la versione servita resta quella buona
+                outcome, exc = FAILED, e
+            with self._lock:
+                self._exc = exc
+                error = None if exc is None else f"{type(exc).__name__}: {exc}"
+                self._status.update(outcome=outcome, checked_at=self._clock(), error=error,
+                                    duration_s=self._clock() - t0)
+                self._status["refreshes"] += 1
+                self._status["failures"] += outcome == FAILED
+            return outcome
+
+    def on_update(self, name, hook):
+        """Registra ``hook(previous, dataset)``, eseguito nel thread di refresh prima dello scambio.
+
+        ``previous`` e' il dataset servito fino a quel momento. Serve a
+        preparare la nuova versione (diff, ricalcoli incrementali, cache) fuori
+        dalle richieste; un hook che fallisce non blocca lo scambio e il suo
+        errore finisce nello stato. Registrare di nuovo lo stesso nome sostituisce l'hook.
+        """
+        with self._lock:
+            self._hooks[name] = hook
+
+    def _run_hooks(self, previous, dataset):
+        if previous is None:
+            return None
+        with self._lock:
+            hooks = list(self._hooks.items())
+        error = None
+        for name, hook in hooks:
+            try:
+                with timings.stage(f"hook.{name}"):
+                    hook(previous, dataset)
+            except Exception as e:
+                error = e
+        return error
+
+    def previous(self, version):
+        """Versione servita prima di ``version`` (None per la prima del processo)."""
+        with self._lock:
+            return self._previous.get(version)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.refresh_now()
+
+    def start(self):
+        """Avvia il thread di background (idempotente)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"rtca-refresh-{self.source.name}",
+                                                daemon=True)
+                self._thread.start()
+        return self
+
+    def trigger(self):
+        """Chiede un refresh subito, senza aspettarlo."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    # ---- lettura (percorso delle richieste) ----
+    def current_version(self):
+        """Ultima versione buona; solo al primo uso (niente da servire) il caricamento avviene qui.
+
+        Se anche quel primo caricamento fallisce, rilancia l'errore (es. WorkbookSchemaError).
+        """
+        with self._lock:
+            version = self._version
+        if version is None:
+            with self._cycle:   # sessioni concorrenti al primo avvio: un solo caricamento
+                if self._version is None:
+                    self.refresh_now()
+            with self._lock:
+                version, exc = self._version, self._exc
+            if version is None:
+                raise exc
+        return version
+
+    def status(self):
+        """Versione servita, quando e' stata caricata, esito e ora dell'ultimo controllo."""
+        with self._lock:
+            return dict(self._status, version=self._version, loaded_at=self._loaded_at, interval=self.interval,
+                        running=self._thread is not None and self._thread.is_alive())
+
+
+def shared_refresher(source, interval=REFRESH_SECONDS):
+    """Un refresher avviato per sorgente nel processo, condiviso dalle sessioni e dalle due dashboard."""
+    with _lock:
+        refresher = _refreshers.get(source.key)
+        if refresher is None:
+            refresher = _refreshers[source.key] = Refresher(source, interval)
+    return refresher.start()
+
+
+def age_text(seconds):
+    """Eta' compatta: 42 s, 5 min, 2 h 10 min."""
+    seconds = max(0, int(seconds))
+    if seconds < 60:
+        return f"{seconds} s"
+    if seconds < 3600:
+        return f"{seconds // 60} min"
+    return f"{seconds // 3600} h {seconds % 3600 // 60} min"
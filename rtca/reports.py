@@ -0,0 +1,281 @@
+"""Riepiloghi pre-calcolati per ogni combinazione periodo x stakeholder (x ticket).
+
+    python -m rtca.reports --workbook frequenze.xlsx [--out .rtca_reports] [--tickets] [--workers N]
+                           [--no-html] [--watch 60]
+
+Per ogni combinazione della sidebar di app.py (servizi e venue lasciati a
+"tutti", come di default) vengono calcolate le due ciambelle di stato, le
+barre dei KO per priorita' e la classifica degli stakeholder, e scritte in un
+bundle per contenuto del workbook::
+
+    <out>/<sha256>/manifest.json   combinazioni presenti, file, conteggi
+    <out>/<sha256>/summary.csv     una riga per combinazione
+    <out>/<sha256>/<id>.json       figure (JSON Plotly) e tabelle
+    <out>/<sha256>/<id>.html       le stesse figure e tabelle in una pagina
+
+La cartella prende lo sha256 del file (``DataSource.content_digest``), non il
+token di versione che contiene il nome della sorgente: un bundle costruito da
+``--workbook`` serve anche una dashboard che scarica lo stesso file da Drive.
+
+Le combinazioni sono distribuite su un process pool; ogni worker apre lo
+snapshot Arrow (memory map) della stessa versione. Il bundle viene scritto in
+una cartella temporanea e rinominato alla fine, quindi la dashboard vede o il
+bundle completo o niente. Con ``--watch`` il batch resta attivo e ricostruisce
+il bundle a ogni nuova versione del workbook.
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.graph_objects as go
+
+from .columns import COL_PERIOD, COL_SERVICE, COL_STAKE, COL_STATO, COL_TICKET, COL_VENUE
+from .core import (
+    ASSIGNED, MOD_COORDINATION, NOT_ASSIGNED, STATUS_COLORS, VersionUnavailable, load_dataset, olympic_index,
+    shared_source,
+)
+from .cube import olympic_cube
+from .figures import ko_priority_bar, ko_ranking_bar, status_pie
+from .snapshot import CACHE_DIR, _prune, _slug
+from .sources import LocalFileSource
+
+REPORT_DIR = os.environ.get("RTCA_REPORT_DIR", ".rtca_reports")
+KEEP_BUNDLES = 2
+MANIFEST = "manifest.json"
+PERIODS = ["Olympic", "Paralympic"]
+ALL = "All"
+SUMMARY_COLUMNS = ["Period", "Stakeholder", "Ticket", "Rows", ASSIGNED, NOT_ASSIGNED, MOD_COORDINATION,
+                   "% NOT ASSIGNED"]
+
+
+# ----------------------------
+# Riepiloghi di una selezione (roll-up del cubo)
+# ----------------------------
+def status_figure(view):
+    """Ciambella ASSIGNED / NOT ASSIGNED / MoD, None senza righe."""
+    return status_pie(view.status_counts(), STATUS_COLORS, pull=True) if view.n_rows else None
+
+
+def stato_figure(view, stato=COL_STATO):
+    """Ciambella dello Stato dei NOT ASSIGNED, None se non ce ne sono (o manca la colonna)."""
+    counts = view.status_counts()
+    if not view.has(stato) or not counts.loc[counts['Status'] == NOT_ASSIGNED, 'Count'].sum():
+        return None
+    return status_pie(view.breakdown(stato))
+
+
+def status_figures(view, stato=COL_STATO):
+    """(ciambella ASSIGNED / NOT ASSIGNED / MoD, ciambella dello Stato dei NOT ASSIGNED); None dove non ci sono dati."""
+    if not view.n_rows:
+        return None, None
+    return status_figure(view), stato_figure(view, stato)
+
+
+def summary(view, stake=COL_STAKE):
+    """(figure, tabelle) dei riepiloghi di app.py per una ``CubeView``; due dict vuoti senza righe.
+
+    Figure: "status", "stato" (se ci sono Stato da mostrare), "ko_priority",
+    "ranking". Tabelle: "status", "ko_by_priority", "ranking".
+    """
+    if not view.n_rows:
+        return {}, {}
+    pie, stato_pie = status_figures(view)
+    ko_counts = view.ko_by_priority()
+    ranking = view.ko_ranking(stake)
+    figures = {"status": pie, "stato": stato_pie, "ko_priority": ko_priority_bar(ko_counts),
+               "ranking": ko_ranking_bar(ranking, stake)}
+    tables = {"status": view.status_counts(), "ko_by_priority": ko_counts,
+              "ranking": ranking.drop(columns="label_text")}
+    return {k: v for k, v in figures.items() if v is not None}, tables
+
+
+# ----------------------------
+# Combinazioni della sidebar
+# ----------------------------
+def rollup(cube, period, stake=ALL, ticket=ALL):
+    """Celle che la sidebar di app.py seleziona per (periodo, stakeholder, ticket) con servizi e venue di default."""
+    selection = {COL_PERIOD: [period], COL_STAKE: None if stake == ALL else [stake],
+                 COL_TICKET: None if ticket == ALL else [ticket]}
+    # Come i multiselect: servizi presenti nella selezione, poi venue presenti fra quei servizi
+    selection[COL_SERVICE] = cube.rollup(selection).options(COL_SERVICE)
+    selection[COL_VENUE] = cube.rollup(selection).options(COL_VENUE)
+    return cube.rollup(selection)
+
+
+def combinations(fidx, tickets=False):
+    """(periodo, stakeholder, ticket) come li offrono i selectbox di app.py, "All" compreso."""
+    out = []
+    for period in PERIODS:
+        rows_period = fidx.select(None, COL_PERIOD, [period])
+        for stake in [ALL] + fidx.options(rows_period, COL_STAKE):
+            out.append((period, stake, ALL))
+            if tickets:
+                rows_stake = rows_period if stake == ALL else fidx.select(rows_period, COL_STAKE, [stake])
+                out.extend((period, stake, t) for t in fidx.options(rows_stake, COL_TICKET))
+    return out
+
+
+def combo_key(period, stake, ticket):
+    return json.dumps([period, stake, ticket])
+
+
+def combo_file(period, stake, ticket):
+    """Nome di file stabile (stakeholder e ticket possono contenere caratteri qualsiasi)."""
+    return hashlib.sha1(combo_key(period, stake, ticket).encode()).hexdigest()[:16]
+
+
+# ----------------------------
+# Scrittura del bundle
+# ----------------------------
+def bundle_dir(digest, out=REPORT_DIR):
+    return os.path.join(out, _slug(digest))
+
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _write_json(path, figures, tables):
+    # to_json delle figure usa l'encoder di Plotly (numpy, date): qui si concatenano solo le stringhe
+    figs = ", ".join(f"{json.dumps(name)}: {fig.to_json()}" for name, fig in figures.items())
+    tabs = json.dumps({name: json.loads(df.to_json(orient="records")) for name, df in tables.items()})
+    _write_text(path, f'{{"figures": {{{figs}}}, "tables": {tabs}}}')
+
+
+def _write_html(path, title, figures, tables):
+    title = html.escape(title)
+    parts = [f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head><body>",
+             f"<h1>{title}</h1>"]
+    for i, fig in enumerate(figures.values()):
+        parts.append(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+    for name, df in tables.items():
+        parts.append(f"<h2>{name}</h2>" + df.to_html(index=False, border=0))
+    parts.append("</body></html>")
+    _write_text(path, "\n".join(parts))
+
+
+_worker = {}
+
+
+def _init_worker(path, version, cache_dir, target, write_html):
+    dataset = load_dataset(LocalFileSource(path), version, cache_dir)
+    _worker.update(cube=olympic_cube(dataset), target=target, html=write_html)
+
+
+def _render(combo):
+    """Scrive JSON (e HTML) di una combinazione nel bundle in costruzione; ritorna la riga del manifest."""
+    period, stake, ticket = combo
+    view = rollup(_worker["cube"], *combo)
+    figures, tables = summary(view)
+    name = combo_file(*combo)
+    _write_json(os.path.join(_worker["target"], name + ".json"), figures, tables)
+    if _worker["html"]:
+        _write_html(os.path.join(_worker["target"], name + ".html"), f"{period} · {stake} · {ticket}", figures, tables)
+    counts = dict(zip(tables["status"]["Status"], tables["status"]["Count"])) if tables else {}
+    return {"period": period, "stakeholder": stake, "ticket": ticket, "file": name, "rows": view.n_rows,
+            **{s: int(counts.get(s, 0)) for s in (ASSIGNED, NOT_ASSIGNED, MOD_COORDINATION)}}
+
+
+def build_bundle(source, version, out=REPORT_DIR, tickets=False, workers=None, write_html=True, cache_dir=CACHE_DIR):
+    """Calcola e pubblica il bundle di ``version``; ritorna il percorso e il numero di combinazioni."""
+    dataset = load_dataset(source, version, cache_dir)   # crea lo snapshot che i worker leggeranno
+    path, digest = source.version_path(version), source.content_digest(version)
+    if path is None or digest is None:
+        raise VersionUnavailable(version)
+    combos = combinations(olympic_index(dataset), tickets)
+    os.makedirs(out, exist_ok=True)
+    target = tempfile.mkdtemp(prefix=".building-", dir=out)
+    try:
+        init = (path, version, cache_dir, target, write_html)
+        if workers == 0:
+            _init_worker(*init)
+            entries = [_render(c) for c in combos]
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=init) as pool:
+                entries = list(pool.map(_render, combos, chunksize=max(1, len(combos) // 64)))
+
+        with open(os.path.join(target, "summary.csv"), "w", encoding="utf-8") as f:
+            f.write(",".join(SUMMARY_COLUMNS) + "\n")
+            for e in entries:
+                ko = e[NOT_ASSIGNED] / e["rows"] * 100 if e["rows"] else 0.0
+                cells = [e["period"], e["stakeholder"], e["ticket"], e["rows"], e[ASSIGNED], e[NOT_ASSIGNED],
+                         e[MOD_COORDINATION], round(ko, 1)]
+                f.write(",".join(json.dumps(c) if isinstance(c, str) else str(c) for c in cells) + "\n")
+        manifest = {"version": version, "digest": digest, "created": time.time(), "tickets": tickets, "html": write_html,
+                    "entries": {combo_key(e["period"], e["stakeholder"], e["ticket"]): e for e in entries}}
+        _write_text(os.path.join(target, MANIFEST), json.dumps(manifest))
+
+        final = bundle_dir(digest, out)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(target, final)
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+    _prune(out, KEEP_BUNDLES)
+    return final, len(entries)
+
+
+# ----------------------------
+# Lettura (dashboard)
+# ----------------------------
+def load_summary(digest, period, stake=ALL, ticket=ALL, out=REPORT_DIR):
+    """Figure pre-calcolate di una combinazione come {nome: go.Figure}, None se il bundle non la contiene.
+
+    ``digest`` e' lo sha256 del workbook (``DataSource.content_digest``).
+    """
+    folder = bundle_dir(digest, out)
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+            entry = json.load(f)["entries"].get(combo_key(period, stake, ticket))
+        if entry is None:
+            return None
+        with open(os.path.join(folder, entry["file"] + ".json"), encoding="utf-8") as f:
+            figures = json.load(f)["figures"]
+    except (OSError, ValueError, KeyError):
+        return None
+    return {name: go.Figure(spec) for name, spec in figures.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workbook", help="workbook locale (default: $RTCA_WORKBOOK, oppure Drive con --drive-id)")
+    parser.add_argument("--drive-id", help="file id Google Drive del workbook")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--tickets", action="store_true", help="anche ogni ticket di ogni stakeholder")
+    parser.add_argument("--workers", type=int, help="processi del pool (0 = nel processo corrente)")
+    parser.add_argument("--no-html", action="store_true")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="resta attivo e ricostruisce a ogni nuova versione")
+    args = parser.parse_args(argv)
+
+    if args.workbook:
+        source = LocalFileSource(args.workbook)
+    elif os.environ.get("RTCA_WORKBOOK") or args.drive_id:
+        source = shared_source("RTCA_WORKBOOK", args.drive_id, "frequenze.xlsx")
+    else:
+        parser.error("one of --workbook, $RTCA_WORKBOOK or --drive-id is required")
+
+    built = None
+    while True:
+        version = source.refresh()
+        if version != built:
+            t0 = time.perf_counter()
+            path, n = build_bundle(source, version, args.out, args.tickets, args.workers, not args.no_html)
+            print(f"{path}: {n:,} combinations in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+            built = version
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
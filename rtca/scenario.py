@@ -0,0 +1,266 @@
+"""Scenari what-if sulla versione caricata (vista Olympic): richieste rimosse, spostate o aggiunte.
+
+Uno scenario e' una lista di modifiche (dict semplici, da tenere in
+``st.session_state``) applicata sopra il dataset condiviso, che non viene mai
+toccato. ``apply_edits`` ritorna il delta rispetto al frame: posizioni
+rimosse e righe aggiunte (una richiesta spostata in frequenza e' rimossa e
+riaggiunta con la nuova frequenza), aggiornabile una modifica alla volta.
+Da li' si ricalcola solo cio' che cambia:
+
+- riepiloghi (ciambelle di stato, KO per priorita'): ``Cube.adjusted`` mette
+  nel cubo le celle delle righe rimosse (conteggio -1) e aggiunte (+1), quindi
+  un roll-up costa come sulla versione caricata;
+- occupazione: ``patch_occupancy`` ricalcola le sole venue toccate dal delta,
+  sulle loro righe.
+"""
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .columns import (
+    CENTER, COL_AO, COL_AQ, COL_BX, COL_PERIOD, COL_PNRF, COL_PRIORITY, COL_REQUEST, COL_SERVICE, COL_STAKE,
+    COL_STATO, COL_VENUE, POWER_DBM, REQ_ID, WIDTH_MHZ,
+)
+from .core import OLYMPIC_INDEX, chart_rows, olympic_frame, olympic_index
+from .cube import olympic_cube
+from .occupancy import occupancy
+
+REMOVE, RETUNE, ADD = "remove", "retune", "add"
+# Colonne delle righe aggiunte: quelle di cubo, selezione della sidebar e occupazione
+ROW_COLUMNS = OLYMPIC_INDEX + [COL_PRIORITY, COL_STATO, COL_PNRF, COL_REQUEST, COL_BX, COL_AO, COL_AQ,
+                               CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID]
+MATCH = {"period": COL_PERIOD, "stake": COL_STAKE, "venue": COL_VENUE, "priority": COL_PRIORITY}
+
+
+# ----------------------------
+# Modifiche
+# ----------------------------
+def remove(stake=None, venue=None, priority=None, period=None):
+    """Toglie le richieste con questi valori (None = qualsiasi); almeno un criterio."""
+    edit = {"op": REMOVE, "stake": stake, "venue": venue, "priority": priority, "period": period}
+    if all(edit[k] is None for k in MATCH):
+        raise ValueError("A removal needs at least one of stakeholder, venue, priority or period.")
+    return edit
+
+
+def retune(request, center_mhz):
+    """Sposta la richiesta ``request`` (tutte le sue righe) su ``center_mhz``: diventa ASSIGNED se non e' MoD."""
+    return {"op": RETUNE, "request": str(request), "center": float(center_mhz)}
+
+
+def add(request, venue, stake, service, period, priority, center_mhz, bandwidth_khz, power_w):
+    """Nuova richiesta assegnata a ``center_mhz``."""
+    return {"op": ADD, "request": str(request), "venue": venue, "stake": stake, "service": service,
+            "period": period, "priority": priority, "center": float(center_mhz),
+            "bandwidth": float(bandwidth_khz), "power": float(power_w)}
+
+
+def describe(edit):
+    if edit["op"] == REMOVE:
+        what = ", ".join(f"{k}={edit[k]}" for k in MATCH if edit[k] is not None)
+        return f"Remove requests with {what}"
+    if edit["op"] == RETUNE:
+        return f"Retune {edit['request']} to {edit['center']:g} MHz"
+    return (f"Add {edit['request']} at {edit['venue']} ({edit['stake']}, priority {edit['priority']}) "
+            f"on {edit['center']:g} MHz / {edit['bandwidth']:g} kHz")
+
+
+# ----------------------------
+# Delta rispetto alla versione caricata
+# ----------------------------
+class ScenarioDelta:
+    """Effetto di una lista di modifiche: righe del frame rimosse, righe aggiunte e venue toccate.
+
+    ``removed``: posizioni nel frame Olympic; ``added``: frame su ``ROW_COLUMNS``
+    con indice negativo (mai uguale a una posizione); ``venues``: come stringhe.
+    ``step`` / ``step_venues``: cosa cambia rispetto al delta da cui e' stato
+    ottenuto (``apply_edits(..., base=...)``), per ``scenario_cube`` e ``patch_occupancy``.
+    """
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self._removed = []       # posizioni rimosse, un array per modifica, senza ripetizioni
+        self._rows = []          # righe aggiunte, dict su ROW_COLUMNS
+        self._venues = set()
+        self._step = ([], [], [], set())   # dal delta di partenza: posizioni rimosse, righe tolte, aggiunte, venue
+        self.n_edits = 0
+
+    def _copy(self):
+        out = ScenarioDelta.__new__(ScenarioDelta)
+        out.n_rows, out._removed, out._rows = self.n_rows, list(self._removed), list(self._rows)
+        out._venues, out._step, out.n_edits = set(self._venues), ([], [], [], set()), self.n_edits
+        return out
+
+    def _taken(self):
+        return np.concatenate(self._removed) if self._removed else np.empty(0, dtype=np.intp)
+
+    @cached_property
+    def removed(self):
+        return np.sort(self._taken())
+
+    @cached_property
+    def added(self):
+        return _frame(self._rows)
+
+    @cached_property
+    def step(self):
+        """(posizioni rimosse, righe aggiunte tolte, righe aggiunte) rispetto al delta di partenza."""
+        removed, dropped, rows, _ = self._step
+        return (np.concatenate(removed) if removed else np.empty(0, dtype=np.intp), _frame(dropped), _frame(rows))
+
+    @property
+    def venues(self):
+        return frozenset(self._venues)
+
+    @property
+    def step_venues(self):
+        return frozenset(self._step[3])
+
+    def __bool__(self):
+        return bool(self._removed or self._rows)
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=ROW_COLUMNS, index=-1 - np.arange(len(rows))).infer_objects()
+
+
+def _request_positions(dataset):
+    # Request ID -> posizioni, costruito una volta per versione
+    return dataset.memo("request_positions", lambda ds: pd.Index(olympic_frame(ds)[REQ_ID]))
+
+
+def has_request(dataset, request):
+    """True se ``request`` e' un Request ID della versione caricata."""
+    return str(request) in _request_positions(dataset)
+
+
+def _text(value):
+    return None if value is None or pd.isna(value) else str(value)
+
+
+def _hits(row, edit):
+    """True se la rimozione ``edit`` colpisce la riga aggiunta ``row``; valori confrontati come stringhe."""
+    return all(edit[key] is None or _text(row[col]) == str(edit[key]) for key, col in MATCH.items())
+
+
+def _base_matches(df, fidx, edit):
+    """Posizioni del frame che una rimozione colpisce: colonne indicizzate dall'indice, priorita' sulle righe rimaste."""
+    rows = fidx.all_rows()
+    for key in ("period", "stake", "venue"):
+        if edit[key] is not None:
+            rows = fidx.select(rows, MATCH[key], [edit[key]])
+    if edit["priority"] is not None and len(rows):
+        priority = df[COL_PRIORITY].take(rows).astype(object)
+        rows = rows[(priority.notna() & (priority.astype(str) == str(edit["priority"]))).to_numpy()]
+    return rows
+
+
+def _new_row(edit):
+    power = edit["power"]
+    return {COL_REQUEST: edit["request"], REQ_ID: edit["request"], COL_VENUE: edit["venue"],
+            COL_STAKE: edit["stake"], COL_SERVICE: edit["service"], COL_PERIOD: edit["period"],
+            COL_PRIORITY: edit["priority"], COL_BX: edit["center"], CENTER: edit["center"],
+            COL_AO: edit["bandwidth"], WIDTH_MHZ: edit["bandwidth"] / 1000.0, COL_AQ: power,
+            POWER_DBM: 10 * np.log10(power * 1000) if power > 0 else np.nan}
+
+
+def apply_edits(dataset, edits, base=None):
+    """``ScenarioDelta`` delle modifiche, applicate in ordine sul frame Olympic di ``dataset``.
+
+    Con ``base`` (delta delle modifiche precedenti, che non viene toccato) si
+    applicano solo ``edits``: una modifica in piu' costa quanto lei sola.
+    """
+    df, fidx = olympic_frame(dataset), olympic_index(dataset)
+    delta = ScenarioDelta(len(df)) if base is None else base._copy()
+    venue_codes, venue_labels = fidx.codes(COL_VENUE)
+    columns = [c for c in ROW_COLUMNS if c in df.columns]
+    for edit in edits:
+        if edit["op"] == REMOVE:
+            pos = _base_matches(df, fidx, edit)
+            dropped = [row for row in delta._rows if _hits(row, edit)]
+            delta._rows = [row for row in delta._rows if not _hits(row, edit)]
+            rows = []
+        elif edit["op"] == RETUNE:
+            pos = _request_positions(dataset).get_indexer_for([edit["request"]])
+            pos = pos[pos >= 0]
+            dropped = [r for r in delta._rows if r[COL_REQUEST] == edit["request"]]
+            pos = pos[~np.isin(pos, delta._taken())]
+            # righe del frame e righe gia' aggiunte (copie: base intatto), spostate sul nuovo centro
+            rows = df[columns].take(pos).astype(object).to_dict("records") + [dict(r) for r in dropped]
+            for row in rows:
+                row[COL_BX] = row[CENTER] = edit["center"]
+            delta._rows = [r for r in delta._rows if r[COL_REQUEST] != edit["request"]] + rows
+        else:
+            pos, dropped, rows = np.empty(0, dtype=np.intp), [], [_new_row(edit)]
+            delta._rows.append(rows[0])
+        pos = pos[~np.isin(pos, delta._taken())] if len(pos) and delta._removed else pos
+        if len(pos):
+            delta._removed.append(pos)
+        delta._step[0].append(pos)
+        delta._step[1].extend(dropped)
+        delta._step[2].extend(rows)
+        codes = np.unique(venue_codes[pos])
+        touched = set(venue_labels[codes[codes >= 0]]) | {_text(row[COL_VENUE]) for row in dropped + rows}
+        touched.discard(None)
+        delta._venues |= touched
+        delta._step[3].update(touched)
+        delta.n_edits += 1
+    return delta
+
+
+# ----------------------------
+# Ricalcolo incrementale
+# ----------------------------
+def scenario_cube(dataset, delta, base=None):
+    """Cubo dei conteggi con il delta applicato (celle in piu', nessuna ricostruzione).
+
+    Con ``base`` (cubo del delta da cui ``delta`` e' stato ottenuto) si
+    aggiungono solo le celle di ``delta.step``: le righe aggiunte dalle
+    modifiche precedenti non vengono ricodificate.
+    """
+    if base is None:
+        return olympic_cube(dataset).adjusted(delta.removed, delta.added)
+    removed, dropped, added = delta.step
+    return base.adjusted(removed, added, dropped)
+
+
+def _selected(df, selection):
+    """Righe di ``df`` dentro la selezione della sidebar ({colonna: valori}), con le regole di ``FilterIndex.select``."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in selection.items():
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        allowed = {str(v) for v in values}
+        column = df[col].astype(object)
+        mask &= (column.notna() & column.astype(str).isin(allowed)).to_numpy()
+    return df[mask]
+
+
+def patch_occupancy(base, clean, delta, selection, cap_df, venue_col=COL_VENUE, venues=None):
+    """Occupazione della selezione nello scenario: ``base`` (``occupancy`` di ``clean``) con le sole venue toccate
+    ricalcolate sulle loro righe (senza le rimosse, con le aggiunte della selezione).
+
+    ``clean`` sono le righe disegnabili della selezione, con indice = posizione nel frame Olympic.
+    ``venues``: venue da ricalcolare, di default tutte quelle del delta; con ``base`` =
+    occupazione dello scenario del delta di partenza bastano ``delta.step_venues``.
+    """
+    if venues is None:
+        if not delta:
+            return base
+        venues = delta.venues
+    if not venues:
+        return base
+    # Solo le righe delle venue toccate e le colonne dell'occupazione (niente copie della selezione intera)
+    columns = [venue_col, CENTER, WIDTH_MHZ]
+    values = clean[venue_col]
+    touched = [v for v in values.dropna().unique() if str(v) in venues]
+    rows = clean.loc[values.isin(touched).to_numpy(), columns]
+    rows = rows[~np.isin(rows.index.to_numpy(), delta.removed)]
+    added = chart_rows(_selected(_selected(delta.added, selection), {venue_col: list(venues)}))
+    if len(added):
+        rows = pd.concat([rows, added[columns]])
+    fresh = occupancy(rows, cap_df, venue_col=venue_col)
+    return pd.concat([base[~base["Venue"].astype(str).isin(venues)], fresh]).sort_index()
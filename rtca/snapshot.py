@@ -0,0 +1,106 @@
+"""Snapshot colonnare (Arrow IPC) del workbook, una volta per versione dei dati.
+
+Il parse openpyxl di ``pd.read_excel`` e' lo step piu' lento: qui i fogli
+richiesti vengono letti in un'unica apertura del file e scritti come file
+Arrow IPC non compressi in ``<cache_dir>/<version>/``. Le sessioni successive
+(e gli altri processi) leggono il snapshot via memory map, senza toccare l'xlsx.
+Si usa il formato IPC/Feather e non Parquet perche' solo IPC non compresso
+permette letture zero-copy dalla memory map.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+CACHE_DIR = os.environ.get("RTCA_CACHE_DIR", ".rtca_cache")
+KEEP_VERSIONS = 3
+
+_lock = threading.Lock()
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(text)).strip("_")
+
+
+def snapshot_dir(version, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, _slug(version))
+
+
+def sheet_path(version, sheet, cache_dir=CACHE_DIR):
+    return os.path.join(snapshot_dir(version, cache_dir), _slug(sheet) + ".arrow")
+
+
+def _arrow_safe(df):
+    """Le colonne object con tipi misti (tipico di Excel) diventano stringhe, NaN esclusi."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _write_table(df, path):
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+    fd, tmp = tempfile.mkstemp(suffix=".arrow.tmp", dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _prune(cache_dir, keep):
+    try:
+        entries = [os.path.join(cache_dir, d) for d in os.listdir(cache_dir)]
+    except FileNotFoundError:
+        return
+    entries = sorted((d for d in entries if os.path.isdir(d)), key=os.path.getmtime, reverse=True)
+    for old in entries[keep:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def read_excel_sheets(xlsx_path, sheets):
+    return pd.read_excel(xlsx_path, sheet_name=list(sheets))
+
+
+def ensure_snapshot(xlsx_path, version, sheets, cache_dir=CACHE_DIR, reader=read_excel_sheets):
+    """Crea (se mancano) i file snapshot dei fogli ``sheets`` per ``version``.
+
+    I fogli mancanti vengono letti con una sola chiamata a ``reader(xlsx_path,
+    sheets) -> {sheet: DataFrame}``. Chi usa un reader diverso (proiezione,
+    dtype) deve usare anche un ``version`` diverso. La scrittura e' atomica
+    (file temporaneo + rename), quindi un lettore concorrente vede il file
+    completo o nessun file.
+    """
+    with _lock:
+        missing = [s for s in sheets if not os.path.exists(sheet_path(version, s, cache_dir))]
+        if not missing:
+            return snapshot_dir(version, cache_dir)
+        os.makedirs(snapshot_dir(version, cache_dir), exist_ok=True)
+        frames = reader(xlsx_path, missing)
+        for sheet in missing:
+            _write_table(frames[sheet], sheet_path(version, sheet, cache_dir))
+        _prune(cache_dir, KEEP_VERSIONS)
+        return snapshot_dir(version, cache_dir)
+
+
+def read_table(version, sheet, cache_dir=CACHE_DIR):
+    """Tabella Arrow del foglio, mappata in memoria (zero-copy per le colonne numeriche)."""
+    source = pa.memory_map(sheet_path(version, sheet, cache_dir), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def read_sheet(version, sheet, cache_dir=CACHE_DIR):
+    return read_table(version, sheet, cache_dir).to_pandas()
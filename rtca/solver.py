@@ -0,0 +1,138 @@
+"""Proposta automatica di frequenze per le richieste NOT ASSIGNED.
+
+Lo spettro di ogni venue e' un array booleano su una griglia di ``res_khz``
+kHz che copre i range di Capacity NP-OLY della venue: una cella e' bloccata
+se fuori dai range o gia' occupata da un canale assegnato. Le richieste
+vengono servite in ordine di priorita' (1 prima); per ognuna si provano in un
+colpo solo tutti i centri del tuning range sul suo tuning step, con una
+somma cumulativa delle celle bloccate, e si prende il primo canale libero.
+"""
+import numpy as np
+import pandas as pd
+
+from .columns import (
+    CAP_FROM, CAP_TO, CAP_VENUE, CENTER, COL_AO, COL_PRIORITY, COL_REQUEST, COL_STAKE, COL_TUNE_FROM,
+    COL_TUNE_STEP, COL_TUNE_TO, COL_VENUE, POWER_DBM, WIDTH_MHZ,
+)
+from .core import not_assigned
+
+RES_KHZ = 6.25
+EPS = 1e-6
+
+PROPOSED, NO_FIT, INVALID = "PROPOSED", "NO FIT", "INVALID"
+PLAN_COLUMNS = ["Request ID", "Venue Code", "Stakeholder", "Priority", "Proposed Frequency (MHz)",
+                "Channel Bandwidth (kHz)", "Result", "Reason"]
+
+
+class VenueSpectrum:
+    """Griglia booleana delle celle bloccate di una venue."""
+
+    def __init__(self, ranges, res_khz=RES_KHZ):
+        self.res = res_khz / 1000.0
+        ranges = [(float(a), float(b)) for a, b in ranges if np.isfinite(a) and np.isfinite(b) and b > a]
+        self.base = min(a for a, _ in ranges)
+        top = max(b for _, b in ranges)
+        self.blocked = np.ones(int(np.ceil((top - self.base) / self.res - EPS)), dtype=bool)
+        for a, b in ranges:
+            lo, hi = self.cells(a, b)
+            self.blocked[max(lo, 0):hi] = False
+
+    def cells(self, left, right):
+        """Celle [lo, hi) toccate dall'intervallo [left, right] (arrotondamento conservativo)."""
+        lo = np.floor((np.asarray(left) - self.base) / self.res + EPS).astype(np.int64)
+        hi = np.ceil((np.asarray(right) - self.base) / self.res - EPS).astype(np.int64)
+        return lo, hi
+
+    def occupy(self, left, right):
+        lo, hi = self.cells(left, right)
+        for a, b in zip(np.atleast_1d(lo), np.atleast_1d(hi)):
+            self.blocked[max(a, 0):max(min(b, len(self.blocked)), 0)] = True
+
+    def first_free(self, centers, half):
+        """Primo centro fra ``centers`` il cui canale [c - half, c + half] e' tutto libero, o None."""
+        lo, hi = self.cells(centers - half, centers + half)
+        ok = (lo >= 0) & (hi <= len(self.blocked)) & (hi > lo)
+        if not ok.any():
+            return None
+        lo, hi = lo[ok], hi[ok]
+        start, stop = lo.min(), hi.max()
+        cum = np.concatenate(([0], np.cumsum(self.blocked[start:stop])))
+        free = np.flatnonzero(cum[hi - start] == cum[lo - start])
+        return float(centers[ok][free[0]]) if len(free) else None
+
+
+def _numeric(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+
+def plan(df, cap_df, guard_khz=0.0, res_khz=RES_KHZ):
+    """Propone una frequenza per ogni richiesta NOT ASSIGNED di ``df`` (un periodo, tutte le venue).
+
+    ``df`` deve contenere anche i canali gia' assegnati (center / width_mhz),
+    che occupano lo spettro. Ritorna un DataFrame con PLAN_COLUMNS piu'
+    center / width_mhz / power_dBm per il layer sul grafico.
+    """
+    assigned = df[np.isfinite(pd.to_numeric(df[CENTER], errors="coerce"))]
+    todo = not_assigned(df)
+    guard = guard_khz / 1000.0
+
+    spectra = {}
+    for venue, grp in cap_df.groupby(CAP_VENUE, sort=False):
+        ranges = list(zip(grp[CAP_FROM].astype(float), grp[CAP_TO].astype(float)))
+        if any(b > a for a, b in ranges):
+            spectra[str(venue)] = VenueSpectrum(ranges, res_khz)
+    occupied = assigned[assigned[WIDTH_MHZ].notna()]
+    for venue, grp in occupied.groupby(occupied[COL_VENUE].astype(str), sort=False):
+        if venue in spectra:
+            spectra[venue].occupy(grp[CENTER] - grp[WIDTH_MHZ] / 2, grp[CENTER] + grp[WIDTH_MHZ] / 2)
+
+    priority = pd.to_numeric(todo[COL_PRIORITY], errors="coerce") if COL_PRIORITY in todo.columns \
+        else pd.Series(np.nan, index=todo.index)
+    todo = todo.assign(_prio=priority.fillna(np.inf).to_numpy()).sort_values(["_prio", COL_REQUEST], kind="stable")
+
+    venue = todo[COL_VENUE].astype(str).to_numpy()
+    t_from = _numeric(todo, COL_TUNE_FROM)
+    t_to = _numeric(todo, COL_TUNE_TO)
+    step = _numeric(todo, COL_TUNE_STEP) / 1000.0
+    bw = _numeric(todo, COL_AO) / 1000.0
+
+    proposed = np.full(len(todo), np.nan)
+    result = np.full(len(todo), NO_FIT, dtype=object)
+    reason = np.full(len(todo), "", dtype=object)
+    for n in range(len(todo)):
+        spec = spectra.get(venue[n])
+        if spec is None:
+            result[n], reason[n] = INVALID, "No capacity range for venue"
+            continue
+        if not (np.isfinite(t_from[n]) and np.isfinite(t_to[n]) and t_to[n] >= t_from[n]):
+            result[n], reason[n] = INVALID, "Missing tuning range"
+            continue
+        if not (np.isfinite(bw[n]) and bw[n] > 0):
+            result[n], reason[n] = INVALID, "Missing channel bandwidth"
+            continue
+        s = step[n] if np.isfinite(step[n]) and step[n] > 0 else spec.res
+        centers = t_from[n] + np.arange(int(np.floor((t_to[n] - t_from[n]) / s + EPS)) + 1) * s
+        half = bw[n] / 2 + guard
+        f = spec.first_free(centers, half)
+        if f is None:
+            reason[n] = "No free channel in tuning range"
+            continue
+        spec.occupy(f - half, f + half)
+        proposed[n], result[n] = round(f, 6), PROPOSED
+
+    out = pd.DataFrame({
+        "Request ID": todo[COL_REQUEST].to_numpy(dtype=object),
+        "Venue Code": todo[COL_VENUE].to_numpy(dtype=object),
+        "Stakeholder": todo[COL_STAKE].to_numpy(dtype=object) if COL_STAKE in todo.columns else None,
+        "Priority": priority.loc[todo.index].to_numpy(),
+        "Proposed Frequency (MHz)": proposed,
+        "Channel Bandwidth (kHz)": bw * 1000,
+        "Result": result,
+        "Reason": reason,
+        CENTER: proposed,
+        WIDTH_MHZ: bw,
+        POWER_DBM: _numeric(todo, POWER_DBM),
+    })
+    return out
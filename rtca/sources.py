@@ -0,0 +1,152 @@
+"""Sorgenti del workbook con rilevamento delle modifiche.
+
+Ogni sorgente espone ``refresh()``, che ritorna un *version token*: la stringa
+cambia solo quando cambia il contenuto del file, quindi le cache a valle
+(parse, normalizzazione, figure) possono usarla come chiave e saltare del
+tutto il lavoro quando il workbook non e' cambiato.
+"""
+import os
+import threading
+
+from .downloads import DOWNLOAD_DIR, DownloadCache, file_digest
+
+
+class DataSource:
+    """Interfaccia comune: ``path`` e' il file locale da leggere, ``refresh()`` il token di versione."""
+
+    name = "source"
+    hashed = True   # il token deriva dallo sha256 del contenuto
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._digest = None
+
+    @property
+    def path(self):
+        raise NotImplementedError
+
+    @property
+    def key(self):
+        """Identita' del workbook (stessa chiave = stesso file), per le cache di processo."""
+        raise NotImplementedError
+
+    def refresh(self):
+        raise NotImplementedError
+
+    def version_path(self, version):
+        """File con il contenuto di ``version`` se c'e' ancora, altrimenti None."""
+        raise NotImplementedError
+
+    def content_digest(self, version):
+        """sha256 del file di ``version``, senza il nome della sorgente: lo stesso workbook ha lo
+        stesso digest scaricato da Drive o letto da disco. None se il file non c'e' piu'."""
+        with self._lock:
+            if self.hashed and version == self.version:
+                return self._digest
+        path = self.version_path(version)
+        return None if path is None else file_digest(path)
+
+    @property
+    def version(self):
+        """Ultimo token noto (None se refresh() non e' mai stato chiamato)."""
+        return None if self._digest is None else f"{self.name}:{self._digest[:16]}"
+
+
+class LocalFileSource(DataSource):
+    """Workbook su disco (es. uno share montato).
+
+    La stat (size, mtime) e' il controllo economico: l'hash del contenuto viene
+    ricalcolato solo quando la stat cambia. Con ``hash_content=False`` il token
+    deriva solo da size e mtime.
+    """
+
+    name = "local"
+
+    def __init__(self, path, hash_content=True):
+        super().__init__()
+        self._path = os.fspath(path)
+        self.hash_content = self.hashed = hash_content
+        self._stat = None
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def key(self):
+        return (self.name, os.path.abspath(self._path))
+
+    def refresh(self):
+        with self._lock:
+            st = os.stat(self._path)
+            sig = (st.st_size, st.st_mtime_ns)
+            if sig != self._stat:
+                self._digest = file_digest(self._path) if self.hash_content else f"{sig[0]:x}{sig[1]:x}"
+                self._stat = sig
+            return self.version
+
+    def version_path(self, version):
+        # il file e' sempre lo stesso: vale solo finche' il contenuto non cambia
+        try:
+            return self._path if self.refresh() == version else None
+        except OSError:
+            return None
+
+
+class DriveSource(DataSource):
+    """Workbook su Google Drive scaricato con gdown.
+
+    Drive non espone un ETag affidabile per i download pubblici: ogni refresh
+    scarica il file nella ``DownloadCache`` della sorgente (per hash del
+    contenuto, lock fra processi, single-flight) e ``path`` punta al file di
+    quel contenuto, che non viene mai riscritto. Se l'hash non cambia il token
+    (e quindi il parse) resta fermo.
+    """
+
+    name = "drive"
+
+    def __init__(self, file_id, download_dir=DOWNLOAD_DIR, suffix=".xlsx"):
+        super().__init__()
+        self.file_id = file_id
+        self.cache = DownloadCache(f"{self.name}_{file_id}", download_dir, suffix)
+        self._path = None
+        self._paths = {}   # versione -> file nella cache dei download, finche' il file esiste
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def key(self):
+        return (self.name, self.file_id)
+
+    @property
+    def url(self):
+        return f"https://drive.google.com/uc?id={self.file_id}"
+
+    def _download(self, path):
+        import gdown
+
+        if gdown.download(self.url, path, quiet=True) is None:
+            raise ConnectionError(f"Drive download failed for {self.file_id}")
+
+    def refresh(self):
+        path, digest = self.cache.fetch(self._download)
+        with self._lock:
+            self._path, self._digest = path, digest
+            self._paths = {v: p for v, p in self._paths.items() if os.path.exists(p)}
+            self._paths[self.version] = path
+            return self.version
+
+    def version_path(self, version):
+        with self._lock:
+            path = self._paths.get(version)
+        return path if path is not None and os.path.exists(path) else None
+
+
+def source_from_env(env_var, file_id, output_file):
+    """LocalFileSource se ``env_var`` punta a un file, altrimenti DriveSource (estensione da ``output_file``)."""
+    local = os.environ.get(env_var)
+    if local:
+        return LocalFileSource(local)
+    return DriveSource(file_id, suffix=os.path.splitext(output_file)[1] or ".xlsx")
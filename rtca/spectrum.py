@@ -0,0 +1,155 @@
+"""Tracce dello spettro con livello di dettaglio.
+
+I canali vengono raggruppati (per stakeholder) in una sola passata: un
+argsort sui codici di gruppo invece di una maschera booleana per gruppo.
+Se nel range visibile ci sono piu' di ``max_bars`` canali, le barre vengono
+aggregate in bin di frequenza (potenza massima e numero di canali per bin);
+altrimenti si disegna ogni canale.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from .columns import CENTER, POWER_DBM, REQ_ID, WIDTH_MHZ
+
+MAX_BARS = 5000
+N_BINS = 200
+UNKNOWN = "Unknown"
+
+HOVER_CHANNEL = ('Request ID: %{customdata[0]}<br>Freq: %{x} MHz<br>Bandwidth: %{customdata[1]} kHz'
+                 '<br>Power: %{y:.1f} dBm<extra></extra>')
+
+
+def hover_bin(bin_w):
+    return ('%{customdata} channels<br>Bin: %{x:.3f} MHz ± ' + f'{bin_w / 2:.3f}'
+            + '<br>Max power: %{y:.1f} dBm<extra>%{fullData.name}</extra>')
+
+
+def group_codes(keys):
+    """(codici per riga, etichette ordinate): i NaN diventano "Unknown"."""
+    keys = pd.Series(keys).astype(object)
+    labels = keys.where(keys.notna(), UNKNOWN).astype(str)
+    codes, uniques = pd.factorize(labels, sort=True)
+    return codes, list(uniques)
+
+
+def group_slices(codes):
+    """Posizioni ordinate per gruppo e offsets: il gruppo g e' order[offsets[g]:offsets[g+1]]."""
+    order = np.argsort(codes, kind="stable")
+    offsets = np.searchsorted(codes[order], np.arange(codes.max() + 2 if len(codes) else 1))
+    return order, offsets
+
+
+def spectrum_traces(data, color_by, bw_col, x_range=None, max_bars=MAX_BARS, n_bins=N_BINS,
+                    opacity=0.8, palette=None):
+    """Tracce go.Bar per ``data`` (con center / width_mhz / power_dBm / req_id).
+
+    Ritorna (traces, info) con info = {"mode": "channels"|"binned", "bars", "rows"}.
+    I colori dipendono dal gruppo nell'intero ``data``, quindi restano stabili
+    quando si cambia ``x_range``.
+    """
+    palette = palette or px.colors.qualitative.Dark24
+    if color_by in data.columns:
+        codes, labels = group_codes(data[color_by])
+    else:
+        codes, labels = np.zeros(len(data), dtype=np.intp), ["Assignments"]
+
+    center = data[CENTER].to_numpy(dtype=float)
+    width = data[WIDTH_MHZ].to_numpy(dtype=float)
+    power = data[POWER_DBM].to_numpy(dtype=float)
+    # Le righe senza frequenza (NOT ASSIGNED) non hanno una barra
+    drawable = np.isfinite(center) & np.isfinite(width)
+    if x_range is not None:
+        lo, hi = x_range
+        drawable &= (center + width / 2 >= lo) & (center - width / 2 <= hi)
+    visible = np.flatnonzero(drawable)
+
+    traces = []
+    if len(visible) <= max_bars:
+        req = data[REQ_ID].to_numpy(dtype=object)
+        bw = data[bw_col].to_numpy(dtype=object) if bw_col in data.columns else np.full(len(data), None)
+        order, offsets = group_slices(codes[visible])
+        for g, label in enumerate(labels):
+            rows = visible[order[offsets[g]:offsets[g + 1]]] if g + 1 < len(offsets) else visible[:0]
+            if not len(rows):
+                continue
+            traces.append(go.Bar(
+                x=center[rows], y=power[rows], width=width[rows], name=label,
+                marker_color=palette[g % len(palette)], opacity=opacity,
+                marker_line_color='white', marker_line_width=1,
+                customdata=np.column_stack((req[rows], bw[rows])),
+                hovertemplate=HOVER_CHANNEL,
+            ))
+        return traces, {"mode": "channels", "bars": int(len(visible)), "rows": int(len(visible))}
+
+    lo, hi = x_range if x_range is not None else (float(np.nanmin(center[visible] - width[visible] / 2)),
+                                                   float(np.nanmax(center[visible] + width[visible] / 2)))
+    bin_w = (hi - lo) / n_bins if hi > lo else 1.0
+    bins = np.clip(((center[visible] - lo) // bin_w).astype(np.int64), 0, n_bins - 1)
+    key = codes[visible].astype(np.int64) * n_bins + bins
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    max_power = np.fmax.reduceat(power[visible][order], starts)
+    counts = np.diff(np.r_[starts, len(key)])
+    group, b = key[starts] // n_bins, key[starts] % n_bins
+    bin_lo = lo + b * bin_w
+    order, offsets = group_slices(group)
+    for g, label in enumerate(labels):
+        sel = order[offsets[g]:offsets[g + 1]] if g + 1 < len(offsets) else order[:0]
+        if not len(sel):
+            continue
+        traces.append(go.Bar(
+            x=np.round(bin_lo[sel] + bin_w / 2, 6), y=np.round(max_power[sel], 2), width=bin_w, name=label,
+            marker_color=palette[g % len(palette)], opacity=opacity,
+            marker_line_width=0,
+            customdata=counts[sel],
+            hovertemplate=hover_bin(bin_w),
+        ))
+    return traces, {"mode": "binned", "bars": int(len(starts)), "rows": int(len(visible))}
+
+
+def payload_kb(fig):
+    """Dimensione (kB) del JSON della figura, cioe' di quello che va al browser."""
+    return len(fig.to_json()) / 1024
+
+
+def conflict_trace(conflicts, x_range=None, max_bars=MAX_BARS):
+    """Layer rosso con le sovrapposizioni co-canale (output di conflicts.find_conflicts)."""
+    lo_all = conflicts["overlap_from"].to_numpy(dtype=float)
+    hi_all = conflicts["overlap_to"].to_numpy(dtype=float)
+    keep = np.ones(len(conflicts), dtype=bool)
+    if x_range is not None:
+        keep = (hi_all >= x_range[0]) & (lo_all <= x_range[1])
+    rows = np.flatnonzero(keep)[:max_bars]
+    lo, hi = lo_all[rows], hi_all[rows]
+    return go.Bar(
+        x=(lo + hi) / 2, y=conflicts["power_dBm"].to_numpy(dtype=float)[rows], width=hi - lo,
+        name=f"Conflicts ({len(conflicts):,})", marker_color='rgba(255,0,0,0.55)',
+        marker_line_color='red', marker_line_width=2,
+        customdata=np.column_stack((conflicts["Request ID A"].to_numpy(dtype=object)[rows],
+                                    conflicts["Request ID B"].to_numpy(dtype=object)[rows],
+                                    conflicts["Overlap (kHz)"].to_numpy()[rows])),
+        hovertemplate=('Conflict %{customdata[0]} / %{customdata[1]}<br>Overlap: %{customdata[2]} kHz'
+                       '<extra></extra>'),
+    )
+
+
+def proposal_trace(proposals, x_range=None, max_bars=MAX_BARS):
+    """Layer tratteggiato con le frequenze proposte dal solver (righe PROPOSED di solver.plan)."""
+    center_all = proposals["center"].to_numpy(dtype=float)
+    half_all = proposals["width_mhz"].to_numpy(dtype=float) / 2
+    keep = np.isfinite(center_all)
+    if x_range is not None:
+        keep &= (center_all + half_all >= x_range[0]) & (center_all - half_all <= x_range[1])
+    rows = np.flatnonzero(keep)[:max_bars]
+    return go.Bar(
+        x=center_all[rows], y=proposals["power_dBm"].to_numpy(dtype=float)[rows], width=2 * half_all[rows],
+        name=f"Proposals ({int(np.isfinite(center_all).sum()):,})", marker_color='rgba(46,204,113,0.25)',
+        marker_line_color='#2ECC71', marker_line_width=2, marker_pattern_shape='/',
+        customdata=np.column_stack((proposals["Request ID"].to_numpy(dtype=object)[rows],
+                                    proposals["Channel Bandwidth (kHz)"].to_numpy()[rows])),
+        hovertemplate=('Proposed %{customdata[0]}<br>Freq: %{x:.5f} MHz<br>BW: %{customdata[1]} kHz'
+                       '<extra></extra>'),
+    )
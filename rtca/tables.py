@@ -0,0 +1,112 @@
+"""Tabelle paginate lato server ed export generati su richiesta, a blocchi.
+
+``page_view`` filtra (testo contenuto in una colonna), ordina e taglia la
+pagina lavorando su array di posizioni: si materializzano solo le righe
+della pagina, che sono le sole mandate al browser da ``st.dataframe``.
+
+Gli export (CSV, Parquet, xlsx in write-only) vengono scritti a blocchi di
+``CHUNK_ROWS`` righe in un file temporaneo (in memoria fino a
+``SPOOL_BYTES``, poi su disco), senza la stringa intera del CSV ne' copie
+del frame per formato. ``export_bytes`` va passato (in una lambda) a
+``st.download_button``, che lo esegue solo al clic: finche' nessuno scarica,
+l'export non costa niente. Il risultato finale e' comunque un ``bytes``,
+perche' st.download_button accetta bytes o file in memoria, non flussi.
+"""
+import math
+import tempfile
+
+import numpy as np
+
+PAGE_SIZES = [50, 100, 500]
+CHUNK_ROWS = 20_000
+SPOOL_BYTES = 8 * 2**20
+
+EXPORTS = {   # formato -> (estensione, MIME)
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _sorted(values, ascending):
+    """Posizioni che ordinano ``values`` (nulli in fondo, ordinamento stabile); tipi misti come testo."""
+    values = values.reset_index(drop=True)
+    try:
+        return values.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+    except TypeError:
+        text = values.astype(object).where(values.isna(), values.astype(str))
+        return text.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+
+
+def view_rows(df, rows=None, sort_by=None, ascending=True, column=None, contains=None):
+    """Posizioni in ``df`` delle righe che passano il filtro, nell'ordine richiesto.
+
+    ``rows`` limita alle posizioni date (es. la selezione della sidebar);
+    ``contains`` cerca il testo (senza maiuscole/minuscole) nella colonna ``column``.
+    """
+    pos = np.arange(len(df)) if rows is None else np.asarray(rows)
+    if contains and column in df.columns:
+        values = df[column].take(pos)
+        hit = values.notna() & values.astype(str).str.contains(contains, case=False, regex=False)
+        pos = pos[hit.to_numpy(dtype=bool)]
+    if sort_by in df.columns and len(pos) > 1:
+        pos = pos[_sorted(df[sort_by].take(pos), ascending)]
+    return pos
+
+
+def page_view(df, page=1, page_size=PAGE_SIZES[1], rows=None, **view):
+    """(righe della pagina, posizioni di tutte le righe della vista, numero di pagine, pagina effettiva).
+
+    ``view``: argomenti di ``view_rows``; la pagina viene riportata nell'intervallo valido.
+    """
+    pos = view_rows(df, rows, **view)
+    pages = max(1, math.ceil(len(pos) / page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return df.take(pos[start:start + page_size]), pos, pages, page
+
+
+def _chunks(df, rows=CHUNK_ROWS):
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows]
+
+
+def write_csv(df, sink, rows=CHUNK_ROWS):
+    for i, chunk in enumerate(_chunks(df, rows)):
+        sink.write(chunk.to_csv(index=False, header=i == 0).encode("utf-8"))
+    if not len(df):
+        sink.write(df.to_csv(index=False).encode("utf-8"))
+
+
+def write_parquet(df, sink, rows=CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _chunks(df, rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def write_xlsx(df, sink, rows=CHUNK_ROWS, sheet="Data"):
+    from openpyxl import Workbook
+
+    book = Workbook(write_only=True)   # righe scritte in streaming, niente celle in memoria
+    ws = book.create_sheet(sheet)
+    ws.append([str(c) for c in df.columns])
+    for chunk in _chunks(df, rows):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+    book.save(sink)
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "Excel": write_xlsx}
+
+
+def export_bytes(df, fmt):
+    """``df`` nel formato ``fmt``: scritto a blocchi in un file temporaneo, letto una volta alla fine."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as sink:
+        WRITERS[fmt](df, sink)
+        sink.seek(0)
+        return sink.read()
@@ -0,0 +1,137 @@
+"""Tempi per fase delle dashboard, con righe e byte, ed export per il monitoraggio.
+
+Le fasi sono nominate per punti: ``download`` / ``parse`` / ``normalize`` /
+``index`` (per versione dei dati, nel processo), ``figure.<grafico>`` e
+``serialize.<grafico>`` (miss della cache delle figure), per rerun
+``app.*`` / ``lan.*`` (filtri, rendering dei grafici, rerun intero), una
+volta per processo ``*.imports`` / ``*.first_render`` (avvio a freddo) e
+``warmup.*`` (rtca.warmup).
+
+Il registro e' unico nel processo: per ogni fase tiene gli ultimi
+``WINDOW`` campioni (ultimo valore e percentili) e i totali cumulativi.
+Due export per seguire i tempi lungo un evento:
+
+- ``RTCA_METRICS_LOG=/path/timings.jsonl``: un oggetto JSON per campione, in append;
+- ``RTCA_METRICS_PROM=/path/rtca.prom``: testo Prometheus riscritto (atomico)
+  al massimo ogni ``PROM_INTERVAL`` secondi, per il textfile collector di
+  node_exporter. ``prometheus()`` e ``jsonl()`` danno gli stessi testi a richiesta.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = int(os.environ.get("RTCA_TIMING_WINDOW", "512"))
+PROM_INTERVAL = 15.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(ordered, q):
+    """Percentile nearest-rank su una lista ordinata."""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Timings:
+    """Registro thread-safe dei campioni per fase: (istante, secondi, righe, byte)."""
+
+    def __init__(self, window=WINDOW, log_path=None, prom_path=None):
+        self.window = window
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self._lock = threading.Lock()
+        self._samples = {}   # fase -> deque di campioni
+        self._totals = {}    # fase -> [conteggio, secondi]
+        self._prom_written = 0.0
+
+    def record(self, name, seconds, rows=None, nbytes=None):
+        sample = (time.time(), seconds, rows, nbytes)
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(sample)
+            total = self._totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += seconds
+            write_prom = self.prom_path and sample[0] - self._prom_written >= PROM_INTERVAL
+            if write_prom:
+                self._prom_written = sample[0]
+        if self.log_path:
+            line = json.dumps(self._sample_dict(name, sample)) + "\n"
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        if write_prom:
+            tmp = f"{self.prom_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, self.prom_path)
+
+    def record_once(self, name, seconds, rows=None, nbytes=None):
+        """Come ``record``, ma solo se la fase non ha ancora campioni nel processo (import, primo render)."""
+        with self._lock:
+            if name in self._totals:
+                return False
+        self.record(name, seconds, rows, nbytes)
+        return True
+
+    @contextmanager
+    def stage(self, name, rows=None, nbytes=None):
+        """Misura il blocco; righe e byte si possono fissare dentro il blocco (``s["rows"] = ...``)."""
+        info = {"rows": rows, "bytes": nbytes}
+        t0 = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(name, time.perf_counter() - t0, info["rows"], info["bytes"])
+
+    @staticmethod
+    def _sample_dict(name, sample):
+        ts, seconds, rows, nbytes = sample
+        return {"ts": round(ts, 3), "stage": name, "seconds": round(seconds, 6), "rows": rows, "bytes": nbytes}
+
+    def summary(self):
+        """Una riga per fase: campioni, ultimo valore e percentili (ms) sulla finestra, righe e byte dell'ultimo."""
+        with self._lock:
+            items = [(name, list(samples), self._totals[name][0]) for name, samples in sorted(self._samples.items())]
+        out = []
+        for name, samples, count in items:
+            ordered = sorted(s[1] for s in samples)
+            _, last, rows, nbytes = samples[-1]
+            out.append({"stage": name, "count": count, "last_ms": last * 1000,
+                        **{f"p{int(q * 100)}_ms": _quantile(ordered, q) * 1000 for q in QUANTILES},
+                        "max_ms": ordered[-1] * 1000, "rows": rows, "bytes": nbytes})
+        return out
+
+    def prometheus(self):
+        """Testo di esposizione Prometheus: summary dei secondi per fase, gauge di righe e byte dell'ultimo campione."""
+        lines = ["# HELP rtca_stage_seconds Duration of a dashboard stage.", "# TYPE rtca_stage_seconds summary"]
+        gauges = {"rows": [], "bytes": []}
+        with self._lock:
+            items = [(name, sorted(s[1] for s in samples), samples[-1], tuple(self._totals[name]))
+                     for name, samples in sorted(self._samples.items())]
+        for name, ordered, last, (count, total) in items:
+            label = f'stage="{name}"'
+            lines += [f'rtca_stage_seconds{{{label},quantile="{q}"}} {_quantile(ordered, q):.6f}' for q in QUANTILES]
+            lines += [f"rtca_stage_seconds_sum{{{label}}} {total:.6f}", f"rtca_stage_seconds_count{{{label}}} {count}"]
+            for key, value in (("rows", last[2]), ("bytes", last[3])):
+                if value is not None:
+                    gauges[key].append(f"rtca_stage_{key}{{{label}}} {value}")
+        for key, values in gauges.items():
+            if values:
+                lines += [f"# HELP rtca_stage_{key} {key.capitalize()} handled by the last run of a stage.",
+                          f"# TYPE rtca_stage_{key} gauge", *values]
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self):
+        """I campioni della finestra come JSON lines, in ordine di tempo."""
+        with self._lock:
+            samples = [(name, s) for name, dq in self._samples.items() for s in dq]
+        samples.sort(key=lambda item: item[1][0])
+        return "".join(json.dumps(self._sample_dict(name, s)) + "\n" for name, s in samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+timings = Timings(log_path=os.environ.get("RTCA_METRICS_LOG"), prom_path=os.environ.get("RTCA_METRICS_PROM"))
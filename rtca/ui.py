@@ -0,0 +1,50 @@
+"""Widget Streamlit condivisi da app.py e app_LAN.py (il resto di rtca non importa Streamlit).
+
+``paged_table`` e' la tabella paginata lato server di ``rtca.tables``:
+controlli di ordinamento, ricerca e pagina, la sola pagina visibile a
+``st.dataframe`` e gli export della vista generati solo al clic. I testi
+mostrati sotto la tabella vengono da ``labels`` (``LABELS_EN`` per app.py,
+``LABELS_IT`` per app_LAN.py).
+"""
+import streamlit as st
+
+from .tables import EXPORTS, PAGE_SIZES, export_bytes, page_view
+
+LABELS_EN = {
+    "rows": "Rows {first:,}–{last:,} of {total:,} · page {page} of {pages}",
+    "empty": "No rows match the search.",
+    "export": "⬇️ {fmt}",
+}
+LABELS_IT = {
+    "rows": "Righe {first:,}–{last:,} di {total:,} · pagina {page} di {pages}",
+    "empty": "Nessuna riga contiene il testo cercato.",
+    "export": "⬇️ Scarica {fmt}",
+}
+
+
+def paged_table(df, key, file_name, rows=None, labels=LABELS_EN):
+    """Tabella una pagina alla volta: ordinamento e filtro lato server, export generati solo al clic.
+
+    ``rows`` limita alle posizioni date (es. la selezione della sidebar);
+    ``key`` prefissa le chiavi dei widget, ``file_name`` e' il nome degli export senza estensione.
+    """
+    columns = [str(c) for c in df.columns]
+    c1, c2, c3, c4, c5, c6 = st.columns([3, 1, 3, 3, 1, 1])
+    sort_by = c1.selectbox("Sort by", ["(none)"] + columns, key=f"{key}_sort")
+    descending = c2.toggle("Desc", key=f"{key}_desc")
+    column = c3.selectbox("Search in", columns, key=f"{key}_column")
+    contains = c4.text_input("Contains", key=f"{key}_contains")
+    page_size = c5.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_size")
+    page = c6.number_input("Page", min_value=1, step=1, key=f"{key}_page")
+    page_rows, pos, pages, page = page_view(df, page, page_size, rows=rows,
+                                            sort_by=None if sort_by == "(none)" else sort_by,
+                                            ascending=not descending, column=column, contains=contains)
+    st.dataframe(page_rows, use_container_width=True, hide_index=True)
+    start = (page - 1) * page_size
+    st.caption(labels["rows"].format(first=start + 1, last=start + len(page_rows), total=len(pos), page=page,
+                                     pages=pages) if len(pos) else labels["empty"])
+    # Export della vista (filtro e ordinamento compresi), costruito solo se qualcuno scarica
+    for col, (fmt, (ext, mime)) in zip(st.columns(len(EXPORTS)), EXPORTS.items()):
+        col.download_button(labels["export"].format(fmt=fmt), lambda fmt=fmt: export_bytes(df.take(pos), fmt),
+                            f"{file_name}.{ext}", mime, key=f"{key}_export_{ext}", on_click="ignore",
+                            use_container_width=True)
@@ -0,0 +1,139 @@
+"""Warm-up all'avvio del server: download, parse, viste e import pesanti prima della prima sessione.
+
+Senza warm-up il primo utente dopo l'avvio paga tutto: import di plotly,
+download del workbook, parse dell'xlsx (o memory map del snapshot), viste,
+indici e conflitti. ``warm_up`` fa lo stesso lavoro in un thread, con le
+stesse cache di processo delle dashboard (sorgente e refresher condivisi,
+``Dataset.memo``): una sessione che arriva a warm-up in corso aspetta il
+caricamento gia' avviato invece di rifarlo.
+
+Dalla riga di comando, nello stesso processo del server Streamlit::
+
+    python -m rtca.warmup --view lan --serve app_LAN.py [-- --server.port 8502]
+    python -m rtca.warmup --view olympic --drive-id <id> --serve app.py
+
+Senza ``--serve`` il warm-up gira in primo piano e il processo esce: restano
+su disco il download (``rtca.downloads``) e lo snapshot Arrow, che un server
+avviato dopo legge senza riparsare l'xlsx. Le fasi finiscono in
+``rtca.timing`` come ``warmup.*``.
+"""
+import argparse
+import importlib
+import os
+import sys
+import threading
+
+from .columns import (
+    CENTER, COL_AO, COL_AQ, COL_REQUEST, COL_STAKE, COL_STAKE_ID, POWER_DBM, REQ_ID, WIDTH_MHZ,
+)
+from .core import (
+    chart_rows, lan_columns, lan_index, olympic_capacity, olympic_frame, olympic_index, shared_source,
+    spectrum_columns,
+)
+from .timing import timings
+
+ENV_VARS = {"olympic": "RTCA_WORKBOOK", "lan": "RTCA_LAN_WORKBOOK"}   # come in app.py / app_LAN.py
+PERIODS = ["Olympic", "Paralympic"]
+SPECTRUM_INPUT = [COL_AO, COL_AQ, COL_REQUEST, COL_STAKE_ID, CENTER, WIDTH_MHZ, POWER_DBM, REQ_ID]
+
+
+def _plotly(df, color_by):
+    """Una figura piccola fino al JSON: plotly carica validator e template al primo uso (~0.2 s)."""
+    from .figures import spectrum_figure
+
+    sample = chart_rows(df, plotted_only=True).head(50)
+    if len(sample):
+        spectrum_figure(sample, color_by, COL_AO)[0].to_json()
+
+
+def _olympic_steps():
+    from .availability import availability_index
+    from .cube import olympic_cube
+    from .incremental import dataset_conflicts
+
+    return ([("index", olympic_index), ("capacity", olympic_capacity), ("cube", olympic_cube),
+             ("availability", availability_index)]
+            + [(f"conflicts.{p}", lambda ds, p=p: dataset_conflicts(ds, p)) for p in PERIODS]
+            + [("plotly", lambda ds: _plotly(olympic_frame(ds), COL_STAKE))])
+
+
+def _lan_steps():
+    from .incremental import dataset_conflicts
+
+    return ([("index", lan_index), ("spectrum", spectrum_columns)]
+            + [(f"conflicts.{p}", lambda ds, p=p: dataset_conflicts(ds, p, view="lan")) for p in PERIODS]
+            + [("plotly", lambda ds: _plotly(lan_columns(ds, SPECTRUM_INPUT), COL_STAKE_ID))])
+
+
+# Vista -> (passi sul dataset, moduli importati dalle sezioni della dashboard)
+VIEWS = {
+    "olympic": (_olympic_steps, ["plotly.express", "rtca.figures", "rtca.imd", "rtca.solver", "rtca.reports",
+                                 "rtca.ui"]),
+    "lan": (_lan_steps, ["plotly.express", "rtca.figures", "rtca.heatmap", "rtca.ui"]),
+}
+
+
+def warm_up(source, view, background=True):
+    """Carica la versione corrente di ``source`` e prepara la vista ``view``; con ``background`` in un thread.
+
+    Ritorna il thread (gia' avviato) o, in primo piano, la versione caricata.
+    """
+    from .core import load_dataset
+    from .refresher import shared_refresher
+
+    steps, modules = VIEWS[view]
+
+    def run():
+        with timings.stage(f"warmup.{view}"):
+            for name in modules:
+                with timings.stage(f"warmup.import.{name}"):
+                    importlib.import_module(name)
+            with timings.stage("warmup.load"):   # download + parse (o memory map), come al primo rerun
+                version = shared_refresher(source).current_version()
+                dataset = load_dataset(source, version)
+            for name, step in steps():
+                with timings.stage(f"warmup.{view}.{name}"):
+                    step(dataset)
+        return version
+
+    if not background:
+        return run()
+    thread = threading.Thread(target=run, name=f"rtca-warmup-{view}", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    extra = argv[argv.index("--") + 1:] if "--" in argv else []
+    argv = argv[:argv.index("--")] if "--" in argv else argv
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--view", choices=sorted(VIEWS), default="olympic")
+    parser.add_argument("--workbook", help="workbook locale (default: la variabile d'ambiente della vista)")
+    parser.add_argument("--drive-id", help="file id Google Drive del workbook (come FILE_ID della dashboard)")
+    parser.add_argument("--serve", metavar="SCRIPT", help="avvia 'streamlit run SCRIPT' in questo processo")
+    args = parser.parse_args(argv)
+
+    env_var = ENV_VARS[args.view]
+    if args.workbook:
+        os.environ[env_var] = os.path.abspath(args.workbook)   # la dashboard usera' la stessa sorgente
+    if not os.environ.get(env_var) and not args.drive_id:
+        parser.error(f"one of --workbook, ${env_var} or --drive-id is required")
+    source = shared_source(env_var, args.drive_id, "frequenze.xlsx")
+
+    if args.serve is None:
+        version = warm_up(source, args.view, background=False)
+        for row in timings.summary():
+            print(f"{row['stage']:<40} {row['last_ms']:>10.1f} ms")
+        print(f"warmed {args.view} view, version {version}")
+        return
+
+    warm_up(source, args.view)
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", args.serve, *extra]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
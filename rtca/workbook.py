@@ -0,0 +1,168 @@
+"""Lettura del workbook in un solo passaggio, con proiezione delle colonne e dtype dichiarati.
+
+Uno *schema* e' un dict ``{colonna: (tipo, obbligatoria)}``. ``read_workbook``
+apre il file una volta, legge tutti i fogli richiesti caricando solo le colonne
+dello schema (``usecols``), verifica subito le colonne obbligatorie e converte
+ogni colonna al tipo dichiarato.
+"""
+import hashlib
+
+import pandas as pd
+
+from .columns import (
+    CAP_FROM, CAP_TO, CAP_TOT, CAP_VENUE, COL_AO, COL_AQ, COL_BX, COL_NEW_SERVICE, COL_NEW_VENUE,
+    COL_PERIOD, COL_PNRF, COL_REQUEST, COL_SERVICE, COL_STAKE, COL_TICKET, COL_VENUE,
+    COL_PRIORITY, COL_STATO, COL_FINAL, COL_STAKE_ID, KO_COLUMNS, SHEET_ALL_NP, SHEET_CAPACITY,
+)
+
+CATEGORY = "category"   # codici: venue, stakeholder, servizio, ...
+FLOAT    = "float"      # frequenze, banda, potenza
+INTEGER  = "integer"    # intero nullable (Int64), es. priorita'
+TEXT     = "text"       # stringhe libere, NaN preservati
+
+
+class WorkbookSchemaError(ValueError):
+    """Il workbook non contiene le colonne obbligatorie dello schema."""
+
+    def __init__(self, missing):
+        self.missing = missing
+        detail = "; ".join(f"'{sheet}': {', '.join(cols)}" for sheet, cols in missing.items())
+        super().__init__(f"Missing required columns in {detail}")
+
+
+def _text(series):
+    return series.where(series.isna(), series.astype(str))
+
+
+def _integer(series):
+    num = pd.to_numeric(series, errors="coerce")
+    if ((num.dropna() % 1) == 0).all():
+        return num.astype("Int64")
+    return num
+
+
+CONVERTERS = {
+    CATEGORY: lambda s: _text(s).astype("category"),
+    FLOAT:    lambda s: pd.to_numeric(s, errors="coerce").astype(float),
+    INTEGER:  _integer,
+    TEXT:     _text,
+}
+
+
+def schema(columns, required=()):
+    """Costruisce uno schema da ``{colonna: tipo}``; ``required=True`` le rende tutte obbligatorie."""
+    if required is True:
+        required = columns.keys()
+    return {col: (kind, col in set(required)) for col, kind in columns.items()}
+
+
+def apply_schema(df, sheet_schema):
+    for col, (kind, _) in sheet_schema.items():
+        if col in df.columns and kind is not None:
+            df[col] = CONVERTERS[kind](df[col])
+    return df
+
+
+def check_required(columns, schemas):
+    """Solleva WorkbookSchemaError se ``columns`` ({sheet: colonne presenti, None se il foglio manca})
+    non contiene le colonne obbligatorie di ``schemas``."""
+    missing = {}
+    for sheet, sheet_schema in schemas.items():
+        present = columns.get(sheet)
+        if present is None:
+            missing[sheet] = ["<sheet not found>"]
+            continue
+        absent = [c for c, (_, req) in sheet_schema.items() if req and c not in set(present)]
+        if absent:
+            missing[sheet] = absent
+    if missing:
+        raise WorkbookSchemaError(missing)
+
+
+def read_workbook(path, schemas, project=True, require_sheets=True):
+    """Legge i fogli di ``schemas`` ({sheet: schema}) con una sola apertura del file.
+
+    Con ``project=False`` vengono lette tutte le colonne (le dichiarate sono
+    comunque tipizzate). Solleva WorkbookSchemaError se mancano colonne
+    obbligatorie; con ``require_sheets=False`` un foglio assente diventa un
+    DataFrame vuoto senza colonne.
+    """
+    with pd.ExcelFile(path) as xls:
+        missing_sheets = [s for s in schemas if s not in xls.sheet_names]
+        if missing_sheets and require_sheets:
+            raise WorkbookSchemaError({s: ["<sheet not found>"] for s in missing_sheets})
+        frames, missing = {s: pd.DataFrame() for s in missing_sheets}, {}
+        for sheet, sheet_schema in schemas.items():
+            if sheet in frames:
+                continue
+            header = xls.parse(sheet, nrows=0).columns.astype(str)
+            absent = [c for c, (_, req) in sheet_schema.items() if req and c not in header]
+            if absent:
+                missing[sheet] = absent
+                continue
+            usecols = (lambda c, wanted=set(sheet_schema): str(c) in wanted) if project else None
+            frames[sheet] = xls.parse(sheet, usecols=usecols)
+        if missing:
+            raise WorkbookSchemaError(missing)
+    return {sheet: apply_schema(frames[sheet], schemas[sheet]) for sheet in schemas}
+
+
+# ----------------------------
+# Schemi usati dalle dashboard
+# ----------------------------
+ALL_NP_SCHEMA = schema({
+    COL_REQUEST:     TEXT,
+    COL_PERIOD:      CATEGORY,
+    COL_VENUE:       CATEGORY,
+    COL_STAKE:       CATEGORY,
+    COL_SERVICE:     CATEGORY,
+    COL_TICKET:      CATEGORY,
+    COL_PNRF:        CATEGORY,
+    COL_NEW_VENUE:   CATEGORY,
+    COL_NEW_SERVICE: CATEGORY,
+    COL_BX:          FLOAT,
+    COL_AO:          FLOAT,
+    COL_AQ:          FLOAT,
+    COL_STATO:       TEXT,
+    COL_PRIORITY:    INTEGER,
+    "Usage Type":          CATEGORY,
+    "Transmission Type":   CATEGORY,
+    "Is Simplex":          CATEGORY,
+    "Tuning Range From":   FLOAT,
+    "Tuning Range To":     FLOAT,
+    "Tuning Step (kHz)":   FLOAT,
+    "Notes":               TEXT,
+    "Note ottimizzazione": TEXT,
+    "IMD step":            TEXT,
+    "Note di lavorazione": TEXT,
+}, required=[COL_REQUEST, COL_PERIOD, COL_VENUE, COL_STAKE, COL_SERVICE, COL_PNRF, COL_NEW_VENUE,
+             COL_NEW_SERVICE, COL_BX, COL_AO, COL_AQ, COL_STATO, COL_PRIORITY] + KO_COLUMNS)
+
+CAPACITY_SCHEMA = schema({
+    CAP_VENUE: TEXT,
+    CAP_FROM:  FLOAT,
+    CAP_TO:    FLOAT,
+    CAP_TOT:   FLOAT,
+}, required=True)
+
+
+# Tipi di tutte le colonne note alle due dashboard, senza obbligatorie: il snapshot
+# condiviso (rtca.core) legge ogni colonna una volta e ogni dashboard verifica le sue
+WORKBOOK_TYPES = {
+    SHEET_ALL_NP: schema({**{c: kind for c, (kind, _) in ALL_NP_SCHEMA.items()},
+                          COL_STAKE_ID: CATEGORY, COL_FINAL: TEXT}),
+    SHEET_CAPACITY: schema({c: kind for c, (kind, _) in CAPACITY_SCHEMA.items()}),
+}
+
+
+def workbook_reader(schemas, project=True, require_sheets=True):
+    """Reader per snapshot.ensure_snapshot: legge solo i fogli richiesti con i rispettivi schemi."""
+    def reader(path, sheets):
+        return read_workbook(path, {s: schemas[s] for s in sheets}, project=project, require_sheets=require_sheets)
+    return reader
+
+
+def schema_token(schemas, project=True):
+    """Impronta corta degli schemi: va nella chiave del snapshot, cosi' uno schema nuovo non riusa dati vecchi."""
+    text = repr((project, sorted((s, sorted(sc.items())) for s, sc in schemas.items())))
+    return hashlib.sha256(text.encode()).hexdigest()[:8]